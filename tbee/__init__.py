@@ -16,5 +16,5 @@ from math import sqrt, pi, sin, cos
 PI = pi
 '''
 
-__all__ = ['lattice', 'system', 'plot', 'save', 'propagation', 'error_handling']
+__all__ = ['lattice', 'system', 'hamiltonian', 'plot', 'save', 'propagation', 'transport', 'transfer', 'table', 'error_handling']
 
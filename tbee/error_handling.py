@@ -17,6 +17,28 @@ def boolean(var, var_name):
         raise TypeError('\n\nParameter {} must be a bool.\n'.format(var_name))
 
 
+def function(var, var_name):
+    '''
+    Check if *var* is a function.
+
+    :raises TypeError: Parameter *var* must be a function.
+    '''
+    if not callable(var):
+        raise TypeError('\n\nParameter {} must be a function.\n'.format(var_name))
+
+
+def func_values(values, size, var_name):
+    '''
+    Check the values returned by the function *var_name*.
+
+    :raises ValueError: Function *var_name* must return a scalar or an array of length *size*.
+    '''
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.number) or values.shape not in ((), (size,)):
+        raise ValueError('\n\nFunction {} must return numbers, a scalar or an array '
+                                   'of length {}.\n'.format(var_name, size))
+
+
 def positive_int(var, var_name):
     '''
     Check if *var* is a positive integer.
@@ -560,9 +582,9 @@ def hop_n1(hop):
     '''
     Check method if self.hop contains nearest neighbours hoppings.
 
-    :raises RunTimeError: self.hop must contain nearest neighbours hoppings.
+    :raises ValueError: self.hop must contain nearest neighbours hoppings.
     '''
-    if len(hop['n'] == 1) == 0:
+    if not np.any(hop['n'] == 1):
         raise ValueError('\n\nParameter hop must contain nearest neighbours hoppings.\n')
 
 
@@ -630,6 +652,16 @@ def empty_ham(ham):
         raise RuntimeError('\n\nRun method system.get_ham first.\n')
 
 
+def hermitian(is_hermitian):
+    '''
+    Check if the Hamiltonian is Hermitian.
+
+    :raises ValueError: Hamiltonian must be Hermitian.
+    '''
+    if not is_hermitian:
+        raise ValueError('\n\nHamiltonian must be Hermitian.\n')
+
+
 def empty_en(en):
     '''
     Check if *en* not empty.
@@ -725,6 +757,43 @@ def lims(lims):
         smaller(lims[0], 'lims[0]', lims[1], 'lims[1]')
 
 
+def index_lims(index, sites):
+    '''
+    Check parameter *index*.
+
+    :raises TypeError: Parameter index must be a list.
+    :raises TypeError: Parameter *index[0]* must be an integer.
+    :raises TypeError: Parameter *index[1]* must be an integer.
+    :raises ValueError: *index* must be a list of length 2.
+    :raises ValueError: *index[0]* and *index[1]* must be in [0, sites).
+    :raises ValueError: *index[0]* must be smaller than or equal to *index[1]*.
+    '''
+    if index is not None:
+        list_tuple_2elem(index, 'index')
+        for i, ind in enumerate(index):
+            if not isinstance(ind, int):
+                raise TypeError('\n\nParameter index[{}] must be an integer.\n'.format(i))
+            if ind < 0 or ind >= sites:
+                raise ValueError('\n\nParameter index[{}] must be in [0, {}).\n'.format(i, sites))
+        if index[0] > index[1]:
+            raise ValueError('\n\nindex[0] must be smaller than or equal to index[1].\n')
+
+
+def states(index, states):
+    '''
+    Check parameter *index* of method *get_intensity*.
+
+    :raises TypeError: Parameter index must be an integer or a list of integers.
+    :raises ValueError: Parameter index must be in [0, states).
+    '''
+    ind = np.atleast_1d(index)
+    if not isinstance(index, (int, list, tuple, np.ndarray)) or \
+            (ind.size and not np.issubdtype(ind.dtype, np.integer)):
+        raise TypeError('\n\nParameter index must be an integer or a list of integers.\n')
+    if np.any(ind < 0) or np.any(ind >= states):
+        raise ValueError('\n\nParameter index must be in [0, {}).\n'.format(states))
+
+
 def lims_positive(lims):
     '''
     Check parameter *lims*.
@@ -742,6 +811,30 @@ def lims_positive(lims):
         smaller(lims[0], 'lims[0]', lims[1], 'lims[1]')
 
 
+def empty_bloch(bloch):
+    '''
+    Check if the Bloch Hamiltonian is set.
+
+    :raises RuntimeError: Run method set_bloch first.
+    '''
+    if not bloch:
+        raise RuntimeError('\n\nRun method set_bloch first.\n')
+
+
+def kpoints(k):
+    '''
+    Check parameter *k*.
+
+    :raises TypeError: Parameter k must be an array of wave vectors (kx, ky).
+    '''
+    try:
+        k = np.asarray(k, 'f8')
+    except (TypeError, ValueError):
+        raise TypeError('\n\nParameter k must be an array of wave vectors (kx, ky).\n')
+    if k.ndim not in (1, 2) or k.shape[-1] != 2:
+        raise TypeError('\n\nParameter k must be an array of wave vectors (kx, ky).\n')
+
+
 #################################
 # CLASS PLOT EXCEPTION HANDLING
 #################################
@@ -801,6 +894,20 @@ def get_pump(hams):
     for ham in hams:
         empty_ham(ham)
 
+
+def precision(precision):
+    '''
+    Check parameter *precision*.
+
+    :raises TypeError: Parameter precision must be a string.
+    :raises ValueError: Parameter precision must be "single" or "double".
+    '''
+    string(precision, 'precision')
+    if precision not in ['single', 'double']:
+        raise ValueError('\n\nParameter precision must be a string:\n'
+                                   '"single" or "double".\n')
+
+
 def prop_type(prop_type):
     string(prop_type, 'prop_type')
     if prop_type not in ['real', 'imag', 'norm']:
@@ -7,6 +7,8 @@ PI = np.pi
 ATOL = 1e-3
 DX = 0.5 * sqrt(3)
 DY = 0.5
+STACK_SITES = 256  # largest flakes of get_butterfly diagonalised as stacks (larger ones in a process pool)
+STACK_BYTES = 2 ** 25  # maximal size, in bytes, of a stack of Hamiltonians (32 MB)
 
  
 #################################
@@ -113,42 +115,74 @@ class grapheneSys(system):
         '''
         error_handling.number(t, 't')
         error_handling.real_number(beta, 'beta')
+        strain = self.get_strain()
+        self.hop = table(self.hop.dtype, len(strain['i']))
+        self.hop['n'] = 1
+        self.hop['i'] = strain['i']
+        self.hop['j'] = strain['j']
+        self.hop['tag'] = self.tag_pair(strain['i'], strain['j'])
+        self.hop['ang'] = strain['ang']
+        self.hop['t'] = t * (1. + 0.25 * beta * strain['proj'])
+
+    def get_strain(self):
+        '''
+        Private method.
+        Get the nearest neighbors bond geometry of the strain (computed once 
+        per lattice): indices, angles, and projections of the bond centers.
+        '''
+        # key on the coordinates: any change of the lattice recomputes the geometry
+        key = hash(self.lat.coor['x'].tobytes() + self.lat.coor['y'].tobytes())
+        if getattr(self, 'strain', {}).get('key') == key:
+            return self.strain
         self.get_distances()
         ind = np.argwhere(np.isclose(self.dist_uni[1], self.vec_hop['dis'], atol=ATOL))
-        ind_up = ind[ind[:, 1] > ind[:, 0]]  
-        self.hop = np.zeros(len(ind_up), dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                                        ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')])
-        self.hop['n'] = 1
-        self.hop['i'] = ind_up[:, 0]
-        self.hop['j'] = ind_up[:, 1]
-        self.hop['ang'] = self.vec_hop['ang'][ind_up[:, 0], ind_up[:, 1]]
+        ind = ind[ind[:, 1] > ind[:, 0]]
+        i, j, ang = orient(ind[:, 0], ind[:, 1], self.vec_hop['ang'][ind[:, 0], ind[:, 1]])
         # change angle (to get the correct strain)
-        self.hop['ang'][np.isclose(30., self.hop['ang'], ATOL)] = -150.
-        self.hop['ang'][np.isclose(150., self.hop['ang'], ATOL)] = - 30.
-        x_center = .5 * (self.lat.coor['x'][ind_up[:, 0]] + self.lat.coor['x'][ind_up[:, 1]])
-        y_center = .5 * (self.lat.coor['y'][ind_up[:, 0]] + self.lat.coor['y'][ind_up[:, 1]])
-        self.hop['t'] = t * (1. + 0.25 * beta * (np.cos(PI / 180 * self.hop['ang']) * x_center +
-                                                                np.sin(PI / 180 * self.hop['ang']) * y_center))
-        # back to the former angle
-        self.hop['ang'][np.isclose(-150., self.hop['ang'])] = 30.
-        self.hop['ang'][np.isclose(-30., self.hop['ang'])] = 150.
-
-    def get_butterfly(self, t, N):
+        ang_strain = ang.copy()
+        ang_strain[np.isclose(30., ang, ATOL)] = -150.
+        ang_strain[np.isclose(150., ang, ATOL)] = - 30.
+        x_center = .5 * (self.lat.coor['x'][i] + self.lat.coor['x'][j])
+        y_center = .5 * (self.lat.coor['y'][i] + self.lat.coor['y'][j])
+        proj = np.cos(PI / 180 * ang_strain) * x_center + np.sin(PI / 180 * ang_strain) * y_center
+        self.strain = {'key': key, 'i': i, 'j': j, 'ang': ang, 'proj': proj}
+        return self.strain
+
+    def get_butterfly(self, t, N, processes=1):
         ''''
         Get energies depending on strain.
 
+        The bond geometry is computed once, and the hoppings of all 
+        the strain values are obtained as a single (N, bonds) array.
+        Small flakes (at most *STACK_SITES* sites) are diagonalised by 
+        batched *eigvalsh* on stacks of at most *STACK_BYTES* bytes, 
+        larger flakes in a process pool.
+
         :param t: Unstrained hopping value.
         :param N: number of strain values between min and max strains.
+        :param processes: Positive integer. Default value 1. 
+            Number of worker processes (number of CPUs if None). 
         '''
         error_handling.number(t, 't')
         error_handling.positive_int(N, 'N')
+        if processes is not None:
+            error_handling.positive_int(processes, 'processes')
         beta_lims = self.get_beta_lims()
         self.betas = np.linspace(beta_lims[0], beta_lims[1], N)
-        self.butterfly = np.zeros((N, self.lat.sites))
-        for i, beta in enumerate(self.betas):
-            self.set_hop_linear_strain(t=1, beta=beta)
-            self.get_ham()
-            self.butterfly[i] = LA.eigvalsh(self.ham.toarray())
+        strain = self.get_strain()
+        hop = t * (1. + 0.25 * np.outer(self.betas, strain['proj']))
+        onsite = self.onsite if self.onsite.size == self.lat.sites else np.zeros(self.lat.sites)
+        args = strain['i'], strain['j'], onsite
+        if self.lat.sites <= STACK_SITES:
+            size = np.result_type(hop, onsite).itemsize * self.lat.sites ** 2
+            batch = max(1, STACK_BYTES // size)
+            self.butterfly = np.concatenate([strain_eig(*args, hop[i: i+batch]) 
+                                                             for i in range(0, N, batch)])
+        else:
+            with ProcessPoolExecutor(max_workers=processes) if processes != 1 else serial() as pool:
+                self.butterfly = np.array(list(pool.map(strain_eig, *[[arg] * N for arg in args], hop)))
+        self.set_hop_linear_strain(t=t, beta=self.betas[-1])
+        self.get_ham()
 
     def get_beta_lims(self):
         '''
@@ -165,3 +199,19 @@ class grapheneSys(system):
         beta_lims[0] = -4. / ym + 1e-6
         print('Strain limits: {}'.format(beta_lims))
         return beta_lims
+
+
+def strain_eig(i, j, onsite, hop):
+    '''
+    Private function.
+    Get the eigenenergies of the Hamiltonians with hoppings *hop* 
+    (one row per Hamiltonian) between the sites *i* and *j*.
+    '''
+    single = np.ndim(hop) == 1
+    hop = np.atleast_2d(hop)
+    ham = np.zeros((len(hop), len(onsite), len(onsite)), np.result_type(hop, onsite))
+    ham[:, i, j] = hop
+    ham[:, j, i] = hop.conj()
+    ham[:, np.arange(len(onsite)), np.arange(len(onsite))] = onsite
+    en = np.linalg.eigvalsh(ham)
+    return en[0] if single else en
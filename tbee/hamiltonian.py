@@ -0,0 +1,179 @@
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import LinearOperator
+import tbee.error_handling as error_handling
+from tbee.system import PRECISION, ATOL, stencil
+
+
+
+#################################
+# CLASS HAMILTONIAN
+#################################
+
+
+class hamiltonian(LinearOperator):
+    '''
+    Matrix-free Tight-Binding Hamiltonian of a lattice defined
+    on the grid of the class **lattice** (see *lattice.get_lattice*).
+
+    The hoppings are given, as in *system.set_hopping*, by hopping types
+    *n* (the unit cell distances), angles and tags. They are applied
+    by index arithmetic on the (unit cell site, :math:`n_2`, :math:`n_1`) grid,
+    so that neither *sys.hop* nor the sparse *sys.ham* is stored.
+    Sites removed from the grid (cuts) are taken into account.
+    Specific hoppings and onsite energies (defects) are stored
+    as a sparse correction.
+
+    The operator can be used wherever *sys.ham* is used for
+    matrix-vector products: *scipy.sparse.linalg* iterative solvers
+    (*eigsh*, *expm_multiply*, ...) and *propagation.get_propagation*.
+
+    :param lat: **lattice** class instance.
+    :param list_hop: List of Dictionaries (see *system.set_hopping*).
+        Hoppings of the upper part (positive angles).
+    :param dict_onsite: Dictionary. Default value None.
+        Onsite energies (see *system.set_onsite*).
+    :param hopping_def: Dictionary. Default value None.
+        Specific hoppings (see *system.set_hopping_def*).
+    :param onsite_def: Dictionary. Default value None.
+        Specific onsite energies (see *system.set_onsite_def*).
+    :param precision: String. Default value 'double'. 'single' or 'double'.
+
+    Example usage::
+
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=1000, n2=1000)
+        ham = hamiltonian(lat, [{'n': 1, 't': 1.}], onsite_def={0: 1.})
+        en = eigsh(ham, k=6, which='LA', return_eigenvectors=False)
+    '''
+
+    def __init__(self, lat, list_hop, dict_onsite=None, hopping_def=None,
+                         onsite_def=None, precision='double'):
+        error_handling.lat(lat)
+        error_handling.empty_coor(lat.coor)
+        error_handling.precision(precision)
+        self.lat = lat
+        self.precision = precision
+        uc, n1, n2 = self.lat.get_grid()
+        n1, n2 = n1 - n1.min(), n2 - n2.min()
+        self.shape_grid = (len(self.lat.unit_cell), n2.max() + 1, n1.max() + 1)
+        self.grid = (uc, n1, n2)
+        self.pos = np.ravel_multi_index((uc, n2, n1), self.shape_grid)
+        self.stencil, self.stencil_t, self.dist_uni = stencil(self.lat.unit_cell, 
+                                                                                 self.lat.prim_vec, list_hop)
+        real, cplx = PRECISION[precision]
+        self.onsite = np.zeros(self.lat.sites, cplx)
+        if dict_onsite is not None:
+            error_handling.set_onsite(dict_onsite, self.lat.tags)
+            for tag, on in dict_onsite.items():
+                self.onsite[self.lat.coor.equal('tag', tag)] = on
+        if onsite_def is not None:
+            error_handling.set_onsite_def(onsite_def, self.lat.sites)
+            for i, on in onsite_def.items():
+                self.onsite[i] = on
+        self.get_correction(hopping_def)
+        is_complex = np.any(self.onsite.imag) or np.any(np.imag(self.stencil_t)) or \
+                            np.iscomplexobj(self.correction)
+        if not is_complex:
+            self.onsite, self.stencil_t = self.onsite.real, self.stencil_t.real
+        dtype = np.dtype(cplx if is_complex else real)
+        self.onsite = self.onsite.astype(dtype)
+        self.stencil_t = self.stencil_t.astype(dtype)
+        self.correction = self.correction.astype(dtype)
+        LinearOperator.__init__(self, dtype, (self.lat.sites, self.lat.sites))
+        self.nnz = self.count_nonzero()
+
+    def get_grid_hopping(self, i, j):
+        '''
+        Private method.
+        Get the hopping between the sites *i* and *j* given by the stencil.
+        '''
+        uc, n1, n2 = self.grid
+        for sign, (k, l) in [(1, (i, j)), (-1, (j, i))]:
+            key = [uc[k], uc[l], n1[l] - n1[k], n2[l] - n2[k]]
+            ind = np.flatnonzero(np.all(self.stencil == key, axis=1))
+            if ind.size:
+                return self.stencil_t[ind[0]] if sign == 1 else np.conj(self.stencil_t[ind[0]])
+        return 0.
+
+    def get_correction(self, hopping_def):
+        '''
+        Private method.
+        Get the sparse correction due to the specific hoppings.
+        '''
+        rows, cols, vals = [], [], []
+        if hopping_def is not None:
+            error_handling.set_hopping_def(None, hopping_def, self.lat.sites)
+            for (i, j), t in hopping_def.items():
+                dt = t - self.get_grid_hopping(i, j)
+                rows.extend([i, j])
+                cols.extend([j, i])
+                vals.extend([dt, np.conj(dt)])
+        vals = np.array(vals, 'c16')
+        if not np.any(vals.imag):
+            vals = vals.real
+        self.correction = sparse.csr_matrix((vals, (rows, cols)),
+                                                              shape=(self.lat.sites, self.lat.sites))
+
+    def slices(self, d1, d2):
+        '''
+        Private method.
+        Get the grid slices of the cells R and R+d, with R and R+d in the grid.
+        '''
+        src, dst = [], []
+        for d, size in zip([d2, d1], self.shape_grid[1:]):
+            dst.append(slice(max(0, -d), min(size, size-d)))
+            src.append(slice(max(0, d), min(size, size+d)))
+        return tuple(dst), tuple(src)
+
+    def count_nonzero(self):
+        '''
+        Private method.
+        Get the number of nonzero elements of the equivalent matrix
+        (upper bound, the specific hoppings being counted twice).
+        '''
+        occupied = np.zeros(self.shape_grid, bool)
+        occupied.reshape(-1)[self.pos] = True
+        nnz = np.count_nonzero(self.onsite) + self.correction.nnz
+        for (a, b, d1, d2), t in zip(self.stencil, self.stencil_t):
+            if t:
+                dst, src = self.slices(d1, d2)
+                nnz += 2 * np.count_nonzero(occupied[a][dst] & occupied[b][src])
+        return nnz
+
+    def apply(self, x, adjoint=False):
+        '''
+        Private method.
+        Apply the Hamiltonian, or its adjoint, to the vector *x*.
+        '''
+        x = np.asarray(x).reshape(-1)
+        dtype = np.result_type(self.dtype, x.dtype)
+        grid = np.zeros(self.shape_grid, dtype)
+        grid.reshape(-1)[self.pos] = x
+        out = np.zeros(self.shape_grid, dtype)
+        for (a, b, d1, d2), t in zip(self.stencil, self.stencil_t):
+            # H[(a, R), (b, R+d)] = t, H[(b, R+d), (a, R)] = t^*
+            t_ab, t_ba = t, np.conj(t)
+            if adjoint:
+                t_ab, t_ba = np.conj(t_ba), np.conj(t_ab)
+            dst, src = self.slices(d1, d2)
+            out[a][dst] += t_ab * grid[b][src]
+            out[b][src] += t_ba * grid[a][dst]
+        if adjoint:
+            return out.reshape(-1)[self.pos] + self.onsite.conj() * x + self.correction.conj().T.dot(x)
+        return out.reshape(-1)[self.pos] + self.onsite * x + self.correction.dot(x)
+
+    def _matvec(self, x):
+        return self.apply(x)
+
+    def _rmatvec(self, x):
+        return self.apply(x, adjoint=True)
+
+    def toarray(self):
+        '''
+        Get the dense Hamiltonian (for small lattices).
+
+        :returns:
+            * **ham** -- Dense Hamiltonian.
+        '''
+        return self.matmat(np.eye(self.lat.sites, dtype=self.dtype))
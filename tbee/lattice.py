@@ -1,9 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import tbee.error_handling as error_handling
+from tbee.table import table
 
 
 PI = np.pi
+ATOL = 1e-3
 
 
 #################################
@@ -50,7 +52,7 @@ class lattice():
         self.prim_vec = prim_vec
         self.tags = np.unique(np.array([dic['tag'] for dic in self.unit_cell]))
         self.n1, self.n2 = 0, 0
-        self.coor = np.array([], dtype=[('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+        self.coor = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
         self.sites = 0
 
     def get_lattice(self, n1, n2=1):
@@ -74,7 +76,7 @@ class lattice():
         sites_uc = len(self.unit_cell)
         sites_tag = n1*n2
         self.sites = sites_uc * sites_tag
-        self.coor = np.empty(self.sites, dtype=[('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+        self.coor = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')], self.sites)
         self.n1, self.n2 = n1, n2
         x = self.prim_vec[0][0] * np.arange(n1, dtype='f8')
         y = self.prim_vec[0][1] * np.arange(n1, dtype='f8')
@@ -89,13 +91,55 @@ class lattice():
             self.coor['x'][i*sites_tag: (i+1)*sites_tag] = xx + dic['r0'][0]
             self.coor['y'][i*sites_tag: (i+1)*sites_tag] = yy + dic['r0'][1]
             self.coor['tag'][i*sites_tag: (i+1)*sites_tag] = dic['tag']
-        self.coor = np.sort(self.coor, order=('y', 'x'))
+        self.coor = self.coor[self.coor.argsort(('y', 'x'))]
+
+    def get_grid(self):
+        r'''
+        Get the unit cell site index and the unit cell coordinates 
+        :math:`(n_1, n_2)` of each site:
+
+        .. math::
+
+            \mathbf{r} = \mathbf{r}_0 + n_1\mathbf{a}_1 + n_2\mathbf{a}_2
+
+        where :math:`\mathbf{r}_0` is the position (with the same tag) 
+        of the site in the unit cell.
+
+        :returns:
+            * **uc** -- Unit cell site indices.
+            * **n1** -- Coordinates along :math:`\mathbf{a}_1`.
+            * **n2** -- Coordinates along :math:`\mathbf{a}_2` (zeros for 1D lattices).
+
+        :raises ValueError: The sites must be on the grid defined by 
+            *unit_cell* and *prim_vec*.
+        '''
+        error_handling.empty_coor(self.coor)
+        a1 = np.array(self.prim_vec[0], 'f8')
+        if len(self.prim_vec) == 2:
+            a2 = np.array(self.prim_vec[1], 'f8')
+        else:
+            a2 = np.array([-a1[1], a1[0]]) / np.linalg.norm(a1)
+        inv = np.linalg.inv(np.column_stack([a1, a2]))
+        uc = np.full(self.sites, -1, 'i4')
+        n = np.zeros((2, self.sites), 'i8')
+        for k, dic in enumerate(self.unit_cell):
+            rel = np.dot(inv, [self.coor['x'] - dic['r0'][0], self.coor['y'] - dic['r0'][1]])
+            ind = (uc < 0) & np.all(np.abs(rel - rel.round()) < ATOL, axis=0) & \
+                     self.coor.equal('tag', dic['tag'])
+            if len(self.prim_vec) == 1:
+                ind &= np.abs(rel[1]) < ATOL
+            uc[ind] = k
+            n[:, ind] = rel[:, ind].round()
+        if np.any(uc < 0):
+            raise ValueError('\n\nThe sites must be on the grid defined by\n'
+                                        'unit_cell and prim_vec.\n')
+        return uc, n[0], n[1]
 
     def add_sites(self, coor):
         '''
         Add sites.
 
-        :param coor: Structured array with keys: {'x', 'y', 'tag'}.
+        :param coor: Structured array or table with keys: {'x', 'y', 'tag'}.
 
         Example usage::
 
@@ -109,10 +153,10 @@ class lattice():
             lat.add_sites(coor)
         '''
         error_handling.coor(coor)
-        self.coor = np.concatenate([self.coor, coor])
+        self.coor = table.concatenate([self.coor, coor])
         self.sites += len(coor)
         self.tags = np.unique(np.concatenate([self.tags, coor['tag']]))
-        self.coor = np.sort(self.coor, order=('y', 'x'))
+        self.coor = self.coor[self.coor.argsort(('y', 'x'))]
 
     def remove_sites(self, index):
         '''
@@ -155,7 +199,9 @@ class lattice():
             for i in range(self.sites):
                 if (ind[:, 0] == i).sum() == 1:
                     dang.append(i)
-            self.coor = np.delete(self.coor, dang, axis=0)
+            mask = np.ones(self.sites, bool)
+            mask[dang] = False
+            self.coor = self.coor[mask]
             self.sites -= len(dang)
             if dang == []:
                 break
@@ -284,9 +330,8 @@ class lattice():
         Keep only the sites with different coordinates.
         '''
         error_handling.empty_coor(self.coor)
-        coor = self.coor[['x', 'y']].copy()
-        coor['x'], coor['y'] = self.coor['x'].round(4), self.coor['y'].round(4)
-        _, idx = np.unique(coor, return_index=True)
+        coor = np.column_stack([self.coor['x'].round(4), self.coor['y'].round(4)])
+        _, idx = np.unique(coor, axis=0, return_index=True)
         self.coor = self.coor[idx]
         self.sites = len(self.coor)
 
@@ -297,7 +342,7 @@ class lattice():
         error_handling.lat(other)
         error_handling.empty_coor(self.coor)
         error_handling.empty_coor(other.coor)
-        coor = np.concatenate([self.coor, other.coor])
+        coor = table.concatenate([self.coor, other.coor])
         tags = np.concatenate([self.tags, other.tags])
         lat = lattice(unit_cell=self.unit_cell, prim_vec=self.prim_vec)
         lat.add_sites(coor)
@@ -312,7 +357,7 @@ class lattice():
         error_handling.lat(other)
         error_handling.empty_coor(self.coor)
         error_handling.empty_coor(other.coor)
-        self.coor = np.concatenate([self.coor, other.coor])
+        self.coor = table.concatenate([self.coor, other.coor])
         self.sites += other.sites
         self.tags = np.unique([self.tags, other.tags])
         return self
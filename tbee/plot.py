@@ -138,7 +138,7 @@ class plot:
         fig, ax = plt.subplots()
         if lims is None:
             en_max = np.max(self.sys.en.real)
-            ind_en = np.ones(self.sys.lat.sites, bool)
+            ind_en = np.ones(len(self.sys.en), bool)
             ax.set_ylim([-en_max, en_max])
         else:
             ind_en = np.argwhere((self.sys.en > lims[0]) & (self.sys.en < lims[1]))
@@ -178,13 +178,13 @@ class plot:
         error_handling.lims(lims)
         fig, ax1 = plt.subplots()
         ax1 = plt.gca()
-        x = np.arange(self.sys.lat.sites)
+        x = np.arange(len(self.sys.en))
         if lims is None:
             en_max = np.max(self.sys.en.real)
             ax1.set_ylim([-en_max-0.2, en_max+0.2])
-            ind = np.ones(self.sys.lat.sites, bool)
+            ind = np.ones(len(self.sys.en), bool)
         else:
-            ind = (self.sys.en > lims[0]) & (self.sys.en < lims[1])
+            ind = (self.sys.en.real > lims[0]) & (self.sys.en.real < lims[1])
             ax1.set_ylim([lims[0]-0.1, lims[1]+0.1])
         ax1.plot(x[ind], self.sys.en.real[ind], 'ob', markersize=ms)
         ax1.set_title('Spectrum', fontsize=fs)
@@ -236,7 +236,7 @@ class plot:
             ax2 = plt.gca()
             if lims is None:
                 ax2.set_ylim([-0.1, 1.1])
-                ind = np.ones(self.sys.lat.sites, bool)
+                ind = np.ones(len(self.sys.en), bool)
             else:
                 ind = (self.sys.en > lims[0]) & (self.sys.en < lims[1])
                 ax2.set_ylim([lims[0]-0.1, lims[1]+0.1])
@@ -244,7 +244,7 @@ class plot:
             ax2 = plt.twinx()
         error_handling.empty_ndarray(self.sys.pola, 'sys.get_pola')
         error_handling.tag(tag_pola, self.sys.lat.tags)
-        x = np.arange(self.sys.lat.sites)
+        x = np.arange(len(self.sys.en))
         i_tag = self.sys.lat.tags == tag_pola
         ax2.plot(x[ind], np.ravel(self.sys.pola[ind, i_tag]), 'or', markersize=(4*ms)//5)
         str_tag = tag_pola.decode('ascii')
@@ -281,13 +281,13 @@ class plot:
             fig, ax2 = plt.subplots()
             ax2 = plt.gca()
             if lims is None:
-                ind = np.ones(self.sys.lat.sites, bool)
+                ind = np.ones(len(self.sys.en), bool)
             else:
                 ind = (self.sys.en > lims[0]) & (self.sys.en < lims[1])
         else:
             ax2 = plt.twinx()
         error_handling.empty_ndarray(self.sys.ipr, 'sys.get_ipr')
-        x = np.arange(self.sys.lat.sites)
+        x = np.arange(len(self.sys.en))
         ax2.plot(x[ind], self.sys.ipr[ind], 'or', markersize=(4*ms)//5)
         ax2.set_ylabel( 'IPR' , fontsize=fs, color='red')
         ax2.set_xlim(-0.5, x[ind][-1]+0.5)
@@ -313,20 +313,20 @@ class plot:
         '''
         if fig is None:
             error_handling.sys(self.sys)
-            error_handling.empty_ndarray(self.sys.ipr, 'sys.get_petermann')
+            error_handling.empty_ndarray(self.sys.petermann, 'sys.get_petermann')
             error_handling.positive_real(ms, 'ms')
             error_handling.positive_real(fs, 'fs')
             error_handling.lims(lims)
             fig, ax2 = plt.subplots()
             ax2 = plt.gca()
             if lims is None:
-                ind = np.ones(self.sys.lat.sites, bool)
+                ind = np.ones(len(self.sys.en), bool)
             else:
-                ind = (self.sys.en > lims[0]) & (self.sys.en < lims[1])
+                ind = (self.sys.en.real > lims[0]) & (self.sys.en.real < lims[1])
         else:
             ax2 = plt.twinx()
-        error_handling.empty_ndarray(self.sys.ipr, 'sys.get_ipr')
-        x = np.arange(self.sys.lat.sites)
+        error_handling.empty_ndarray(self.sys.petermann, 'sys.get_petermann')
+        x = np.arange(len(self.sys.en))
         ax2.plot(x[ind], self.sys.petermann[ind], 'or', markersize=(4*ms)//5)
         ax2.set_ylabel( 'K' , fontsize=fs, color='red')
         ax2.set_xlim(-0.5, x[ind][-1]+0.5)
@@ -354,11 +354,11 @@ class plot:
         error_handling.lims(lims)
         fig, ax1 = plt.subplots()
         ax1 = plt.gca()
-        x = np.arange(self.sys.lat.sites)
+        x = np.arange(len(self.sys.en))
         if lims is None:
             en_max = np.max(self.sys.en.real)
             ax1.set_ylim([-en_max-0.2, en_max+0.2])
-            ind = np.ones(self.sys.lat.sites, bool)
+            ind = np.ones(len(self.sys.en), bool)
         else:
             ind = (self.sys.en > lims[0]) & (self.sys.en < lims[1])
             ax1.set_ylim([lims[0]-0.1, lims[1]+0.1])
@@ -500,9 +500,11 @@ class plot:
         plt.draw()
         return fig
 
-    def butterfly(self, betas, butterfly, lw=1., fs=20., lims=None, title=''):
+    def butterfly(self, betas, butterfly, lw=1., fs=20., lims=None, title='',
+                          xlabel=r'$\beta/\beta_{max}$'):
         '''
-        Plot energies depending on a parameter.
+        Plot energies depending on a parameter 
+        (see *grapheneSys.get_butterfly* and *system.get_flux_sweep*).
 
         :param betas: np.array. Parameter values.
         :param butterfly: np.array. Eigenvalues.
@@ -510,6 +512,7 @@ class plot:
         :param fs: Positive Float. Default value 20. Fontsize.
         :param lims: List, lims[0] energy min, lims[1] energy max.
         :param title: Default value ''. Figure title.
+        :param xlabel: String. Default value r'$\beta/\beta_{max}$'. Parameter label.
         '''
         error_handling.ndarray_empty(betas, 'betas')
         error_handling.ndarray_empty(butterfly, 'butterfly')
@@ -517,6 +520,7 @@ class plot:
         error_handling.positive_real(fs, 'fs')
         error_handling.lims(lims)
         error_handling.string(title, 'title')
+        error_handling.string(xlabel, 'xlabel')
         i_beta_min = np.argmin(np.abs(betas))
         if lims is None:
             lims = [butterfly[i_beta_min, 0], butterfly[i_beta_min, -1]]
@@ -524,13 +528,12 @@ class plot:
                                             (butterfly[i_beta_min, :] < lims[1]))
         ind_en = np.ravel(ind_en)
         fig, ax = plt.subplots()
-        plt.title('Energies depending on strain', fontsize=fs)
-        plt.xlabel(r'$\beta/\beta_{max}$', fontsize=fs)
+        plt.xlabel(xlabel, fontsize=fs)
         plt.ylabel('$E$', fontsize=fs)
         ax.set_title(title, fontsize=fs)
         plt.yticks(np.arange(lims[0], lims[1]+1, (lims[1]-lims[0])/4), fontsize=fs)
         plt.ylim(lims)
-        beta_max = max(self.sys.betas)
+        beta_max = np.max(np.abs(betas))
         plt.xticks([-beta_max, -0.5*beta_max, 0, 
                         0.5*beta_max, beta_max], fontsize=fs)
         ax.set_xticklabels(('-1', '-1/2', '0', '1/2', '1'))
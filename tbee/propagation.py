@@ -1,6 +1,7 @@
 import numpy as np
 import scipy.sparse as sparse
 import scipy.linalg as LA
+from scipy.sparse.linalg import LinearOperator, expm_multiply
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 try:
@@ -9,6 +10,7 @@ except:
     pass
 import os
 import tbee.error_handling as error_handling
+from tbee.system import PRECISION, BANDED, bandwidth, banded
 
 
 
@@ -23,22 +25,43 @@ class propagation():
     Crank-Nicolson method.
 
     :param lat: **lattice** class instance.
+    :param precision: String. Default value 'double'. 
+        Floating point precision of the time evolution: 'single' or 'double'.
     '''
 
-    def __init__(self, lat):
+    def __init__(self, lat, precision='double'):
         error_handling.lat(lat)
+        error_handling.precision(precision)
         self.lat = lat
-        self.prop = np.array([], 'c16')
+        self.precision = precision
+        self.prop = np.array([], PRECISION[precision][1])
+
+    def set_precision(self, precision):
+        '''
+        Set the floating point precision of the time evolution.
+
+        :param precision: String. 'single' or 'double'.
+        '''
+        error_handling.precision(precision)
+        self.precision = precision
+        self.prop = self.prop.astype(PRECISION[precision][1])
 
     def get_propagation(self, ham, psi_init, steps, dz, norm=False):
         '''
         Get the time evolution.
 
-        :param ham: sparse.csr_matrix. Tight-Binding Hamilonian.
+        :param ham: sparse.csr_matrix or **hamiltonian** class instance. 
+            Tight-Binding Hamilonian.
         :param psi_init: np.ndarray. Initial state.
         :param steps: Positive Integer. Number of steps.
         :param dz: Positive number. Step.
         :param norm: Boolean. Default value True. Normalize the norm to 1 at each step.
+
+        .. note::
+
+            Matrix-free Hamiltonians (*scipy.sparse.linalg.LinearOperator*, 
+            see **hamiltonian**) are propagated with the Krylov action of 
+            :math:`\\exp(-iHz)` (*scipy.sparse.linalg.expm_multiply*).
         '''
         error_handling.empty_ham(ham)
         error_handling.ndarray(psi_init, 'psi_init', self.lat.sites)
@@ -47,17 +70,87 @@ class propagation():
         error_handling.boolean(norm, 'norm')
         self.steps = steps
         self.dz = dz
-        self.prop = np.empty((self.lat.sites, self.steps), 'c16')
+        if isinstance(ham, LinearOperator):
+            self.get_propagation_krylov(ham, psi_init, norm)
+            return
+        band = bandwidth(ham)
+        if BANDED * band < self.lat.sites:
+            self.get_propagation_banded(ham, psi_init, band, norm)
+            return
+        if not np.iscomplexobj(ham) and not (ham.T != ham).nnz:
+            self.get_propagation_real(ham, psi_init, norm)
+            return
+        cplx = PRECISION[self.precision][1]
+        ham = ham.astype(cplx)
+        self.prop = np.empty((self.lat.sites, self.steps), cplx)
         self.prop[:, 0] = psi_init
-        diag = 1j*np.ones(self.lat.sites, 'c16')
+        diag = 1j*np.ones(self.lat.sites, cplx)
         A = (sparse.diags(diag, 0) - 0.5 * self.dz * ham).toarray()
         B = (sparse.diags(diag, 0) + 0.5 * self.dz * ham).toarray()
-        mat = (np.dot(LA.inv(A), B))
+        mat = LA.solve(A, B)
         for i in range(1, self.steps):
             self.prop[:, i] = np.dot(mat, self.prop[:, i-1])
             if norm:
                 self.prop[:, i] /= np.abs(self.prop[:, i]).sum()
 
+    def get_propagation_banded(self, ham, psi_init, band, norm):
+        '''
+        Private method.
+        Crank-Nicolson time evolution for Hamiltonians with small 
+        bandwidth *band*. The banded matrix :math:`i-dz/2H` is LU factorised 
+        once (LAPACK gbtrf) and each step is a banded solve (gbtrs).
+        '''
+        cplx = PRECISION[self.precision][1]
+        ham = ham.astype(cplx)
+        diag = 1j * sparse.identity(self.lat.sites, cplx, format='csr')
+        A = banded(diag - 0.5 * self.dz * ham, band, band, rows=3*band+1)
+        B = (diag + 0.5 * self.dz * ham).tocsr()
+        gbtrf, gbtrs = LA.get_lapack_funcs(('gbtrf', 'gbtrs'), (A,))
+        lu, piv, info = gbtrf(A, band, band)
+        self.prop = np.empty((self.lat.sites, self.steps), cplx)
+        self.prop[:, 0] = psi_init
+        for i in range(1, self.steps):
+            self.prop[:, i], info = gbtrs(lu, band, band, B.dot(self.prop[:, i-1]), piv)
+            if norm:
+                self.prop[:, i] /= np.abs(self.prop[:, i]).sum()
+
+    def get_propagation_krylov(self, ham, psi_init, norm):
+        '''
+        Private method.
+        Time evolution of matrix-free Hamiltonians. Only the products 
+        :math:`H\\psi` are needed: the states :math:`\\exp(-iHz)\\psi` 
+        of the *steps* times are computed by Krylov (truncated Taylor) 
+        expansions.
+        '''
+        cplx = PRECISION[self.precision][1]
+        op = -1j * ham
+        psi_init = np.asarray(psi_init, cplx)
+        prop = expm_multiply(op, psi_init, start=0., stop=self.dz*(self.steps-1), 
+                                         num=self.steps, endpoint=True, traceA=0.)
+        self.prop = np.ascontiguousarray(prop.T, cplx)
+        self.prop[:, 0] = psi_init
+        if norm:
+            self.prop[:, 1:] /= np.abs(self.prop[:, 1:]).sum(axis=0)
+
+    def get_propagation_real(self, ham, psi_init, norm):
+        '''
+        Private method.
+        Crank-Nicolson time evolution for real symmetric Hamiltonians.
+        The Hamiltonian is diagonalised in real arithmetic and the 
+        state is propagated in the eigenbasis, where the Crank-Nicolson 
+        matrix is diagonal.
+        '''
+        real, cplx = PRECISION[self.precision]
+        en, vn = LA.eigh(ham.toarray().astype(real, copy=False))
+        phase = ((1j + 0.5 * self.dz * en) / (1j - 0.5 * self.dz * en)).astype(cplx)
+        psi_init = np.asarray(psi_init, cplx)
+        coef = np.dot(vn.T, psi_init.real) + 1j * np.dot(vn.T, psi_init.imag)
+        coef = coef.reshape(-1, 1) * phase.reshape(-1, 1) ** np.arange(self.steps, dtype=real)
+        self.prop = np.dot(vn, coef.real) + 1j * np.dot(vn, coef.imag)
+        self.prop[:, 0] = psi_init
+        if norm:
+            self.prop[:, 1:] /= np.abs(self.prop[:, 1:]).sum(axis=0)
+
     def get_pumping(self, hams, psi_init, steps, dz, norm=True):
         '''
         Get the time evolution with adiabatic pumpings.
@@ -76,13 +169,15 @@ class propagation():
         self.steps = steps
         self.dz = dz
         no = len(hams)
-        self.prop = np.empty((self.lat.sites, self.steps), 'c16')
+        cplx = PRECISION[self.precision][1]
+        self.prop = np.empty((self.lat.sites, self.steps), cplx)
         self.prop[:, 0] = psi_init
-        diag = 1j * np.ones(self.lat.sites, 'c16')
+        diag = 1j * np.ones(self.lat.sites, cplx)
+        hams = [ham.astype(cplx) for ham in hams]
         delta = self.steps // (1 + no)
         A = (sparse.diags(diag, 0) - 0.5 * self.dz * hams[0]).toarray()
         B = (sparse.diags(diag, 0) + 0.5 * self.dz * hams[0]).toarray()
-        mat = (np.dot(LA.inv(A), B))
+        mat = LA.solve(A, B)
         # before pumping
         for i in range(1, delta):
            self.prop[:, i] = np.dot(mat, self.prop[:, i-1])
@@ -95,7 +190,7 @@ class propagation():
                 ham = (1-c[i])*hams[j]+c[i]*hams[j+1]
                 A = (sparse.diags(diag, 0) - 0.5 * self.dz * ham).toarray()
                 B = (sparse.diags(diag, 0) + 0.5 * self.dz * ham).toarray()
-                mat = (np.dot(LA.inv(A), B))
+                mat = LA.solve(A, B)
                 self.prop[:, (j+1)*delta+i] = np.dot(mat, self.prop[:,  (j+1)*delta+i-1])
                 if norm:
                     self.prop[:,  (j+1)*delta+i] /= \
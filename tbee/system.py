@@ -1,14 +1,23 @@
 import numpy as np
 import scipy.sparse as sparse
 import scipy.linalg as LA
+from scipy.sparse.linalg import splu, eigsh, eigs, lobpcg, LinearOperator, ArpackNoConvergence
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse.csgraph import connected_components, reverse_cuthill_mckee, \
+                                              breadth_first_order, shortest_path
+from scipy.spatial import cKDTree
+from concurrent.futures import ProcessPoolExecutor
 import numpy.random as rand
-import numpy.core.defchararray as npc
 from math import sin, cos
 import tbee.error_handling as error_handling
+from tbee.table import table
 
 
 PI = np.pi
 ATOL = 1e-3
+BANDED = 8  # banded solvers if BANDED * bandwidth < number of sites
+CHUNK = 256  # number of eigenstates per block of the observables
+PRECISION = {'single': ('f4', 'c8'), 'double': ('f8', 'c16')}  # (real, complex) dtypes
 
 
 class system():
@@ -17,34 +26,65 @@ class system():
     by the class **lattice**.
 
     :param lat: **lattice** class instance.
+    :param precision: String. Default value 'double'. 
+        Floating point precision of the hoppings, onsite energies,
+        Hamiltonian, and eigenstates: 'single' or 'double'.
     '''
 
-    def __init__(self, lat):
+    def __init__(self, lat, precision='double'):
         error_handling.lat(lat)
+        error_handling.precision(precision)
         self.lat = lat
+        self.precision = precision
         self.sites = self.lat.sites  # used to check if sites changes
-        self.coor_hop = np.array([], dtype=[ ('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+        self.coor_hop = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
         self.vec_hop = np.array([], dtype=[('dis', 'f8'),  ('ang', 'f8')]) # Hopping distances and angles
         self.dist_uni = np.array([], 'f8')  # Different hopping distances
         self.store_hop = {}  #  Store the relevant hoppings (dynamic programming)
-        self.hop = np.array([], dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                       ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')]) #  Hoppings to build-up the Hamiltonian
-        self.onsite = np.array([], 'c16')  #  Onsite energies
+        self.hop = table([('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
+                                 ('ang', 'f4'), ('tag', 'S2'), ('t', PRECISION[precision][0])]) #  Hoppings to build-up the Hamiltonian
+        self.onsite = np.array([], PRECISION[precision][0])  #  Onsite energies (complex if needed)
         self.ham = sparse.csr_matrix(([], ([], [])), shape=(self.lat.sites, self.lat.sites))  # Hamiltonian
-        self.en = np.array([], 'c16')  # Eigenenergies
-        self.rn = np.array([], 'c16')  # Right eigenvectors: H |rn> = en |rn>
-        self.ln = np.array([], 'c16')  # Left eigenvectors:  <ln| H = en <ln|
-        self.intensity = np.array([], 'f8')  # Intensities (|rn|**2)
-        self.pola = np.array([], 'f8')  # sublattices polarisation (|rn^{(S)}|**2)
-        self.petermann = np.array([], 'f8')  # Inverse Participation Ratio
+        self.clear_eig()
         self.nmax = 0  # number of different hoppings
+        self.perm = None  # previous indices of the sites (see reorder_sites)
+        self.bloch = {}  # Bloch Hamiltonian (see set_bloch)
+        self.periodic = np.zeros(2, bool)  # periodic directions (see set_periodic)
+        self.supercell = np.eye(2)  # supercell vectors (columns)
+        self.twist = np.zeros(2)  # twist angles of the boundary conditions
 
     def clear_hopping(self):
         '''
-        Clear structured array *hop*.
+        Clear table *hop*.
         '''
-        self.hop = np.array([], dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                       ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')])
+        self.hop = table([('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
+                                 ('ang', 'f4'), ('tag', 'S2'), ('t', PRECISION[self.precision][0])])
+
+    def set_precision(self, precision):
+        '''
+        Set the floating point precision and recast the hoppings, 
+        the onsite energies, and the Hamiltonian. 
+        Eigenvalue problem solutions are not recomputed.
+
+        :param precision: String. 'single' or 'double'.
+
+        Example usage::
+
+            # scan in single precision
+            sys = system(lat, precision='single')
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.get_ham()
+            sys.get_eig()
+            # refine in double precision
+            sys.set_precision('double')
+            sys.get_eig(eigenvec=True)
+        '''
+        error_handling.precision(precision)
+        self.precision = precision
+        dtypes = PRECISION[precision]
+        self.hop.astype('t', dtypes[np.iscomplexobj(self.hop['t'])])
+        self.onsite = self.onsite.astype(dtypes[np.iscomplexobj(self.onsite)])
+        self.ham = self.ham.astype(dtypes[np.iscomplexobj(self.ham)])
 
     def get_distances(self):
         '''
@@ -54,6 +94,8 @@ class system():
         error_handling.sites(self.lat.sites)
         dif_x = self.lat.coor['x'] - self.lat.coor['x'].reshape(self.lat.sites, 1)
         dif_y = self.lat.coor['y'] - self.lat.coor['y'].reshape(self.lat.sites, 1)
+        if self.periodic.any():
+            dif_x, dif_y = self.min_image(dif_x, dif_y)[:2]
         dist = np.sqrt(dif_x ** 2 + dif_y ** 2)
         ang = (180 / PI * np.arctan2(dif_y, dif_x))
         self.vec_hop = np.zeros(dist.shape, dtype=[('dis', 'f8'),  ('ang', 'f8')])
@@ -61,6 +103,303 @@ class system():
         self.vec_hop['ang'] = ang
         self.dist_uni = np.unique(self.vec_hop['dis'].round(4))
 
+    def set_periodic(self, periodic=True, twist=(0., 0.)):
+        r'''
+        Set periodic, or twisted, boundary conditions on the supercell 
+        of :math:`n_1\times n_2` unit cells given by *lat.get_lattice*:
+
+        .. math::
+
+            \psi(\mathbf{r}+n_1\mathbf{a}_1) = e^{i\theta_1}\psi(\mathbf{r}), \quad
+            \psi(\mathbf{r}+n_2\mathbf{a}_2) = e^{i\theta_2}\psi(\mathbf{r}).
+
+        The hopping distances are computed with the minimum image convention, 
+        and the hoppings crossing the boundaries get the Bloch phases 
+        in *get_ham*. To be called before *set_hopping*.
+
+        :param periodic: Boolean or list of two Booleans. Default value True.
+            Periodic directions (along :math:`\mathbf{a}_1`, :math:`\mathbf{a}_2`).
+        :param twist: List of two real numbers. Default value (0., 0.).
+            Twist angles :math:`(\theta_1, \theta_2)`.
+
+        Example usage::
+
+            lat.get_lattice(n1=20, n2=20)
+            sys = system(lat)
+            sys.set_periodic(twist=(0.1, 0.))
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.get_ham()
+        '''
+        error_handling.sites(self.lat.sites)
+        prim_vec = self.lat.prim_vec
+        if isinstance(periodic, bool):
+            periodic = (periodic, periodic and len(prim_vec) == 2)
+        error_handling.list_tuple_2elem(periodic, 'periodic')
+        for per in periodic:
+            error_handling.boolean(per, 'periodic')
+        if periodic[1] and len(prim_vec) == 1:
+            raise ValueError('\n\n1D lattices can only be periodic along a1.\n')
+        a1 = np.array(prim_vec[0], 'f8')
+        a2 = np.array(prim_vec[1], 'f8') if len(prim_vec) == 2 else np.array([-a1[1], a1[0]])
+        self.supercell = np.column_stack([self.lat.n1 * a1, self.lat.n2 * a2])
+        self.periodic = np.array(periodic, bool)
+        self.store_hop = {}
+        self.vec_hop = np.array([], dtype=[('dis', 'f8'),  ('ang', 'f8')])
+        self.set_twist(twist)
+
+    def set_twist(self, twist):
+        '''
+        Set the twist angles of the boundary conditions 
+        (see *set_periodic*). The hoppings are unchanged, 
+        the Bloch phases are added by *get_ham*.
+
+        :param twist: List of two real numbers. Twist angles.
+        '''
+        error_handling.list_tuple_2elem(twist, 'twist')
+        for theta in twist:
+            error_handling.real_number(theta, 'twist')
+        self.twist = np.array(twist, 'f8') * self.periodic
+
+    def min_image(self, dif_x, dif_y):
+        '''
+        Private method.
+        Get the minimum image vectors and the numbers of 
+        supercell vectors (w1, w2) subtracted.
+        '''
+        frac = np.tensordot(LA.inv(self.supercell), np.array([dif_x, dif_y]), axes=1)
+        wrap = np.round(frac) * self.periodic.reshape((2,) + (1,) * np.ndim(dif_x))
+        dif = np.tensordot(self.supercell, frac - wrap, axes=1)
+        return dif[0], dif[1], wrap.astype(int)
+
+    def get_bloch_phase(self, i, j):
+        '''
+        Private method.
+        Get the numbers of supercell vectors crossed by the hoppings (i, j).
+        '''
+        dif_x = self.lat.coor['x'][j] - self.lat.coor['x'][i]
+        dif_y = self.lat.coor['y'][j] - self.lat.coor['y'][i]
+        return self.min_image(dif_x, dif_y)[2].T
+
+    def get_twist_average(self, func, n_twist=4):
+        r'''
+        Average a quantity over the twist angles 
+        :math:`\theta_i = 2\pi m_i / n_{twist}` of the periodic directions.
+        The sparsity pattern of the Hamiltonian is built once and only 
+        the Bloch phases of the wrapped hoppings are updated.
+
+        :param func: Function. Quantity computed from the sparse Hamiltonian.
+        :param n_twist: Positive integer. Default value 4.
+            Number of twist angles per periodic direction.
+
+        :returns:
+            * **average** -- Average of *func(ham)*.
+
+        Example usage::
+
+            en = sys.get_twist_average(lambda ham: LA.eigvalsh(ham.toarray()), n_twist=8)
+        '''
+        error_handling.empty_hop(self.hop)
+        if not self.periodic.any():
+            raise RuntimeError('\n\nRun method set_periodic first.\n')
+        error_handling.function(func, 'func')
+        error_handling.positive_int(n_twist, 'n_twist')
+        pattern = self.get_pattern()
+        wrap = self.get_bloch_phase(self.hop['i'], self.hop['j'])
+        thetas = [2 * PI * np.arange(n_twist) / n_twist if per else [0.] for per in self.periodic]
+        results = []
+        for theta1 in thetas[0]:
+            for theta2 in thetas[1]:
+                phase = -np.dot(wrap, [theta1, theta2])
+                results.append(func(fill_pattern(pattern, phase)))
+        return np.mean(results, axis=0)
+
+    def get_pattern(self):
+        '''
+        Private method.
+        Get the CSR pattern of the Hamiltonian, with, for each stored entry,
+        the hopping index and the sign of the phases added to the hoppings 
+        (-1 for the lower part, 0 for the onsite energies).
+        '''
+        sites = self.lat.sites
+        bond = np.arange(len(self.hop))
+        i, j = self.hop['i'].astype(int), self.hop['j'].astype(int)
+        t = self.hop['t'].astype(complex)
+        sign = np.ones(len(self.hop), int)
+        if np.all(self.hop['ang'] >= 0) or np.all(self.hop['ang'] < 0):
+            i, j = np.concatenate([i, j]), np.concatenate([j, i])
+            t, sign = np.concatenate([t, t.conj()]), np.concatenate([sign, -sign])
+            bond = np.concatenate([bond, bond])
+        if self.onsite.size == sites:
+            i, j = np.concatenate([i, np.arange(sites)]), np.concatenate([j, np.arange(sites)])
+            t = np.concatenate([t, self.onsite])
+            sign = np.concatenate([sign, np.zeros(sites, int)])
+            bond = np.concatenate([bond, np.zeros(sites, int)])
+        keys, slot = np.unique(i * sites + j, return_inverse=True)
+        return {'sites': sites, 't': t, 'sign': sign, 'bond': bond, 'slot': slot.ravel(), 
+                    'indices': keys % sites, 'indptr': np.searchsorted(keys // sites, np.arange(sites + 1))}
+
+    def set_magnetic_field(self, flux, gauge='landau'):
+        r'''
+        Set a uniform magnetic field by Peierls substitution:
+
+        .. math::
+
+            t_{ij} \rightarrow t_{ij}\, e^{i\phi_{ij}}, \quad 
+            \phi_{ij} = 2\pi\int_{\mathbf{r}_j}^{\mathbf{r}_i}\mathbf{A}\cdot d\mathbf{l},
+
+        the vector potential being in units of the flux quantum.
+        The phases of all the hoppings are computed at once from the 
+        site coordinates. The phases are added to the current hoppings 
+        (run *set_hopping* again to remove the field).
+
+        :param flux: Real number. Flux per unit cell (in units of the flux quantum).
+        :param gauge: String or Function. Default value 'landau'. 
+
+            * 'landau', :math:`\mathbf{A} = B(-y, 0)`.
+            * 'symmetric', :math:`\mathbf{A} = B(-y, x)/2`.
+            * Function (x, y) -> (Ax, Ay), vector potential of a unit field, 
+              integrated by the midpoint rule (exact for uniform fields).
+
+        Example usage::
+
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.set_magnetic_field(1. / 7)
+            sys.get_ham()
+        '''
+        error_handling.empty_hop(self.hop)
+        error_handling.real_number(flux, 'flux')
+        phase = self.get_peierls(gauge)
+        self.hop.assign('t', Ellipsis, self.hop['t'] * np.exp(1j * flux * phase))
+
+    def get_peierls(self, gauge):
+        '''
+        Private method.
+        Get the Peierls phases of the hoppings for a unit flux per unit cell.
+        '''
+        if len(self.lat.prim_vec) != 2:
+            raise ValueError('\n\nThe magnetic field needs a 2D lattice.\n')
+        if not callable(gauge) and gauge not in ('landau', 'symmetric'):
+            raise ValueError('\n\nParameter gauge must be \'landau\', \'symmetric\' or a function.\n')
+        x_i, y_i = self.lat.coor['x'][self.hop['i']], self.lat.coor['y'][self.hop['i']]
+        x_j, y_j = self.lat.coor['x'][self.hop['j']], self.lat.coor['y'][self.hop['j']]
+        if gauge == 'landau':
+            integral = -0.5 * (x_i - x_j) * (y_i + y_j)
+        elif gauge == 'symmetric':
+            integral = 0.5 * (x_j * y_i - x_i * y_j)
+        else:
+            a_x, a_y = gauge(0.5 * (x_i + x_j), 0.5 * (y_i + y_j))
+            integral = a_x * (x_i - x_j) + a_y * (y_i - y_j)
+        area = abs(np.linalg.det(np.array(self.lat.prim_vec, 'f8')))
+        return 2 * PI / area * np.asarray(integral, 'f8')
+
+    def get_flux_sweep(self, fluxes, gauge='landau', processes=1):
+        '''
+        Get the spectra for a set of fluxes (Hofstadter butterfly). 
+        The CSR pattern of the Hamiltonian is built once, only the 
+        values of the entries are updated, and the dense diagonalisations 
+        are distributed over a process pool.
+
+        :param fluxes: List or np.ndarray of real numbers. 
+            Fluxes per unit cell (see *set_magnetic_field*).
+        :param gauge: String or Function. Default value 'landau'. 
+            Gauge (see *set_magnetic_field*).
+        :param processes: Positive integer. Default value 1. 
+            Number of worker processes (number of CPUs if None). 
+
+        :returns:
+            * **butterfly** -- Energies of shape (number of fluxes, sites), 
+              to be plotted with *plot.butterfly*.
+
+        Example usage::
+
+            fluxes = np.linspace(0., 1., 500)
+            butterfly = sys.get_flux_sweep(fluxes, processes=8)
+            fig = plt.butterfly(fluxes, butterfly, xlabel=r'$\phi/\phi_0$')
+        '''
+        error_handling.empty_hop(self.hop)
+        error_handling.ndarray_empty(np.asarray(fluxes, 'f8'), 'fluxes')
+        if processes is not None:
+            error_handling.positive_int(processes, 'processes')
+        fluxes = np.asarray(fluxes, 'f8').ravel()
+        pattern = self.get_pattern()
+        phase = self.get_peierls(gauge)
+        with ProcessPoolExecutor(max_workers=processes) if processes != 1 else serial() as pool:
+            butterfly = list(pool.map(flux_eig, [pattern] * len(fluxes), 
+                                                    [phase] * len(fluxes), fluxes))
+        return np.array(butterfly)
+
+    def get_continuation(self, func, params, k=6, largest=False, tol=1e-8, maxiter=200):
+        '''
+        Follow *k* extremal eigenpairs of Hermitian Hamiltonians along 
+        a parameter sweep (strain, disorder, flux, ...).
+
+        The first point is solved by *eigsh*, and each following point by 
+        *lobpcg* seeded with the eigenvectors of the previous point and 
+        preconditioned by :math:`(H-\\sigma)^{-1}`, :math:`\\sigma` being just 
+        beyond the previous levels, so that slowly varying Hamiltonians 
+        converge in a few iterations. 
+        The states are tracked across the sweep by maximising the overlaps 
+        with the previous eigenvectors (*linear_sum_assignment*) among *k* 
+        plus a few guard states, so that individual levels can be followed 
+        through crossings.
+
+        :param func: Function param -> sparse Hermitian Hamiltonian.
+        :param params: List or np.ndarray. Parameter values.
+        :param k: Positive integer. Default value 6. Number of eigenpairs.
+        :param largest: Boolean. Default value False. 
+            If True, follow the largest eigenenergies, else the smallest.
+        :param tol: Positive number. Default value 1e-8. Solver tolerance.
+        :param maxiter: Positive integer. Default value 200. 
+            Maximum number of *lobpcg* iterations per point.
+
+        :returns:
+            * **en** -- Tracked eigenenergies of shape (number of parameters, k), 
+              the column *n* following the level *n* of the first point.
+            * **iters** -- Number of *lobpcg* iterations per point 
+              (0 for the first point).
+
+        Example usage::
+
+            sys.get_ham()
+            dis = np.random.uniform(-1., 1., sys.lat.sites)
+            alphas = np.linspace(0., 0.5, 100)
+            en, iters = sys.get_continuation(lambda a: sys.ham + a * sparse.diags(dis), alphas)
+        '''
+        error_handling.function(func, 'func')
+        error_handling.ndarray_empty(np.asarray(params), 'params')
+        error_handling.positive_int_lim(k, 'k', self.lat.sites-2)
+        error_handling.boolean(largest, 'largest')
+        error_handling.positive_real(tol, 'tol')
+        error_handling.positive_int(maxiter, 'maxiter')
+        en = np.empty((len(params), k))
+        iters = np.zeros(len(params), int)
+        # guard vectors: the tracked levels are searched among k + guard states
+        block = min(k + max(2, k // 2), self.lat.sites - 2)
+        vec = None
+        for n, param in enumerate(params):
+            ham = sparse.csr_matrix(func(param))
+            if vec is None:
+                en_n, vec_n = eigsh(ham, k=block, which='LA' if largest else 'SA', tol=tol)
+                order = np.argsort(-en_n if largest else en_n)
+            else:
+                # preconditioner (H-sigma)^-1, with sigma beyond the previous levels
+                spread = en_n.max() - en_n.min() + 1e-2
+                sigma = en_n.max() + spread if largest else en_n.min() - spread
+                shift = ham - sigma * sparse.identity(ham.shape[0], format='csr')
+                lu = splu((-shift if largest else shift).tocsc())
+                precond = LinearOperator(ham.shape, matvec=lu.solve, matmat=lu.solve, dtype=ham.dtype)
+                en_n, vec_n, res = lobpcg(ham, vec.astype(np.result_type(vec, ham)), M=precond, 
+                                                   tol=tol, maxiter=maxiter, largest=largest, 
+                                                   retResidualNormsHistory=True)
+                iters[n] = len(res)
+                # tracking by maximal overlaps with the previous states
+                overlap = np.abs(np.dot(vec[:, :k].conj().T, vec_n)) ** 2
+                order = linear_sum_assignment(-overlap)[1]
+                order = np.concatenate([order, np.setdiff1d(np.arange(block), order)])
+            en_n, vec = en_n[order].real, vec_n[:, order]
+            en[n] = en_n[:k]
+        return en, iters
+
     def print_distances(self, n=1):
         '''
         Print distances and positive angles (in degrees) :math:`\phi_+\in[0, 180)` 
@@ -104,28 +443,81 @@ class system():
         '''
         error_handling.sites(self.lat.sites)
         error_handling.set_onsite(dict_onsite, self.lat.tags)
-        self.onsite = np.zeros(self.lat.sites, 'c16')
+        self.onsite = np.zeros(self.lat.sites, PRECISION[self.precision][0])
         for tag, on in dict_onsite.items():
-            self.onsite[self.lat.coor['tag'] ==tag] = on
+            self.assign_onsite(self.lat.coor.equal('tag', tag), on)
+
+    def set_onsite_func(self, func, chunk=None):
+        '''
+        Set onsite energies given by a function of the site coordinates and tags, 
+        evaluated on arrays of sites (at once, or by blocks of *chunk* sites).
+
+        :param func: Function (x, y, tag) -> onsite energies. 
+            *x*, *y* are np.ndarrays of coordinates and *tag* 
+            a np.ndarray of binary chars.
+        :param chunk: Positive integer. Default value None. 
+            Number of sites per evaluation (all the sites if None).
+
+        Example usage::
+
+            # Gaussian potential
+            sys.set_onsite_func(lambda x, y, tag: np.exp(-(x ** 2 + y ** 2) / 20.))
+        '''
+        error_handling.sites(self.lat.sites)
+        error_handling.function(func, 'func')
+        if chunk is not None:
+            error_handling.positive_int(chunk, 'chunk')
+        sites = self.lat.sites
+        chunk = sites if chunk is None else chunk
+        self.onsite = np.zeros(sites, PRECISION[self.precision][0])
+        for start in range(0, sites, chunk):
+            sl = slice(start, min(start + chunk, sites))
+            on = func(self.lat.coor['x'][sl], self.lat.coor['y'][sl], self.lat.coor['tag'][sl])
+            error_handling.func_values(on, sl.stop - sl.start, 'func')
+            self.assign_onsite(sl, on)
+
+    def assign_onsite(self, index, value):
+        '''
+        Private method.
+        Assign onsite energies. *onsite* is upcast to complex 
+        only if *value* has a nonzero imaginary part.
+        '''
+        if np.iscomplexobj(value) and not np.iscomplexobj(self.onsite):
+            if np.any(np.imag(value)):
+                self.onsite = self.onsite.astype(PRECISION[self.precision][1])
+            else:
+                value = np.real(value)
+        self.onsite[index] = value
 
     def fill_store_hop(self, n):
         '''
         Private method.
 
-        Store in *store_hop* indices (with :math:`i < j`), positive angles, and tags
-        of a given type of hopping.
+        Store in *store_hop* indices, positive angles, and tags
+        of a given type of hopping. Each hopping is oriented from *i* to *j* 
+        along its direction *ang* in [0, 180).
         '''
         ind = np.argwhere(np.isclose(self.dist_uni[n], self.vec_hop['dis'], atol=ATOL))
-        ind_up = ind[ind[:, 1] > ind[:, 0]]
-        hop = np.zeros(len(ind_up), dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                                 ('ang', 'f8'), ('tag', 'S2')])
-        hop['i'] = ind_up[:, 0]
-        hop['j'] = ind_up[:, 1]
-        hop['ang'] = self.vec_hop['ang'][ind_up[:, 0], ind_up[:, 1]]
-        hop['tag'] = npc.add(self.lat.coor['tag'][ind_up[:, 0]], 
-                                         self.lat.coor['tag'][ind_up[:, 1]])
+        ind = ind[ind[:, 1] > ind[:, 0]]
+        i, j, ang = orient(ind[:, 0], ind[:, 1], self.vec_hop['ang'][ind[:, 0], ind[:, 1]])
+        hop = table([('n', 'u2'), ('i', 'u4'), ('j', 'u4'), ('ang', 'f4'), ('tag', 'S2')], len(i))
+        hop['i'] = i
+        hop['j'] = j
+        hop['ang'] = ang
+        hop['tag'] = self.tag_pair(i, j)
         self.store_hop[n] = hop
 
+    def tag_pair(self, i, j):
+        '''
+        Private method.
+        Get the uint8 codes of the hopping tags from the site indices.
+
+        :param i: Array. Indices of the first sites.
+        :param j: Array. Indices of the second sites.
+        '''
+        code = self.lat.coor.code('tag')
+        return np.column_stack([code[i], code[j]])
+
     def set_hopping(self, list_hop, upper_part=True):
         '''
         Set lattice hoppings.
@@ -156,8 +548,8 @@ class system():
 
         :param upper_part: Boolean. Default value True. 
             
-            * True get hoppings with (:math:`i<j`) *i.e.* fill the Hamiltonian lower part.
-            * False get hoppings with (:math:`i>j`) *i.e.* fill the Hamiltonian upper part.
+            * True get hoppings with angles in [0, 180) *i.e.* fill the Hamiltonian upper part.
+            * False get hoppings with angles in [-180, 0) *i.e.* fill the Hamiltonian lower part.
 
         Example usage::
 
@@ -210,9 +602,9 @@ class system():
             if len(dic) == 2:
                 size = len(self.store_hop[dic['n']])
                 if upper_part:
-                    mask = (self.hop['n'] == dic['n']) & (self.hop['i'] < self.hop['j'])
+                    mask = (self.hop['n'] == dic['n']) & (self.hop['ang'] >= 0)
                 else:
-                    mask = (self.hop['n'] == dic['n']) & (self.hop['i'] > self.hop['j'])
+                    mask = (self.hop['n'] == dic['n']) & (self.hop['ang'] < 0)
                 if np.sum(mask):
                     self.hop = self.hop[np.logical_not(mask)]
                 ind = np.ones(size, bool)
@@ -235,15 +627,15 @@ class system():
                     tag_store = dic['tag']
                 else:
                     tag_store = dic['tag'][::-1]
-                size = np.sum(self.store_hop[dic['n']]['tag'] == tag_store)
-                mask = (self.hop['n'] == dic['n']) & (self.hop['tag'] == dic['tag'])
+                size = np.sum(self.store_hop[dic['n']].equal('tag', tag_store))
+                mask = (self.hop['n'] == dic['n']) & self.hop.equal('tag', dic['tag'])
                 if upper_part:
-                    mask = self.hop['n'] == dic['n'] & (self.hop['tag'] == dic['tag']) & (self.hop['i'] < self.hop['j'])
+                    mask = (self.hop['n'] == dic['n']) & self.hop.equal('tag', dic['tag']) & (self.hop['ang'] >= 0)
                 else:
-                    mask = self.hop['n'] == dic['n'] & (self.hop['tag'] == dic['tag']) & (self.hop['i'] > self.hop['j'])
+                    mask = (self.hop['n'] == dic['n']) & self.hop.equal('tag', dic['tag']) & (self.hop['ang'] < 0)
                 if np.sum(mask):
                     self.hop = self.hop[np.logical_not(mask)]
-                ind = self.store_hop[dic['n']]['tag'] == tag_store
+                ind = self.store_hop[dic['n']].equal('tag', tag_store)
                 error_handling.index(ind, dic)
                 hop = self.set_given_hopping(dic['n'], size, dic, ind, upper_part=upper_part)
             else:
@@ -257,18 +649,18 @@ class system():
                     tag_store = dic['tag']
                 else:
                     tag_store = dic['tag'][::-1]
-                size = np.sum((self.store_hop[dic['n']]['tag'] == tag_store) & 
+                size = np.sum(self.store_hop[dic['n']].equal('tag', tag_store) & 
                                        (np.isclose(ang_store, self.store_hop[dic['n']]['ang'], atol=ATOL)))
-                bool1 = (self.hop['n'] == dic['n']) & (self.hop['tag'] == dic['tag'])
+                bool1 = (self.hop['n'] == dic['n']) & self.hop.equal('tag', dic['tag'])
                 bool2 = np.isclose(self.hop['ang'], dic['ang'], atol=ATOL)
                 mask = bool1 & bool2
                 if np.sum(mask):
                     self.hop = self.hop[np.logical_not(mask)]
-                ind = ((self.store_hop[dic['n']]['tag'] == tag_store) & 
+                ind = (self.store_hop[dic['n']].equal('tag', tag_store) & 
                           (np.isclose(ang_store, self.store_hop[dic['n']]['ang'], atol=1)))
                 error_handling.index(ind, dic)
                 hop = self.set_given_hopping(dic['n'], size, dic, ind, upper_part=upper_part)
-            self.hop = np.concatenate([self.hop, hop])
+            self.hop = table.concatenate([self.hop, hop])
 
     def check_sites(self):
         '''
@@ -289,10 +681,9 @@ class system():
         :param size: Integer. Number of hoppings.
         :param doc: Dictionary. Hopping dictionary.
         :param mask: np.ndarray. Mask.
-        :param upper_part: Boolean. If True, self.hop['i'] < self.hop['j'].
+        :param upper_part: Boolean. If True, self.hop['ang'] in [0, 180).
         '''
-        hop = np.empty(size, dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                      ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')])
+        hop = table(self.hop.dtype, size)
         hop['n'] = dic['n']
         hop['t'] = dic['t']
         if upper_part:
@@ -304,10 +695,49 @@ class system():
             hop['i'] = self.store_hop[n]['j'][mask]
             hop['j'] = self.store_hop[n]['i'][mask]
             hop['ang'] = self.store_hop[n]['ang'][mask] - 180
-            hop['tag'] = npc.add(self.lat.coor['tag'][hop['i']], 
-                                            self.lat.coor['tag'][hop['j']])
+            hop['tag'] = self.tag_pair(hop['i'], hop['j'])
         return hop
 
+    def set_hopping_func(self, func, n=None, chunk=None):
+        '''
+        Set the hoppings given by a function of the coordinates, tags, 
+        and angles of the hoppings, evaluated on arrays of hoppings 
+        (at once, or by blocks of *chunk* hoppings). The hoppings 
+        must be set first by *set_hopping*, which defines the connectivity.
+
+        :param func: Function (x_i, y_i, x_j, y_j, tag_i, tag_j, ang) -> hoppings.
+            np.ndarrays of coordinates, tags (binary chars), and 
+            angles (in degrees) of the hoppings. The angles are the 
+            directions from (x_i, y_i) to (x_j, y_j), and the hoppings 
+            are the Hamiltonian entries :math:`H_{ij}`.
+        :param n: Positive integer. Default value None. 
+            Type of hoppings (all the hoppings if None).
+        :param chunk: Positive integer. Default value None. 
+            Number of hoppings per evaluation (all the hoppings if None).
+
+        Example usage::
+
+            # exponential dependence on the bond length
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.set_hopping_func(lambda xi, yi, xj, yj, ti, tj, ang: 
+                                          np.exp(-3.37 * (np.hypot(xj - xi, yj - yi) - 1.)))
+        '''
+        error_handling.empty_hop(self.hop)
+        error_handling.function(func, 'func')
+        if n is not None:
+            error_handling.positive_int(n, 'n')
+        if chunk is not None:
+            error_handling.positive_int(chunk, 'chunk')
+        ind = np.arange(len(self.hop)) if n is None else np.flatnonzero(self.hop['n'] == n)
+        chunk = max(1, len(ind)) if chunk is None else chunk
+        coor, i, j = self.lat.coor, self.hop['i'], self.hop['j']
+        for start in range(0, len(ind), chunk):
+            sl = ind[start: start + chunk]
+            t = func(coor['x'][i[sl]], coor['y'][i[sl]], coor['x'][j[sl]], coor['y'][j[sl]],
+                       coor['tag'][i[sl]], coor['tag'][j[sl]], self.hop['ang'][sl])
+            error_handling.func_values(t, len(sl), 'func')
+            self.hop.assign('t', sl, t)
+
     def set_hopping_manual(self, dict_hop, upper_part=True):
         '''
         Set hoppings manually.
@@ -320,15 +750,13 @@ class system():
             * True, fill the Hamiltonian upper part.
             * False, fill the Hamiltonian lower part.  
         '''
-        hop = np.zeros(len(dict_hop), dtype=[('n', 'u2'), ('i', 'u4'), ('j', 'u4'), 
-                                                                    ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')])
+        hop = table(self.hop.dtype, len(dict_hop))
         i = [h[0] for h in dict_hop.keys()]
         j = [h[1] for h in dict_hop.keys()]
         t = [val for val in dict_hop.values()]
         hop['i'],  hop['j']= i, j
         hop['t'] = t 
-        hop['tag'] = npc.add(self.lat.coor['tag'][i], 
-                                        self.lat.coor['tag'][j])
+        hop['tag'] = self.tag_pair(i, j)
         ang = 180 / PI * np.arctan2(self.lat.coor['y'][j]-self.lat.coor['y'][i],
                                                     self.lat.coor['x'][j]-self.lat.coor['x'][i])
         if upper_part:
@@ -336,7 +764,214 @@ class system():
         else:
             ang[ang >= 0] -= 180
         hop['ang'] = ang
-        self.hop = np.concatenate([self.hop, hop])
+        self.hop = table.concatenate([self.hop, hop])
+
+    def clear_eig(self):
+        '''
+        Private method.
+        Clear the eigenvalue problem solutions.
+        '''
+        real, cplx = PRECISION[self.precision]
+        self.en = np.array([], real)  # Eigenenergies (complex if needed)
+        self.rn = np.array([], real)  # Right eigenvectors: H |rn> = en |rn>
+        self.ln = np.array([], cplx)  # Left eigenvectors:  <ln| H = en <ln|
+        self.intensity = np.array([], real)  # Intensities (|rn|**2), if requested
+        self.pola = np.array([], real)  # sublattices polarisation (|rn^{(S)}|**2)
+        self.petermann = np.array([], real)  # Inverse Participation Ratio
+        self.sector = np.array([], 'i4')  # Symmetry sectors of the eigenstates
+
+    def remove_sites(self, index):
+        '''
+        Remove sites defined by their indices and update *hop*, *onsite*,
+        and *ham* without rebuilding the system.
+        Hoppings connected to the removed sites are deleted and the
+        remaining site indices are shifted.
+
+        :param index: List. Site indices to be removed.
+
+        Example usage::
+
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.get_ham()
+            sys.remove_sites([0, 2])
+        '''
+        error_handling.empty_coor(self.lat.coor)
+        error_handling.remove_sites(index, self.lat.sites)
+        mask = np.ones(self.lat.sites, bool)
+        mask[index] = False
+        ind_new = np.cumsum(mask) - 1
+        self.lat.remove_sites(index)
+        keep = mask[self.hop['i']] & mask[self.hop['j']]
+        self.hop = self.hop[keep]
+        self.hop['i'] = ind_new[self.hop['i']]
+        self.hop['j'] = ind_new[self.hop['j']]
+        for n, hop in self.store_hop.items():
+            hop = hop[mask[hop['i']] & mask[hop['j']]]
+            hop['i'] = ind_new[hop['i']]
+            hop['j'] = ind_new[hop['j']]
+            self.store_hop[n] = hop
+        if self.onsite.size:
+            self.onsite = self.onsite[mask]
+        if self.perm is not None:
+            self.perm = self.perm[mask]
+        if self.vec_hop.size:
+            self.vec_hop = self.vec_hop[np.ix_(mask, mask)]
+        if self.ham.shape[0] == mask.size:
+            self.ham = self.ham[mask][:, mask]
+        else:
+            self.ham = sparse.csr_matrix(([], ([], [])), shape=(self.lat.sites, self.lat.sites))
+        self.sites = self.lat.sites
+        self.clear_eig()
+
+    def add_sites(self, coor, list_hop, dict_onsite=None, upper_part=True):
+        '''
+        Add sites and connect them to the lattice without rebuilding the system.
+        Only the neighbours of the new sites are searched for,
+        among the new sites and the old sites of the seam region.
+
+        :param coor: Structured array with keys: {'x', 'y', 'tag'}. New sites.
+        :param list_hop: List of Dictionaries (see set_hopping definition).
+            Hoppings with, at least, one new site.
+        :param dict_onsite: Dictionary. Default value None.
+            Onsite energies of the new sites (see set_onsite definition).
+            If None, onsite energies of the new sites set to zero.
+        :param upper_part: Boolean. Default value True.
+
+            * True get hoppings with angles in [0, 180) *i.e.* fill the Hamiltonian upper part.
+            * False get hoppings with angles in [-180, 0) *i.e.* fill the Hamiltonian lower part.
+
+        Example usage::
+
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.get_ham()
+            coor = np.array([(-1., 0, b'a')], dtype=[('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+            sys.add_sites(coor, [{'n': 1, 't': 1.}])
+
+        .. note::
+
+            The hopping types 'n' refer to the distances of *dist_uni*
+            computed before adding the sites.
+        '''
+        error_handling.coor(coor)
+        error_handling.empty_hop(self.hop)
+        error_handling.boolean(upper_part, 'upper_part')
+        error_handling.set_hopping(list_hop, self.nmax)
+        tags = np.unique(np.concatenate([self.lat.tags, coor['tag']]))
+        if dict_onsite is not None:
+            error_handling.set_onsite(dict_onsite, tags)
+        sites_old, sites_new = self.lat.sites, len(coor)
+        # new ordering of the sites
+        coor_all = table.concatenate([self.lat.coor, coor])
+        ind_sort = coor_all.argsort(('y', 'x'))
+        ind_new = np.empty(len(coor_all), 'u4')
+        ind_new[ind_sort] = np.arange(len(coor_all))
+        # neighbours of the new sites in the seam region
+        dis_max = self.dist_uni[max(dic['n'] for dic in list_hop)] + ATOL
+        seam = np.argwhere((self.lat.coor['x'] > coor['x'].min() - dis_max) &
+                                       (self.lat.coor['x'] < coor['x'].max() + dis_max) &
+                                       (self.lat.coor['y'] > coor['y'].min() - dis_max) &
+                                       (self.lat.coor['y'] < coor['y'].max() + dis_max)).ravel()
+        tree_new = cKDTree(np.column_stack([coor['x'], coor['y']]))
+        pairs_new = tree_new.query_pairs(dis_max, output_type='ndarray') + sites_old
+        if seam.size:
+            tree_seam = cKDTree(np.column_stack([self.lat.coor['x'][seam],
+                                                                    self.lat.coor['y'][seam]]))
+            pairs_seam = tree_new.sparse_distance_matrix(tree_seam, dis_max,
+                                                                            output_type='ndarray')
+            pairs_seam = np.column_stack([seam[pairs_seam['j']],
+                                                         pairs_seam['i'] + sites_old])
+            pairs = np.concatenate([pairs_seam, pairs_new])
+        else:
+            pairs = pairs_new
+        i, j = ind_new[pairs[:, 0]], ind_new[pairs[:, 1]]
+        # update the lattice
+        self.lat.coor = coor_all[ind_sort]
+        self.lat.sites = len(coor_all)
+        self.lat.tags = tags
+        self.sites = self.lat.sites
+        # classify the new edges
+        dif_x = self.lat.coor['x'][j] - self.lat.coor['x'][i]
+        dif_y = self.lat.coor['y'][j] - self.lat.coor['y'][i]
+        dis = np.sqrt(dif_x ** 2 + dif_y ** 2)
+        n = np.searchsorted(self.dist_uni, dis - ATOL)
+        n[n == len(self.dist_uni)] = 0
+        valid = (n > 0) & np.isclose(self.dist_uni[n], dis, atol=ATOL)
+        store = table([('n', 'u2'), ('i', 'u4'), ('j', 'u4'), ('ang', 'f4'), ('tag', 'S2')],
+                           np.sum(valid))
+        store['n'] = n[valid]
+        store['i'], store['j'], store['ang'] = orient(i[valid], j[valid], 
+                                                                     180 / PI * np.arctan2(dif_y[valid], dif_x[valid]))
+        store['tag'] = self.tag_pair(store['i'], store['j'])
+        # update the old hoppings
+        self.hop['i'] = ind_new[self.hop['i']]
+        self.hop['j'] = ind_new[self.hop['j']]
+        if np.all(np.diff(ind_new[:sites_old].astype('i8')) > 0):
+            for n_store, hop in self.store_hop.items():
+                hop['i'] = ind_new[hop['i']]
+                hop['j'] = ind_new[hop['j']]
+                self.store_hop[n_store] = table.concatenate([hop, store[store['n'] == n_store]])
+        else:
+            self.store_hop = {}
+        # set the new hoppings
+        if any(np.imag(dic['t']) for dic in list_hop):
+            t = np.full(len(store), np.nan, PRECISION[self.precision][1])
+        else:
+            t = np.full(len(store), np.nan, PRECISION[self.precision][0])
+        for dic in list_hop:
+            ind = store['n'] == dic['n']
+            if 'ang' in dic:
+                ang_store = dic['ang'] if dic['ang'] >= 0 else dic['ang'] + 180.
+                ind &= np.isclose(store['ang'], ang_store, atol=ATOL)
+            if 'tag' in dic:
+                tag_store = dic['tag'] if upper_part else dic['tag'][::-1]
+                ind &= store.equal('tag', tag_store)
+            t[ind] = dic['t'] if np.iscomplexobj(t) else np.real(dic['t'])
+        ind = np.logical_not(np.isnan(t))
+        hop = table(self.hop.dtype, np.sum(ind))
+        hop['n'] = store['n'][ind]
+        hop['t'] = t[ind]
+        if upper_part:
+            hop['i'], hop['j'] = store['i'][ind], store['j'][ind]
+            hop['ang'] = store['ang'][ind]
+            hop['tag'] = store['tag'][ind]
+        else:
+            hop['i'], hop['j'] = store['j'][ind], store['i'][ind]
+            hop['ang'] = store['ang'][ind] - 180
+            hop['tag'] = self.tag_pair(hop['i'], hop['j'])
+        self.hop = table.concatenate([self.hop, hop])
+        # update the onsite energies
+        if self.onsite.size or dict_onsite is not None:
+            onsite = self.onsite
+            self.onsite = np.zeros(self.lat.sites, onsite.dtype)
+            if onsite.size:
+                self.onsite[ind_new[:sites_old]] = onsite
+            if dict_onsite is not None:
+                tag_new = self.lat.coor[ind_new[sites_old:]]
+                for tag, on in dict_onsite.items():
+                    self.assign_onsite(ind_new[sites_old:][tag_new.equal('tag', tag)], on)
+        self.vec_hop = np.array([], dtype=[('dis', 'f8'),  ('ang', 'f8')])
+        self.perm = None
+        if self.ham.nnz:
+            self.get_ham()
+        else:
+            self.ham = sparse.csr_matrix(([], ([], [])), shape=(self.lat.sites, self.lat.sites))
+        self.clear_eig()
+
+    def add_lattice(self, lat, list_hop, dict_onsite=None, upper_part=True):
+        '''
+        Merge a lattice without rebuilding the system.
+        Only the neighbours of the sites of *lat* are searched for.
+
+        :param lat: **lattice** class instance.
+        :param list_hop: List of Dictionaries (see set_hopping definition).
+            Hoppings with, at least, one site of *lat*.
+        :param dict_onsite: Dictionary. Default value None.
+            Onsite energies of the sites of *lat* (see set_onsite definition).
+        :param upper_part: Boolean. Default value True (see add_sites definition).
+        '''
+        error_handling.lat(lat)
+        error_handling.empty_coor(lat.coor)
+        self.add_sites(lat.coor, list_hop, dict_onsite=dict_onsite, upper_part=upper_part)
 
     def  set_hopping_dis(self, alpha):
         '''
@@ -351,7 +986,7 @@ class system():
         '''
         error_handling.empty_hop(self.hop)
         error_handling.number(alpha, 'alpha')
-        self.hop['t'] *= 1. + alpha * rand.uniform(-1., 1., len(self.hop))
+        self.hop['t'] = self.hop['t'] * (1. + alpha * rand.uniform(-1., 1., len(self.hop)))
 
     def set_onsite_dis(self, alpha):
         '''
@@ -366,7 +1001,7 @@ class system():
         '''
         error_handling.empty_onsite(self.onsite)
         error_handling.number(alpha, 'alpha')
-        self.onsite += alpha * rand.uniform(-1., 1., self.lat.sites)
+        self.assign_onsite(Ellipsis, self.onsite + alpha * rand.uniform(-1., 1., self.lat.sites))
 
     def set_onsite_def(self, onsite_def):
         '''
@@ -382,7 +1017,7 @@ class system():
         error_handling.empty_onsite(self.onsite)
         error_handling.set_onsite_def(onsite_def, self.lat.sites)
         for i, o in onsite_def.items():
-            self.onsite[i] = o
+            self.assign_onsite(i, o)
 
     def set_hopping_def(self, hopping_def):
         '''
@@ -397,12 +1032,14 @@ class system():
         '''
         error_handling.empty_hop(self.hop)
         error_handling.set_hopping_def(self.hop, hopping_def, self.lat.sites)
+        hermitian = np.all(self.hop['ang'] >= 0) or np.all(self.hop['ang'] < 0)
         for key, val in hopping_def.items():
             cond = (self.hop['i'] == key[0]) & (self.hop['j'] == key[1])
-            self.hop['t'][cond] = val
-            self.hop['ang'] = self.vec_hop['ang'][key[0], key[1]]
-            self.hop['tag'] = npc.add(self.lat.coor['tag'][key[0]],
-                                                   self.lat.coor['tag'][key[1]])
+            self.hop.assign('t', cond, val)
+            if hermitian:
+                # hoppings oriented from key[1] to key[0]
+                cond = (self.hop['i'] == key[1]) & (self.hop['j'] == key[0])
+                self.hop.assign('t', cond, np.conj(val))
 
     def set_new_hopping(self, list_hop, ind):
         '''
@@ -414,14 +1051,14 @@ class system():
         '''
         for dic in list_hop:
             if len(dic) == 2:
-                self.hop['t'][ind] = dic['t']
+                self.hop.assign('t', ind, dic['t'])
             elif len(dic) == 3 and 'ang' in dic:
-                self.hop['t'][ind & (self.hop['ang'] == dic['ang'])] = dic['t']
+                self.hop.assign('t', ind & (self.hop['ang'] == dic['ang']), dic['t'])
             elif len(dic) == 3 and 'tag' in dic:
-                self.hop['t'][ind & (self.hop['tag'] == dic['tag'])] = dic['t']
+                self.hop.assign('t', ind & self.hop.equal('tag', dic['tag']), dic['t'])
             else:
-                self.hop['t'][ind & (self.hop['tag'] == dic['tag'])
-                                        & (self.hop['ang'] == dic['ang'])] = dic['t']
+                self.hop.assign('t', ind & self.hop.equal('tag', dic['tag'])
+                                            & (self.hop['ang'] == dic['ang']), dic['t'])
 
     def find_square(self, xlims, ylims):
         '''
@@ -495,88 +1132,1072 @@ class system():
         '''
         Get the site coordinates in hopping space
         only considering the nearest neighbours hoppings.
+
+        .. note::
+
+            The coordinates are accumulated along the edges of a 
+            breadth-first tree of the nearest neighbours graph, level 
+            by level, starting from the first connected site. 
+            Sites not connected to this site are left at the origin.
         '''
         error_handling.empty_hop(self.hop)
-        visited = np.zeros(self.lat.sites, 'u2')
-        self.coor_hop = np.zeros(self.lat.sites, dtype=[('x','f8'), ('y','f8'), ('tag', 'S1')])
+        error_handling.hop_n1(self.hop)
+        self.coor_hop = table([('x','f8'), ('y','f8'), ('tag', 'S1')], self.lat.sites)
         self.coor_hop['tag'] = self.lat.coor['tag']
         hop = self.hop[self.hop['n'] == 1]
-        hop_down = np.copy(hop)
-        hop_down['i'] = hop['j']
-        hop_down['j'] = hop[ 'i']
-        hop_down['ang'] = -180 + hop['ang']
-        hop = np.concatenate([hop, hop_down])
-        i_visit = np.min(hop['i'])
-        while True:
-            hs = hop[hop['i'] == i_visit]
-            for h in hs:
-                if visited[h['j']] == 2:
-                    continue
-                self.coor_hop['x'][h['j']] = self.coor_hop['x'][i_visit] + \
-                    h['t'].real*cos(PI / 180 * h['ang'])
-                self.coor_hop['y'][h['j']] = self.coor_hop['y'][i_visit] + \
-                    h['t'].real*sin(PI / 180 * h['ang'])
-                visited[h['j']] = 1
-            visited[i_visit] = 2
-            explored = np.argwhere(visited == 1)
-            if not explored.any():
-                break
-            i_visit = explored[0]
+        i = np.concatenate([hop['i'], hop['j']])
+        j = np.concatenate([hop['j'], hop['i']])
+        ang = PI / 180 * np.concatenate([hop['ang'], -180 + hop['ang']]).astype('f8')
+        t = np.concatenate([hop['t'].real, hop['t'].real])
+        # first (smallest) displacement of each directed edge
+        ind = np.lexsort((np.arange(len(i)), j, i))
+        first = np.ones(len(i), bool)
+        first[1:] = (np.diff(i[ind]) != 0) | (np.diff(j[ind]) != 0)
+        ind = ind[first]
+        shape = (self.lat.sites, self.lat.sites)
+        adj = sparse.csr_matrix((np.arange(1, len(ind)+1), (i[ind], j[ind])), shape=shape)
+        dx, dy = t[ind] * np.cos(ang[ind]), t[ind] * np.sin(ang[ind])
+        root = np.min(hop['i'])
+        order, pred = breadth_first_order(adj, root, directed=True)
+        depth = shortest_path(adj, indices=root, unweighted=True)[order].astype(int)
+        edge = np.asarray(adj[pred[order[1:]], order[1:]]).ravel() - 1
+        edge = np.concatenate([[0], edge])
+        levels = np.flatnonzero(np.diff(depth)) + 1
+        for lev in np.split(np.arange(len(order)), levels)[1:]:
+            sites, parents = order[lev], pred[order[lev]]
+            self.coor_hop['x'][sites] = self.coor_hop['x'][parents] + dx[edge[lev]]
+            self.coor_hop['y'][sites] = self.coor_hop['y'][parents] + dy[edge[lev]]
 
     def get_ham(self):
         '''
         Get the Tight-Binding Hamiltonian using sys.hop.
+
+        .. note::
+
+            The Hamiltonian is real (float64) if the hoppings and the 
+            onsite energies have zero imaginary parts, complex otherwise.
+
+            With twisted boundary conditions (see *set_periodic*), the 
+            hoppings crossing the boundaries get the Bloch phases.
         '''
         error_handling.empty_hop(self.hop)
         error_handling.hop_sites(self.hop, self.lat.sites)
+        t = self.real_if_possible(self.hop['t'])
+        if self.twist.any():
+            wrap = self.get_bloch_phase(self.hop['i'], self.hop['j'])
+            t = t * np.exp(-1j * np.dot(wrap, self.twist))
         if np.all(self.hop['ang'] >= 0) or np.all(self.hop['ang'] < 0):
-            self.ham = sparse.csr_matrix((self.hop['t'], (self.hop['i'], self.hop['j'])), 
+            self.ham = sparse.csr_matrix((t, (self.hop['i'], self.hop['j'])), 
                                                             shape=(self.lat.sites, self.lat.sites)) \
-                           + sparse.csr_matrix((self.hop['t'].conj(), (self.hop['j'], self.hop['i'])), 
+                           + sparse.csr_matrix((t.conj(), (self.hop['j'], self.hop['i'])), 
                                                             shape=(self.lat.sites, self.lat.sites))
         else:
-            self.ham = sparse.csr_matrix((self.hop['t'], (self.hop['i'], self.hop['j'])), 
+            self.ham = sparse.csr_matrix((t, (self.hop['i'], self.hop['j'])), 
                                                             shape=(self.lat.sites, self.lat.sites))
         if self.onsite.size == self.lat.sites:
-            self.ham += sparse.diags(self.onsite, 0)
+            self.ham += sparse.diags(self.real_if_possible(self.onsite), 0)
 
-    def get_eig(self, eigenvec=False, left=False):
+    def real_if_possible(self, arr):
+        '''
+        Private method.
+        Get the real part of *arr* if its imaginary part is zero.
+        '''
+        if np.iscomplexobj(arr) and not np.any(arr.imag):
+            return arr.real
+        return arr
+
+    def is_hermitian(self):
+        '''
+        Private method.
+        Check if the Hamiltonian is Hermitian (symmetric if real).
+        '''
+        if np.iscomplexobj(self.ham):
+            return not (self.ham.conj().T != self.ham).nnz
+        return not (self.ham.T != self.ham).nnz
+
+    def get_eig(self, eigenvec=False, left=False, lims=None, index=None, processes=1,
+                       intensity=False):
         '''
         Get the eigenergies, eigenvectors and polarisation.
+        Real symmetric Hamiltonians are diagonalised in real arithmetic 
+        (*en* and *rn* are float64).
 
         :param eigenvec: Boolean. Default value False. 
             If True, get the eigenvectors.
         :param left: Boolean. Default value False. 
             If True, get the left eigenvectors too. 
             Relevant for non-Hermitian matrices.
+        :param lims: List. Default value None. 
+            If not None, get only the states with energies 
+            in the window (lims[0], lims[1]].
+        :param index: List. Default value None.
+            If not None, get only the states index[0] to index[1] 
+            (included) of the spectrum sorted by increasing energy.
+        :param processes: Positive integer. Default value 1. 
+            Number of worker processes used to diagonalise the 
+            symmetry sectors (see note).
+        :param intensity: Boolean. Default value False.
+            If True, store the intensities of all the states in *intensity*
+            (see *get_intensity* to get the intensities of selected states).
+
+        .. note::
+
+            If the full spectrum of a Hermitian Hamiltonian is required 
+            and the hoppings split the lattice into disconnected clusters, 
+            each cluster is diagonalised separately (see *get_eig_components*).
+
+            If the bandwidth of the Hamiltonian is small 
+            (see *reorder_sites*), the banded solver *LA.eig_banded* is used.
+
+            Otherwise, the lattice is searched for a rotation (order 6, 4, 3, or 2) or 
+            a mirror about its centre leaving the Hamiltonian invariant. 
+            If found, the Hamiltonian is block diagonalised into the 
+            symmetry sectors (see *get_eig_symmetry*), and the 
+            sector of each state is stored in *sector*.
+
+            For bipartite lattices (two tags, hoppings only between 
+            different tags, zero onsite energies), the full spectrum is 
+            obtained from the SVD of the half-size hopping block 
+            (see *get_eig_chiral*).
+
+            For Hermitian Hamiltonians, *lims* and *index* call the LAPACK 
+            subset driver (MRRR), so that only the selected eigenvectors are 
+            computed and stored in *rn* and *pola*.
+            For non-Hermitian Hamiltonians, the full spectrum is computed and 
+            the states are selected using the real part of the energies.
+
+        Example usage::
+
+            # states in the window (-0.1, 0.1]
+            sys.get_eig(eigenvec=True, lims=[-0.1, 0.1])
+            # 10 lowest energy states
+            sys.get_eig(eigenvec=True, index=[0, 9])
         '''
         error_handling.empty_ham(self.ham)
         error_handling.boolean(eigenvec, 'eigenvec')
         error_handling.boolean(left, 'left')
-        if eigenvec:
-            if (self.ham.H != self.ham).nnz:
-                if not left:
-                    self.en, self.rn = LA.eig(self.ham.toarray())
-                else:
-                    self.en, self.rn, self.ln = LA.eig(self.ham.toarray(), left=left)
-                ind = np.argsort(self.en.real)
-                self.en = self.en[ind]
-                self.rn = self.rn[:, ind]
-                if self.ln.size:
-                    self.ln = self.ln[:, ind]
+        error_handling.lims(lims)
+        error_handling.index_lims(index, self.lat.sites)
+        error_handling.positive_int(processes, 'processes')
+        error_handling.boolean(intensity, 'intensity')
+        if lims is not None and index is not None:
+            raise ValueError('\n\nParameters lims and index cannot be both set.\n')
+        self.clear_eig()
+        if not self.is_hermitian():
+            if eigenvec and left:
+                self.en, self.rn, self.ln = LA.eig(self.ham.toarray(), left=left)
+            elif eigenvec:
+                self.en, self.rn = LA.eig(self.ham.toarray())
             else:
-                self.en, self.rn = LA.eigh(self.ham.toarray())
-            self.intensity = np.abs(self.rn) ** 2
-            self.pola = np.zeros((self.lat.sites, len(self.lat.tags)))
-            for i, tag in enumerate(self.lat.tags):
-                self.pola[:, i] = np.sum(self.intensity[self.lat.coor['tag'] == tag, :], axis=0)
-        else:
-            if (self.ham.H != self.ham).nnz:
                 self.en = LA.eigvals(self.ham.toarray())
-                ind = np.argsort(self.en.real)
-                self.en = self.en[ind]
+            ind = np.argsort(self.en.real)
+            if lims is not None:
+                ind = ind[(self.en.real[ind] > lims[0]) & (self.en.real[ind] <= lims[1])]
+            elif index is not None:
+                ind = ind[index[0]: index[1]+1]
+            self.en = self.en[ind]
+            if eigenvec:
+                self.rn = self.rn[:, ind]
+            if self.ln.size:
+                self.ln = self.ln[:, ind]
+        else:
+            subset = {}
+            if lims is not None:
+                subset = {'subset_by_value': lims, 'driver': 'evr'}
+            elif index is not None:
+                subset = {'subset_by_index': index, 'driver': 'evr'}
+            labels = None if subset else self.find_components()
+            perm, order = (None, 1) if subset or labels is not None else self.find_symmetry()
+            if labels is not None:
+                self.get_eig_components(labels, eigenvec, processes)
+            elif order > 2 or (order == 2 and not self.is_chiral()):
+                self.get_eig_symmetry(perm, order, eigenvec, processes)
+            elif not subset and self.is_chiral():
+                self.get_eig_chiral(eigenvec)
+            elif BANDED * bandwidth(self.ham) < self.lat.sites:
+                self.get_eig_banded(eigenvec, lims, index)
+            elif eigenvec:
+                self.en, self.rn = LA.eigh(self.ham.toarray(), **subset)
             else:
-                self.en = LA.eigvalsh(self.ham.toarray())
+                self.en = LA.eigh(self.ham.toarray(), eigvals_only=True, **subset)
+        if eigenvec:
+            self.get_intensity_pola(intensity)
+
+    def get_eig_arnoldi(self, k=6, target=None, left=False, intensity=False):
+        '''
+        Get *k* eigenenergies and right eigenvectors (and left eigenvectors) 
+        of a sparse, non-Hermitian, Hamiltonian by Arnoldi iterations (ARPACK).
+        Relevant for large lattices with gain and loss.
+
+        :param k: Positive integer. Default value 6. Number of states.
+        :param target: Number. Default value None.
+            If not None, get the *k* states with energies nearest *target* 
+            (shift-invert mode). If None, get the *k* states 
+            with largest imaginary parts (lasing modes), or, if the 
+            iterations do not converge (clustered imaginary parts), 
+            the *k* states nearest :math:`i\max|\Im(onsite)|`.
+        :param left: Boolean. Default value False.
+            If True, get the left eigenvectors too, from the 
+            Arnoldi iterations of :math:`H^\\dagger`.
+        :param intensity: Boolean. Default value False.
+            If True, store the intensities of the states in *intensity*.
+
+        Example usage::
+
+            sys.get_eig_arnoldi(k=10, left=True)
+            sys.get_petermann()
+
+        .. note::
+
+            The right eigenvectors are normalised, and the left eigenvectors
+            are biorthonormalised: :math:`\\langle\\psi_L^{m}|\\psi_R^{n}\\rangle = \\delta_{mn}`.
+            The states are sorted by increasing real part of the energies.
+        '''
+        error_handling.empty_ham(self.ham)
+        error_handling.positive_int_lim(k, 'k', self.lat.sites-2)
+        if target is not None:
+            error_handling.number(target, 'target')
+        error_handling.boolean(left, 'left')
+        error_handling.boolean(intensity, 'intensity')
+        self.clear_eig()
+        ham = self.ham.astype(PRECISION[self.precision][1]).tocsc()
+        ncv = min(self.lat.sites, max(5 * k, 40))  # clustered imaginary parts converge slowly
+        if target is None:
+            try:
+                en, rn = eigs(ham, k=k, which='LI', ncv=ncv)
+            except ArpackNoConvergence:
+                # clustered imaginary parts: shift-invert at the largest gain
+                target = 1j * np.max(np.abs(np.imag(self.onsite)), initial=0.)
+        if target is not None:
+            try:
+                en, rn = eigs(ham, k=k, sigma=target, which='LM', ncv=ncv)
+            except ArpackNoConvergence:
+                raise ValueError('\n\nThe Arnoldi iterations did not converge, '
+                                        'try another parameter target.\n')
+        ind = np.argsort(en.real, kind='stable')
+        self.en, self.rn = en[ind], rn[:, ind] / LA.norm(rn[:, ind], axis=0)
+        if left:
+            ham = ham.conj().T.tocsc()
+            if target is None:
+                en_left, ln = eigs(ham, k=k, which='SI', ncv=ncv)
+            else:
+                en_left, ln = eigs(ham, k=k, sigma=np.conj(target), which='LM', ncv=ncv)
+            # pair the left and right eigenvectors
+            row, col = linear_sum_assignment(np.abs(self.en.reshape(-1, 1) - en_left.conj()))
+            ln = ln[:, col[np.argsort(row)]]
+            # biorthonormalisation
+            overlap = np.dot(ln.conj().T, self.rn)
+            self.ln = LA.solve(overlap, ln.conj().T).conj().T
+        self.get_intensity_pola(intensity)
+
+    def get_bandwidth(self):
+        '''
+        Get the bandwidth of the Hamiltonian, :math:`\max|i-j|` over the hoppings.
+
+        :returns:
+            * **bandwidth** -- Bandwidth.
+        '''
+        error_handling.empty_hop(self.hop)
+        return int(np.max(np.abs(self.hop['i'].astype('i8') - self.hop['j'])))
+
+    def reorder_sites(self):
+        '''
+        Reorder the sites with the Reverse Cuthill-McKee algorithm 
+        to reduce the bandwidth of the Hamiltonian.
+
+        The permutation is applied to *lat.coor*, *hop*, *onsite*, *ham*, 
+        and the eigenvectors. *perm* stores the previous indices 
+        of the sites (composed over successive calls). The hoppings keep 
+        their angles (directions from *i* to *j*).
+
+        .. note::
+
+            *add_sites* sorts again the sites by (y, x).
+
+        Example usage::
+
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.reorder_sites()
+            print(sys.get_bandwidth())
+        '''
+        error_handling.empty_hop(self.hop)
+        graph = sparse.csr_matrix((np.ones(len(self.hop), 'i1'), (self.hop['i'], self.hop['j'])),
+                                                shape=(self.lat.sites, self.lat.sites))
+        perm = reverse_cuthill_mckee((graph + graph.T).tocsr(), symmetric_mode=True)
+        inv = np.empty(self.lat.sites, 'u4')
+        inv[perm] = np.arange(self.lat.sites)
+        self.lat.coor = self.lat.coor[perm]
+        self.hop['i'] = inv[self.hop['i']]
+        self.hop['j'] = inv[self.hop['j']]
+        self.store_hop = {}
+        self.vec_hop = np.array([], dtype=[('dis', 'f8'),  ('ang', 'f8')])
+        self.coor_hop = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+        if self.onsite.size:
+            self.onsite = self.onsite[perm]
+        if self.ham.nnz:
+            self.ham = self.ham.tocsr()[perm][:, perm]
+        if self.rn.ndim == 2:
+            self.rn = self.rn[perm]
+        if self.intensity.ndim == 2:
+            self.intensity = self.intensity[perm]
+        if self.ln.ndim == 2:
+            self.ln = self.ln[perm]
+        self.perm = perm if self.perm is None else self.perm[perm]
+
+    def get_eig_banded(self, eigenvec=False, lims=None, index=None):
+        '''
+        Private method.
+        Get the eigenenergies and eigenvectors of a Hermitian 
+        Hamiltonian with the banded solver *LA.eig_banded*.
+        '''
+        band = bandwidth(self.ham)
+        ab = banded(self.ham, 0, band)
+        select, select_range = 'a', None
+        if lims is not None:
+            select, select_range = 'v', lims
+        elif index is not None:
+            select, select_range = 'i', index
+        res = LA.eig_banded(ab, eigvals_only=not eigenvec, select=select, 
+                                       select_range=select_range)
+        if eigenvec:
+            self.en, self.rn = res
+        else:
+            self.en = res
+
+    def find_components(self):
+        '''
+        Private method.
+        Find the connected components of the hopping graph.
+
+        :returns:
+            * **labels** -- Component of each site, None if the graph is connected.
+        '''
+        graph = sparse.csr_matrix((np.ones(len(self.hop), 'i1'), (self.hop['i'], self.hop['j'])),
+                                                shape=(self.lat.sites, self.lat.sites))
+        n_comp, labels = connected_components(graph, directed=False)
+        if n_comp == 1:
+            return None
+        return labels
+
+    def get_eig_components(self, labels, eigenvec=False, processes=1):
+        '''
+        Private method.
+        Get the eigenenergies and eigenvectors of a Hamiltonian 
+        made of disconnected clusters (site labels *labels*). 
+        The clusters of same size are stacked and diagonalised together 
+        (batched *eigh*), in chunks distributed over *processes* 
+        worker processes.
+        '''
+        ham = self.ham.tocsr()
+        order = np.argsort(labels, kind='stable')
+        sizes = np.bincount(labels)
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        stacks, indices = [], []
+        for n in np.unique(sizes):
+            comps = np.flatnonzero(sizes == n)
+            idx = order[starts[comps].reshape(-1, 1) + np.arange(n)]  # (clusters, n)
+            sub = ham[idx.ravel()][:, idx.ravel()].tocoo()
+            stack = np.zeros((len(comps), n, n), ham.dtype)
+            stack[sub.row // n, sub.row % n, sub.col % n] = sub.data
+            chunks = max(1, min(processes, len(comps)))
+            for ind in np.array_split(np.arange(len(comps)), chunks):
+                stacks.append(stack[ind])
+                indices.append(idx[ind])
+        with ProcessPoolExecutor(max_workers=processes) if processes > 1 else serial() as pool:
+            results = list(pool.map(eig_stack, stacks, [eigenvec] * len(stacks)))
+        self.en = np.concatenate([res[0].ravel() for res in results])
+        if eigenvec:
+            self.rn = np.zeros((self.lat.sites, self.lat.sites), results[0][1].dtype)
+            col = 0
+            for idx, res in zip(indices, results):
+                m, n = idx.shape
+                cols = col + np.arange(m * n).reshape(m, 1, n)
+                self.rn[idx.reshape(m, n, 1), cols] = res[1]
+                col += m * n
+        ind = np.argsort(self.en, kind='stable')
+        self.en = self.en[ind]
+        if eigenvec:
+            self.rn = self.rn[:, ind]
+
+    def find_symmetry(self):
+        '''
+        Private method.
+        Find a rotation (order 6, 4, 3, or 2) or a mirror about the 
+        lattice centre mapping sites onto sites and leaving the 
+        Hamiltonian invariant. 
+
+        :returns:
+            * **perm** -- Site permutation (site i is mapped onto site perm[i]), 
+              None if no symmetry is found.
+            * **order** -- Order of the symmetry operation (1 if none).
+        '''
+        xy = np.column_stack([self.lat.coor['x'] - np.mean(self.lat.coor['x']), 
+                                          self.lat.coor['y'] - np.mean(self.lat.coor['y'])])
+        tree = cKDTree(xy)
+        ops = []
+        for order in [6, 4, 3, 2]:
+            c, s = cos(2 * PI / order), sin(2 * PI / order)
+            ops.append((order, np.array([[c, -s], [s, c]])))
+        for ang in [0., 30., 45., 60., 90., 120., 135., 150.]:
+            c, s = cos(PI / 90 * ang), sin(PI / 90 * ang)
+            ops.append((2, np.array([[c, s], [s, -c]])))
+        ham = self.ham.tocsr()
+        tol = 1e-10 * (1. + abs(ham).max())
+        for order, mat in ops:
+            dist, perm = tree.query(np.dot(xy, mat.T), distance_upper_bound=ATOL)
+            if np.any(np.isinf(dist)) or len(np.unique(perm)) != self.lat.sites:
+                continue
+            dif = ham[perm][:, perm] - ham
+            if not dif.nnz or abs(dif).max() <= tol:
+                return perm, order
+        return None, 1
+
+    def get_eig_symmetry(self, perm, order, eigenvec=False, processes=1):
+        r'''
+        Private method.
+        Get the eigenenergies and eigenvectors of a Hamiltonian invariant 
+        under the site permutation *perm* of order *order*.
+
+        The Hamiltonian is projected onto the symmetry sectors 
+        :math:`k=0,\ldots,order-1` spanned by the orbit vectors
+
+        .. math:: 
+
+            |o, k\rangle = \frac{1}{\sqrt{L_o}}\sum_{m=0}^{L_o-1} 
+            e^{2i\pi km/order}|perm^m(o)\rangle\, ,
+
+        (orbits of length :math:`L_o` with :math:`kL_o=0\mod order`), 
+        and each block is diagonalised independently. 
+
+        For real Hamiltonians, the sectors *k* and *order-k* are complex 
+        conjugate. Only the sectors :math:`k\leq order/2` are diagonalised 
+        and real eigenvectors are obtained from the real and imaginary 
+        parts of the eigenvectors of the paired sectors (*sector* is then 
+        min(k, order-k)).
+        '''
+        powers = np.empty((order, self.lat.sites), 'i8')
+        powers[0] = np.arange(self.lat.sites)
+        for m in range(1, order):
+            powers[m] = perm[powers[m-1]]
+        rep = powers.min(axis=0) == powers[0]
+        length = np.full(self.lat.sites, order)
+        for m in range(order-1, 0, -1):
+            length[powers[m] == powers[0]] = m
+        ham = self.ham.tocsr()
+        real = not np.iscomplexobj(ham)
+        dtypes = PRECISION[self.precision]
+        bases, blocks, sectors = [], [], []
+        for k in range(order // 2 + 1 if real else order):
+            orbits = np.flatnonzero(rep & ((k * length) % order == 0))
+            if not orbits.size:
+                continue
+            rows, cols, vals = [], [], []
+            for m in range(order):
+                ind = m < length[orbits]
+                rows.append(powers[m, orbits[ind]])
+                cols.append(np.flatnonzero(ind))
+                vals.append(np.exp(2j * PI * k * m / order) / np.sqrt(length[orbits[ind]]))
+            vals = np.concatenate(vals)
+            vals.real[np.abs(vals.real) < 1e-12] = 0.
+            vals.imag[np.abs(vals.imag) < 1e-12] = 0.
+            vals = self.real_if_possible(vals)
+            vals = vals.astype(dtypes[np.iscomplexobj(vals)])
+            basis = sparse.csr_matrix((vals, (np.concatenate(rows), np.concatenate(cols))), 
+                                                    shape=(self.lat.sites, len(orbits)))
+            bases.append(basis)
+            blocks.append((basis.conj().T.dot(ham).dot(basis)).toarray())
+            sectors.append(np.full(len(orbits), k, 'i4'))
+        with ProcessPoolExecutor(max_workers=processes) if processes > 1 else serial() as pool:
+            results = list(pool.map(eig_block, blocks, [eigenvec] * len(blocks)))
+        en, rn, sector = [], [], []
+        for basis, sec, res in zip(bases, sectors, results):
+            paired = real and (2 * sec[0]) % order != 0
+            en.extend([res[0], res[0]] if paired else [res[0]])
+            sector.extend([sec, sec] if paired else [sec])
+            if eigenvec:
+                vec = basis.dot(res[1])
+                rn.extend([2 ** 0.5 * vec.real, 2 ** 0.5 * vec.imag] if paired else [vec])
+        en = np.concatenate(en)
+        ind = np.argsort(en, kind='stable')
+        self.en = en[ind]
+        self.sector = np.concatenate(sector)[ind]
+        if eigenvec:
+            self.rn = np.concatenate(rn, axis=1)[:, ind]
+
+    def is_chiral(self):
+        '''
+        Private method.
+        Check if the Hamiltonian is chiral: two tags, 
+        hoppings only between sites of different tags, 
+        and zero onsite energies.
+        '''
+        code = self.lat.coor.code('tag')
+        if len(np.unique(code)) != 2:
+            return False
+        if self.onsite.size and np.any(self.onsite):
+            return False
+        return bool(np.all(code[self.hop['i']] != code[self.hop['j']]))
+
+    def get_eig_chiral(self, eigenvec=False):
+        r'''
+        Private method.
+        Get the eigenenergies and eigenvectors of a chiral Hamiltonian
+
+        .. math:: 
+
+            H = \begin{pmatrix} 0 & T \\ T^\dagger & 0 \end{pmatrix}
+
+        from the SVD :math:`T=USV^\dagger` of the :math:`N_a\times N_b` block. 
+        The eigenpairs are :math:`\pm s_k` and 
+        :math:`(u_k, \pm v_k)/\sqrt{2}`, completed by 
+        :math:`|N_a-N_b|` zero modes living on the majority sublattice.
+        '''
+        code = self.lat.coor.code('tag')
+        ia = np.flatnonzero(code == code.min())
+        ib = np.flatnonzero(code != code.min())
+        ham = self.ham.tocsr()
+        t = ham[ia][:, ib].toarray()
+        m = min(len(ia), len(ib))
+        if not eigenvec:
+            sv = LA.svdvals(t)
+            self.en = np.sort(np.concatenate([-sv, sv, np.zeros(abs(len(ia)-len(ib)), sv.dtype)]))
+            return
+        u, sv, vh = LA.svd(t)
+        v = vh.conj().T
+        en = np.concatenate([-sv, sv, np.zeros(abs(len(ia)-len(ib)), sv.dtype)])
+        rn = np.zeros((self.lat.sites, self.lat.sites), u.dtype)
+        rn[ia, :m] = u[:, :m] / np.sqrt(2)
+        rn[ib, :m] = -v[:, :m] / np.sqrt(2)
+        rn[ia, m: 2*m] = u[:, :m] / np.sqrt(2)
+        rn[ib, m: 2*m] = v[:, :m] / np.sqrt(2)
+        if len(ia) > m:
+            rn[ia, 2*m:] = u[:, m:]
+        else:
+            rn[ib, 2*m:] = v[:, m:]
+        ind = np.argsort(en, kind='stable')
+        self.en = en[ind]
+        self.rn = rn[:, ind]
+
+    def get_intensity_pola(self, intensity=False):
+        '''
+        Private method.
+        Get the sublattice polarisations (and, if *intensity*, the intensities) 
+        of the eigenstates, by blocks of *CHUNK* eigenstates.
+        '''
+        real = PRECISION[self.precision][0]
+        tags = self.tag_matrix()
+        self.pola = np.empty((self.rn.shape[1], len(self.lat.tags)), real)
+        if intensity:
+            self.intensity = np.empty(self.rn.shape, real)
+        for sl in chunks(self.rn.shape[1]):
+            inten = np.abs(self.rn[:, sl]) ** 2
+            self.pola[sl] = tags.dot(inten).T
+            if intensity:
+                self.intensity[:, sl] = inten
+
+    def tag_matrix(self):
+        '''
+        Private method.
+        Get the sparse indicator matrix of the tags: 
+        element (k, i) is 1 if site i has tag *lat.tags[k]*.
+        '''
+        ind = np.searchsorted(self.lat.tags, self.lat.coor['tag'])
+        return sparse.csr_matrix((np.ones(self.lat.sites, PRECISION[self.precision][0]), 
+                                              (ind, np.arange(self.lat.sites))),
+                                              shape=(len(self.lat.tags), self.lat.sites))
+
+    def get_intensity(self, index):
+        '''
+        Get the intensities of selected eigenstates.
+
+        :param index: Integer or list of integers. Indices of the eigenstates.
+
+        :returns:
+            * **intensity** -- Intensities :math:`|\\psi_j|^2` (one column per state 
+              if *index* is a list).
+
+        Example usage::
+
+            intensity = sys.get_intensity(0)
+            intensities = sys.get_intensity([0, 1, 2])
+        '''
+        error_handling.empty_ndarray(self.rn, 'sys.get_eig(eigenvec=True)')
+        error_handling.states(index, self.rn.shape[1])
+        return np.abs(self.rn[:, index]) ** 2
+
+    def count_states(self, en):
+        '''
+        Get the exact number of states with energies smaller than *en*,
+        using the inertia of the sparse :math:`LDL^\dagger` factorisation 
+        of :math:`H-E` (Sylvester's law of inertia). 
+        Relevant for Hermitian Hamiltonians.
+
+        :param en: Real number. Energy.
+
+        :returns:
+            * **count** -- Number of states with energies smaller than *en*.
+        '''
+        error_handling.empty_ham(self.ham)
+        error_handling.real_number(en, 'en')
+        error_handling.hermitian(self.is_hermitian())
+        return inertia(self.ham, en)
+
+    def get_eig_slicing(self, slices=4, eigenvec=False, processes=None, intensity=False):
+        '''
+        Get the full spectrum by spectrum slicing. 
+        Relevant for large sparse Hermitian Hamiltonians.
+
+        The spectrum is split into *slices* energy windows containing about 
+        the same number of states (counted with *count_states*). 
+        Each window is solved by shift-invert Lanczos in a separate process, 
+        and the results are merged into *en* (and *rn*, *pola*).
+
+        :param slices: Positive integer. Default value 4. Number of slices.
+        :param eigenvec: Boolean. Default value False. 
+            If True, get the eigenvectors.
+        :param processes: Positive integer. Default value None. 
+            Number of worker processes (number of CPUs if None). 
+            If 1, the slices are solved in the current process.
+        :param intensity: Boolean. Default value False.
+            If True, store the intensities of all the states in *intensity*.
+
+        Example usage::
+
+            sys.get_eig_slicing(slices=8, eigenvec=True, processes=4)
+        '''
+        error_handling.empty_ham(self.ham)
+        error_handling.positive_int_lim(slices, 'slices', self.lat.sites)
+        error_handling.boolean(eigenvec, 'eigenvec')
+        if processes is not None:
+            error_handling.positive_int(processes, 'processes')
+        error_handling.boolean(intensity, 'intensity')
+        error_handling.hermitian(self.is_hermitian())
+        self.clear_eig()
+        ham = self.ham.tocsr()
+        # Gershgorin bounds of the spectrum
+        diag = ham.diagonal().real
+        radius = np.ravel(abs(ham).sum(axis=1)) - np.abs(diag)
+        margin = ATOL * (1. + np.max(np.abs(diag) + radius))
+        bounds = [np.min(diag - radius) - margin, np.max(diag + radius) + margin]
+        counts = [0, self.lat.sites]
+        with ProcessPoolExecutor(max_workers=processes) if processes != 1 else serial() as pool:
+            # balanced slices: bisection of the inner bounds, all bounds in parallel
+            targets = np.arange(1, slices) * self.lat.sites / slices
+            tol = max(1, self.lat.sites // (10 * slices))
+            low = np.full(slices-1, bounds[0])
+            high = np.full(slices-1, bounds[1])
+            lims = 0.5 * (low + high)
+            count = np.array(list(pool.map(inertia, [ham] * len(lims), lims)), int)
+            for _ in range(50):
+                todo = np.abs(count - targets) > tol
+                if not todo.any():
+                    break
+                low[todo & (count < targets)] = lims[todo & (count < targets)]
+                high[todo & (count > targets)] = lims[todo & (count > targets)]
+                lims[todo] = 0.5 * (low[todo] + high[todo])
+                count[todo] = list(pool.map(inertia, [ham] * np.sum(todo), lims[todo]))
+            lims = [bounds[0]] + list(lims) + [bounds[1]]
+            counts = [0] + list(count) + [self.lat.sites]
+            results = pool.map(eig_slice, [ham] * slices, lims[:-1], lims[1:], 
+                                          counts[:-1], counts[1:], [eigenvec] * slices)
+            results = list(results)
+        self.en = np.concatenate([res[0] for res in results])
+        if eigenvec:
+            self.rn = np.concatenate([res[1] for res in results], axis=1)
+            self.get_intensity_pola(intensity)
+
+    def get_green(self, en, index, eta=1e-2):
+        '''
+        Get columns of the retarded Green's function
+        :math:`G(E) = (E+i\\eta-H)^{-1}` from the sparse LU factorisation 
+        of :math:`E+i\\eta-H`.
+
+        :param en: Real number. Energy.
+        :param index: Integer or list of integers. Sites (columns of G).
+        :param eta: Positive number. Default value 1e-2. Broadening.
+
+        :returns:
+            * **green** -- Columns *index* of G.
+
+        Example usage::
+
+            green = sys.get_green(0., [0, 10])
+        '''
+        error_handling.empty_ham(self.ham)
+        error_handling.real_number(en, 'en')
+        error_handling.states(index, self.lat.sites)
+        error_handling.positive_real(eta, 'eta')
+        ind = np.atleast_1d(index)
+        rhs = np.zeros((self.lat.sites, len(ind)), 'c16')
+        rhs[ind, np.arange(len(ind))] = 1.
+        green = resolvent(self.ham, en, eta).solve(rhs)
+        return green if np.ndim(index) else green[:, 0]
+
+    def get_ldos(self, en, eta=1e-2, processes=1):
+        '''
+        Get the local density of states
+        :math:`\\rho_i(E) = -\\Im G_{ii}(E+i\\eta)/\\pi`
+        at one or several energies, without diagonalisation.
+
+        For each energy, :math:`E+i\\eta-H` is LU factorised once 
+        (*splu*) and the diagonal of G is obtained by blocks of *CHUNK* sites. 
+        The energies are distributed over a process pool.
+
+        :param en: Real number or list of real numbers. Energies.
+        :param eta: Positive number. Default value 1e-2. Broadening.
+        :param processes: Positive integer. Default value 1. 
+            Number of worker processes (number of CPUs if None). 
+
+        :returns:
+            * **ldos** -- LDOS (one column per energy if *en* is a list), 
+              to be plotted with *plot.intensity_disk* or *plot.intensity_area*.
+
+        Example usage::
+
+            ldos = sys.get_ldos(0., eta=0.05)
+            fig = plt.intensity_disk(ldos)
+        '''
+        error_handling.empty_ham(self.ham)
+        ens = list(en) if isinstance(en, (list, tuple, np.ndarray)) else [en]
+        for e in ens:
+            error_handling.real_number(e, 'en')
+        error_handling.positive_real(eta, 'eta')
+        if processes is not None:
+            error_handling.positive_int(processes, 'processes')
+        ham = self.ham.tocsc()
+        with ProcessPoolExecutor(max_workers=processes) if processes != 1 else serial() as pool:
+            ldos = list(pool.map(ldos_en, [ham] * len(ens), ens, [eta] * len(ens)))
+        ldos = np.column_stack(ldos).astype(PRECISION[self.precision][0])
+        return ldos if np.ndim(en) else ldos[:, 0]
+
+    def get_chern_marker(self, en_f=0., index=None, order=300):
+        r'''
+        Get the local Chern marker (Bianco and Resta) of the states 
+        with energies smaller than *en_f*:
+
+        .. math::
+
+            C_i = \frac{4\pi}{A}\Im\langle i|PxQyP|i\rangle,
+
+        with *A* the area per site, :math:`Q = 1-P` and *x*, *y* the 
+        site coordinates. The projector *P* is not built: it is 
+        approximated by a Chebyshev expansion of the Hamiltonian 
+        (Jackson kernel) and applied to the basis vectors of the sites 
+        *index*, by blocks of *CHUNK* sites, so that the cost is linear in the 
+        number of sites. Relevant for Hermitian Hamiltonians of 2D lattices.
+        The sign convention is the one of *get_chern*.
+
+        :param en_f: Real number. Default value 0. Fermi energy.
+        :param index: Integer or list of integers. Default value None.
+            Sites of the marker (all sites if None).
+        :param order: Positive integer. Default value 300.
+            Order of the Chebyshev expansion.
+
+        :returns:
+            * **marker** -- Local Chern marker (zero on the sites 
+              not in *index*), to be plotted with *plot.intensity_disk*.
+
+        Example usage::
+
+            marker = sys.get_chern_marker(en_f=0., order=500)
+            fig = plt.intensity_disk(marker, lims=[-1., 1.], title='$C$')
+        '''
+        error_handling.empty_ham(self.ham)
+        error_handling.real_number(en_f, 'en_f')
+        error_handling.positive_int(order, 'order')
+        if index is None:
+            index = np.arange(self.lat.sites)
+        error_handling.states(index, self.lat.sites)
+        if len(self.lat.prim_vec) != 2:
+            raise ValueError('\n\nThe Chern marker needs a 2D lattice.\n')
+        if not self.is_hermitian():
+            raise ValueError('\n\nThe Hamiltonian must be Hermitian.\n')
+        ham = self.ham.tocsr()
+        # spectrum bounds (Gershgorin)
+        diag = ham.diagonal().real
+        radius = np.ravel(abs(ham).sum(axis=1)) - np.abs(diag)
+        en_min, en_max = np.min(diag - radius), np.max(diag + radius)
+        area = abs(np.linalg.det(np.array(self.lat.prim_vec, 'f8'))) / len(self.lat.unit_cell)
+        x, y = self.lat.coor['x'].reshape(-1, 1), self.lat.coor['y'].reshape(-1, 1)
+        index = np.atleast_1d(index)
+        marker = np.zeros(self.lat.sites)
+        for sl in chunks(len(index)):
+            ind = index[sl]
+            vec = np.zeros((self.lat.sites, len(ind)), ham.dtype)
+            vec[ind, np.arange(len(ind))] = 1.
+            p_vec = projector(ham, vec, en_f, order, en_min, en_max)
+            y_vec = y * p_vec
+            q_vec = y_vec - projector(ham, y_vec, en_f, order, en_min, en_max)
+            marker[ind] = 4 * PI / area * np.sum(p_vec.conj() * x * q_vec, axis=0).imag
+        return marker
+
+    def set_bloch(self, list_hop, dict_onsite=None, n2=None):
+        '''
+        Set the Bloch Hamiltonian of the infinite lattice defined by 
+        *lat.unit_cell* and *lat.prim_vec*, or of a ribbon of *n2* unit cells
+        along :math:`\\mathbf{a}_2`, periodic along :math:`\\mathbf{a}_1`.
+
+        :param list_hop: List of Dictionaries (see *set_hopping*).
+            The hopping types *n* refer to the distances of the infinite lattice.
+        :param dict_onsite: Dictionary. Default value None.
+            Onsite energies of the unit cell sites (see *set_onsite*).
+        :param n2: Positive integer. Default value None.
+            If not None, number of unit cells of the ribbon.
+
+        Example usage::
+
+            sys.set_bloch([{'n': 1, 't': 1.}])
+            k, x = sys.get_kpath([(0, 0), (PI, 0), (PI, PI), (0, 0)], 300)
+            bands = sys.get_bands(k)
+        '''
+        unit_cell, prim_vec = self.lat.unit_cell, self.lat.prim_vec
+        tags = np.unique([dic['tag'] for dic in unit_cell])
+        sites = len(unit_cell)
+        onsite = np.zeros(sites, 'c16')
+        if dict_onsite is not None:
+            error_handling.set_onsite(dict_onsite, tags)
+            for i, dic in enumerate(unit_cell):
+                onsite[i] = dict_onsite.get(dic['tag'], 0.)
+        bonds, t, dist_uni = stencil(unit_cell, prim_vec, list_hop)
+        a, b, d1, d2 = bonds.T
+        a1 = np.array(prim_vec[0], 'f8')
+        a2 = np.array(prim_vec[1], 'f8') if len(prim_vec) == 2 else np.zeros(2)
+        if n2 is not None:
+            error_handling.positive_int(n2, 'n2')
+            if len(prim_vec) != 2:
+                raise ValueError('\n\nRibbons need two primitive vectors.\n')
+            # bond of the unit cell m to the unit cell m + d2 of the supercell
+            m = np.repeat(np.arange(n2), len(a))
+            a, b, d1, d2, t = [np.tile(arr, n2) for arr in (a, b, d1, d2, t)]
+            ind = (m + d2 >= 0) & (m + d2 < n2)
+            a, b, d1, t = a[ind] + sites * m[ind], b[ind] + sites * (m + d2)[ind], d1[ind], t[ind]
+            d2 = np.zeros(len(a), int)
+            onsite = np.tile(onsite, n2)
+            sites *= n2
+        vec = d1.reshape(-1, 1) * a1 + d2.reshape(-1, 1) * a2
+        # reciprocal vectors (rows), b2 = 0 for 1D lattices and ribbons
+        if len(prim_vec) == 2 and n2 is None:
+            recip = 2 * PI * LA.inv(np.column_stack([a1, a2])).T
+        else:
+            recip = np.array([2 * PI * a1 / np.dot(a1, a1), np.zeros(2)])
+        self.bloch = {'sites': sites, 'vec': vec, 't': t, 'onsite': onsite, 'recip': recip,
+                             'index': sparse.csr_matrix((np.ones(len(a)), (np.arange(len(a)), a * sites + b)), 
+                                                                      shape=(len(a), sites ** 2))}
+
+    def get_ham_bloch(self, k):
+        r'''
+        Get the Bloch Hamiltonians 
+
+        .. math::
+
+            H_{ab}(\mathbf{k}) = \sum_{\mathbf{R}} t_{ab}(\mathbf{R})\, e^{i\mathbf{k}\cdot\mathbf{R}} + h.c.
+
+        for a set of wave vectors, stacked in a single array.
+
+        :param k: np.ndarray. Wave vector (kx, ky) or array of wave vectors 
+            of shape (nk, 2).
+
+        :returns:
+            * **ham** -- Bloch Hamiltonians of shape (nk, sites, sites).
+        '''
+        error_handling.empty_bloch(self.bloch)
+        error_handling.kpoints(k)
+        k = np.atleast_2d(np.asarray(k, 'f8'))
+        sites = self.bloch['sites']
+        hop = self.bloch['t'] * np.exp(1j * np.dot(k, self.bloch['vec'].T))
+        ham = (self.bloch['index'].T.dot(hop.T)).T.reshape(-1, sites, sites)
+        ham = ham + ham.conj().transpose(0, 2, 1)
+        ham[:, np.arange(sites), np.arange(sites)] += self.bloch['onsite']
+        return ham
+
+    def get_bands(self, k, eigenvec=False):
+        '''
+        Get the band structure for a set of wave vectors 
+        by a single batched diagonalisation of the Bloch Hamiltonians.
+
+        :param k: np.ndarray. Array of wave vectors of shape (nk, 2).
+        :param eigenvec: Boolean. Default value False. 
+            If True, get the Bloch eigenvectors.
+
+        :returns:
+            * **bands** -- Energies of shape (nk, sites).
+            * **vec** -- If *eigenvec*, eigenvectors of shape (nk, sites, sites).
+        '''
+        error_handling.boolean(eigenvec, 'eigenvec')
+        ham = self.get_ham_bloch(k)
+        if np.allclose(ham, ham.conj().transpose(0, 2, 1)):
+            if eigenvec:
+                return np.linalg.eigh(ham)
+            return np.linalg.eigvalsh(ham)
+        if eigenvec:
+            return np.linalg.eig(ham)
+        return np.linalg.eigvals(ham)
+
+    def get_bloch_vec(self, f1, f2, n_occ):
+        '''
+        Private method.
+        Get the eigenvectors of the *n_occ* lowest bands at the wave vectors
+        of fractional coordinates (*f1*, *f2*) in the basis of the reciprocal vectors.
+        '''
+        k = np.outer(f1.ravel(), self.bloch['recip'][0]) + np.outer(f2.ravel(), self.bloch['recip'][1])
+        ham = self.get_ham_bloch(k)
+        if not np.allclose(ham, ham.conj().transpose(0, 2, 1)):
+            raise ValueError('\n\nThe Bloch Hamiltonian must be Hermitian.\n')
+        vec = np.linalg.eigh(ham)[1][..., :n_occ]
+        return vec.reshape(f1.shape + vec.shape[1:])
+
+    def get_n_occ(self, n_occ):
+        '''
+        Private method.
+        Check the number of occupied bands (half of the bands if None).
+        '''
+        error_handling.empty_bloch(self.bloch)
+        if n_occ is None:
+            return max(1, self.bloch['sites'] // 2)
+        error_handling.positive_int(n_occ, 'n_occ')
+        if n_occ > self.bloch['sites']:
+            raise ValueError('\n\nParameter n_occ must be smaller than the number of bands.\n')
+        return n_occ
+
+    def get_chern(self, nk=50, n_occ=None):
+        r'''
+        Get the Chern number of the *n_occ* lowest bands
+        (Fukui, Hatsugai and Suzuki) on a :math:`n_k\times n_k` grid 
+        of the Brillouin zone:
+
+        .. math::
+
+            C = \frac{1}{2\pi}\sum_{\mathbf{k}} \arg\left[U_1(\mathbf{k})U_2(\mathbf{k}+\delta_1)
+            U_1(\mathbf{k}+\delta_2)^{-1}U_2(\mathbf{k})^{-1}\right],
+
+        with the link variables 
+        :math:`U_\mu(\mathbf{k}) = \det\langle u_n(\mathbf{k})|u_m(\mathbf{k}+\delta_\mu)\rangle`.
+        The grid is processed by blocks of rows.
+
+        :param nk: Positive integer. Default value 50. 
+            Number of wave vectors along each reciprocal vector.
+        :param n_occ: Positive integer. Default value None.
+            Number of occupied bands (half of the bands if None).
+
+        :returns:
+            * **chern** -- Chern number (real number close to an integer 
+              if the grid is fine enough).
+
+        Example usage::
+
+            sys.set_bloch([{'n': 1, 't': 1.}, {'n': 2, 't': 0.1j}], {b'a': 0.2, b'b': -0.2})
+            chern = sys.get_chern(nk=60)
+        '''
+        n_occ = self.get_n_occ(n_occ)
+        error_handling.positive_int(nk, 'nk')
+        if not np.any(self.bloch['recip'][1]):
+            raise ValueError('\n\nThe Chern number needs a 2D lattice (not a ribbon).\n')
+        frac = np.arange(nk) / nk
+        step = max(1, CHUNK // nk)
+        # the eigenvectors of the first row are reused for the last plaquettes,
+        # and those of the last row of a block for the next block (fixed gauge)
+        first = self.get_bloch_vec(frac, np.zeros(nk), n_occ)[np.newaxis]
+        prev = first
+        flux = 0.
+        for row in range(1, nk + 1, step):
+            f2, f1 = np.meshgrid(frac[row: row + step], frac, indexing='ij')
+            vec = np.concatenate([prev, self.get_bloch_vec(f1, f2, n_occ)])
+            if row + step > nk:
+                vec = np.concatenate([vec, first])
+            prev = vec[-1:]
+            vec_adj = vec.conj().swapaxes(-1, -2)
+            link_1 = np.linalg.det(np.matmul(vec_adj, np.roll(vec, -1, axis=1)))
+            link_2 = np.linalg.det(np.matmul(vec_adj[:-1], vec[1:]))
+            plaquette = link_1[:-1] * np.roll(link_2, -1, axis=1) * \
+                               np.conj(link_1[1:]) * np.conj(link_2)
+            flux += np.sum(np.angle(plaquette))
+        return flux / (2 * PI)
+
+    def get_wilson(self, nk=100, n_perp=50, n_occ=None):
+        r'''
+        Get the Wilson loops of the *n_occ* lowest bands along the reciprocal 
+        vector :math:`\mathbf{b}_1` for *n_perp* wave vectors along 
+        :math:`\mathbf{b}_2`:
+
+        .. math::
+
+            W(k_2) = \prod_{j} \langle u_n(\mathbf{k}_j)|u_m(\mathbf{k}_{j+1})\rangle,
+
+        the products being evaluated by pairwise (tree) products of the 
+        overlap matrices. For 1D lattices and ribbons, a single loop is computed.
+
+        :param nk: Positive integer. Default value 100. 
+            Number of wave vectors along the loops.
+        :param n_perp: Positive integer. Default value 50.
+            Number of loops (2D lattices).
+        :param n_occ: Positive integer. Default value None.
+            Number of occupied bands (half of the bands if None).
+
+        :returns:
+            * **k_perp** -- Fractional coordinates of the loops along :math:`\mathbf{b}_2`.
+            * **phases** -- Wannier center phases (in :math:`(-\pi, \pi]`) of shape (n_perp, n_occ).
+        '''
+        n_occ = self.get_n_occ(n_occ)
+        error_handling.positive_int(nk, 'nk')
+        error_handling.positive_int(n_perp, 'n_perp')
+        if not np.any(self.bloch['recip'][1]):
+            n_perp = 1
+        k_perp = np.arange(n_perp) / n_perp
+        phases = np.empty((n_perp, n_occ))
+        step = max(1, CHUNK // nk)
+        for sl in [slice(i, min(i + step, n_perp)) for i in range(0, n_perp, step)]:
+            f2, f1 = np.meshgrid(k_perp[sl], np.arange(nk) / nk, indexing='ij')
+            vec = self.get_bloch_vec(f1, f2, n_occ)
+            wilson = np.matmul(vec.conj().swapaxes(-1, -2), np.roll(vec, -1, axis=1))
+            while wilson.shape[1] > 1:
+                half = wilson.shape[1] // 2
+                prod = np.matmul(wilson[:, 0: 2*half: 2], wilson[:, 1: 2*half: 2])
+                wilson = np.concatenate([prod, wilson[:, 2*half:]], axis=1)
+            phases[sl] = np.sort(-np.angle(np.linalg.eigvals(wilson[:, 0])), axis=-1)
+        return k_perp, phases
+
+    def get_zak(self, nk=100, n_perp=1, n_occ=None):
+        r'''
+        Get the Zak (Berry) phase of the *n_occ* lowest bands along the 
+        reciprocal vector :math:`\mathbf{b}_1`, sum of the Wilson loop phases 
+        (see *get_wilson*). The phase depends on the choice of the unit cell.
+
+        :param nk: Positive integer. Default value 100. 
+            Number of wave vectors along the loops.
+        :param n_perp: Positive integer. Default value 1.
+            Number of loops (2D lattices).
+        :param n_occ: Positive integer. Default value None.
+            Number of occupied bands (half of the bands if None).
+
+        :returns:
+            * **zak** -- Zak phases (in :math:`(-\pi, \pi]`) of shape (n_perp,).
+
+        Example usage::
+
+            sys.set_bloch([{'n': 1, 't': 1.}, {'n': 2, 't': 2.}])
+            zak = sys.get_zak()  # pi for the topological SSH chain
+        '''
+        phases = self.get_wilson(nk, n_perp, n_occ)[1]
+        return np.angle(np.exp(1j * np.sum(phases, axis=1)))
+
+    def get_kpath(self, points, nk):
+        '''
+        Get wave vectors along a path in the Brillouin zone.
+
+        :param points: List of wave vectors (kx, ky). Corners of the path.
+        :param nk: Positive integer. Number of wave vectors.
+
+        :returns:
+            * **k** -- Wave vectors of shape (nk, 2).
+            * **x** -- Distances along the path.
+        '''
+        error_handling.kpoints(points)
+        error_handling.positive_int(nk, 'nk')
+        points = np.atleast_2d(np.asarray(points, 'f8'))
+        dist = np.concatenate([[0.], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+        x = np.linspace(0., dist[-1], nk)
+        k = np.column_stack([np.interp(x, dist, points[:, 0]), np.interp(x, dist, points[:, 1])])
+        return k, x
 
     def get_ipr(self):
         r'''
@@ -587,7 +2208,9 @@ class system():
             IPR_n = |\sum_i\psi_i^{n}|^4\, .
         '''
         error_handling.empty_ndarray(self.rn, 'sys.get_eig(eigenvec=True)')
-        self.ipr = np.sum(self.intensity ** 2, axis=0)
+        self.ipr = np.empty(self.rn.shape[1], PRECISION[self.precision][0])
+        for sl in chunks(self.rn.shape[1]):
+            self.ipr[sl] = np.sum(np.abs(self.rn[:, sl]) ** 4, axis=0)
 
     def get_petermann(self):
         r'''
@@ -595,18 +2218,24 @@ class system():
         
         .. math::
 
-            K_n = \frac{\langle\psi_L^{n}|\psi_L^{n}\rangle\langle\psi_R^{n}|\psi_R^{n}\rangle}{\langle\psi_L^{n}|\psi_R^{n}\rangle}\, .
+            K_n = \frac{\langle\psi_L^{n}|\psi_L^{n}\rangle\langle\psi_R^{n}|\psi_R^{n}\rangle}{|\langle\psi_L^{n}|\psi_R^{n}\rangle|^2}\, .
 
         .. note::
 
-            LA.eig fixes the norm such that :math:`\langle\psi_L^{n}|\psi_L^{n}\rangle = 1` and :math:`\langle\psi_R^{n}|\psi_R^{n}\rangle = 1`.
+            *K* does not depend on the norms of the eigenvectors, so that 
+            both *get_eig(eigenvec=True, left=True)* (full spectrum) and 
+            *get_eig_arnoldi(left=True)* (partial spectrum) can be used.
         '''
-        if not (self.ham.H != self.ham).nnz:
-            self.petermann = np.ones(self.lat.sites)
+        if self.is_hermitian():
+            self.petermann = np.ones(len(self.en))
             return
         error_handling.empty_ndarray(self.ln, 'sys.get_eig(eigenvec=True, left=True)')
-        left_right = np.sum(self.ln * np.conjugate(self.rn), axis=0).real
-        self.petermann = 1. / left_right ** 2
+        self.petermann = np.empty(self.rn.shape[1])
+        for sl in chunks(self.rn.shape[1]):
+            left, right = self.ln[:, sl], self.rn[:, sl]
+            left_right = np.abs(np.sum(left.conj() * right, axis=0)) ** 2
+            self.petermann[sl] = np.sum(np.abs(left) ** 2, axis=0) * \
+                                             np.sum(np.abs(right) ** 2, axis=0) / left_right
 
     def get_intensity_pola_max(self, tag_pola):
         '''
@@ -620,9 +2249,9 @@ class system():
         error_handling.empty_ndarray(self.rn, 'sys.get_eig(eigenvec=True)')
         error_handling.tag(tag_pola, self.lat.tags)
         i_tag = self.lat.tags == tag_pola
-        ind = np.argmax(self.pola[:, i_tag])
-        print('State with polarization: {:.5f}'.format(float(self.pola[ind, i_tag])))
-        return self.intensity[:, ind]
+        ind = int(np.argmax(self.pola[:, i_tag]))
+        print('State with polarization: {:.5f}'.format(float(self.pola[ind, i_tag][0])))
+        return self.get_intensity(ind)
 
     def get_intensity_pola_min(self, tag_pola):
         '''
@@ -636,9 +2265,9 @@ class system():
         error_handling.empty_ndarray(self.rn, 'sys.get_eig(eigenvec=True)')
         error_handling.tag(tag_pola, self.lat.tags)
         i_tag = self.lat.tags == tag_pola
-        ind = np.argmin(self.pola[:, i_tag])
-        print('State with polarization: {:.5f}'.format(float(self.pola[ind, i_tag])))
-        return self.intensity[:, ind]
+        ind = int(np.argmin(self.pola[:, i_tag]))
+        print('State with polarization: {:.5f}'.format(float(self.pola[ind, i_tag][0])))
+        return self.get_intensity(ind)
 
     def get_intensity_en(self, lims):
         '''
@@ -655,4 +2284,268 @@ class system():
         ind = np.where((self.en > lims[0]) & (self.en < lims[1]))
         ind = np.ravel(ind)
         print('{} states between {} and {}'.format(len(ind), lims[0], lims[1]))
-        return np.sum(self.intensity[:, ind], axis=1)
+        intensity = np.zeros(self.lat.sites, PRECISION[self.precision][0])
+        for sl in chunks(len(ind)):
+            intensity += np.sum(np.abs(self.rn[:, ind[sl]]) ** 2, axis=1)
+        return intensity
+
+
+class serial():
+    '''
+    Private class.
+    Serial replacement of ProcessPoolExecutor (map in the current process).
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, func, *iterables):
+        return map(func, *iterables)
+
+
+def direction(ang):
+    '''
+    Private function.
+    Get the directions in [0, 360) of the hoppings of angles *ang* (in degrees), 
+    robust to the rounding errors of *arctan2* (-0 and 360 give 0).
+    '''
+    return np.mod(np.round(ang, 4), 360.)
+
+
+def orient(i, j, ang):
+    '''
+    Private function.
+    Orient the hoppings between the sites *i* and *j*, of angles *ang* 
+    (in degrees, from *i* to *j*), along their directions in [0, 180).
+
+    :returns:
+        * **i** -- Indices of the first sites.
+        * **j** -- Indices of the second sites.
+        * **ang** -- Directions, in [0, 180), from the first to the second sites.
+    '''
+    ang = direction(ang)
+    swap = ang >= 180.
+    return np.where(swap, j, i), np.where(swap, i, j), np.where(swap, ang - 180., ang)
+
+
+def chunks(n):
+    '''
+    Private function.
+    Get the slices of the blocks of *CHUNK* elements of range(n).
+    '''
+    return [slice(i, min(i + CHUNK, n)) for i in range(0, n, CHUNK)]
+
+
+def stencil(unit_cell, prim_vec, list_hop):
+    '''
+    Private function.
+    Get the hoppings of the upper part (positive angles) of the infinite lattice
+    defined by *unit_cell* and *prim_vec*:
+    :math:`H[(a, R), (b, R+d_1a_1+d_2a_2)] = t`.
+
+    :returns:
+        * **stencil** -- Array of (a, b, d1, d2).
+        * **t** -- Hoppings.
+        * **dist_uni** -- Different hopping distances.
+    '''
+    a1 = np.array(prim_vec[0], 'f8')
+    a2 = np.array(prim_vec[1], 'f8') if len(prim_vec) == 2 else np.zeros(2)
+    r0 = np.array([dic['r0'] for dic in unit_cell], 'f8')
+    tags = np.array([dic['tag'] for dic in unit_cell])
+    rng = np.arange(-6, 7)
+    a, b, d1, d2 = np.meshgrid(np.arange(len(r0)), np.arange(len(r0)), rng,
+                                               rng if len(prim_vec) == 2 else [0], indexing='ij')
+    a, b, d1, d2 = a.ravel(), b.ravel(), d1.ravel(), d2.ravel()
+    dif = r0[b] - r0[a] + d1.reshape(-1, 1) * a1 + d2.reshape(-1, 1) * a2
+    dis = np.sqrt(np.sum(dif ** 2, axis=1))
+    ang = 180 / PI * np.arctan2(dif[:, 1], dif[:, 0])
+    dist_uni = np.unique(dis.round(4))
+    error_handling.set_hopping(list_hop, len(dist_uni) - 1)
+    ang = direction(ang)
+    upper = ang < 180.
+    t = np.full(len(upper), np.nan, 'c16')
+    for dic in list_hop:
+        ind = upper & np.isclose(dis, dist_uni[dic['n']], atol=ATOL)
+        if 'ang' in dic:
+            angle = dic['ang'] if dic['ang'] >= 0 else dic['ang'] + 180.
+            ind &= np.isclose(ang, angle, atol=ATOL)
+        if 'tag' in dic:
+            ind &= (tags[a] == dic['tag'][:1]) & (tags[b] == dic['tag'][1:])
+        t[ind] = dic['t']
+    ind = np.flatnonzero(np.logical_not(np.isnan(t)))
+    return np.column_stack([a[ind], b[ind], d1[ind], d2[ind]]), t[ind], dist_uni
+
+
+def inertia(ham, en):
+    '''
+    Private function.
+    Get the number of eigenvalues of the Hermitian matrix *ham* 
+    smaller than *en* from the signs of the pivots of the symmetric 
+    sparse LU factorisation of *ham - en*. If a pivot vanishes 
+    (*en* is an eigenvalue), *en* is slightly shifted downwards.
+    '''
+    sites = ham.shape[0]
+    shift = 0.
+    for _ in range(4):
+        mat = (ham - (en - shift) * sparse.identity(sites, format='csr')).tocsc()
+        try:
+            lu = splu(mat, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0., 
+                          options={'SymmetricMode': True})
+        except RuntimeError:
+            lu = None
+        if lu is not None and np.all(lu.perm_r == lu.perm_c):
+            return int(np.sum(lu.U.diagonal().real < 0))
+        shift = 1e-10 * (1. + abs(en)) if not shift else 100. * shift
+    raise RuntimeError('\n\nInertia of H-E not computable for E={}.\n'.format(en))
+
+
+def eig_slice(ham, en_min, en_max, count_min, count_max, eigenvec):
+    '''
+    Private function.
+    Get the *count_max - count_min* eigenpairs of the Hermitian matrix 
+    *ham* with energies in [*en_min*, *en_max*) by shift-invert Lanczos 
+    (dense subset diagonalisation for small matrices or large slices).
+    '''
+    sites = ham.shape[0]
+    k = count_max - count_min
+    if k == 0:
+        return np.array([]), np.zeros((sites, 0), ham.dtype)
+    extra = max(10, k // 10)
+    while k + extra < sites - 1 and sites > 200:
+        res = eigsh(ham, k=k+extra, sigma=0.5 * (en_min + en_max), which='LM',
+                          return_eigenvectors=eigenvec)
+        en = res[0] if eigenvec else res
+        ind = np.argsort(en)
+        ind = ind[(en[ind] >= en_min) & (en[ind] < en_max)]
+        if len(ind) == k:
+            if eigenvec:
+                return en[ind], res[1][:, ind]
+            return en[ind], None
+        extra *= 2
+    res = LA.eigh(ham.toarray(), eigvals_only=not eigenvec, 
+                         subset_by_index=[count_min, count_max-1], driver='evr')
+    if eigenvec:
+        return res
+    return res, None
+
+
+def resolvent(ham, en, eta):
+    '''
+    Private function.
+    Get the sparse LU factorisation of :math:`E+i\\eta-H`.
+    '''
+    mat = (en + 1j * eta) * sparse.identity(ham.shape[0], 'c16', format='csc') - ham
+    return splu(mat.tocsc())
+
+
+def ldos_en(ham, en, eta):
+    '''
+    Private function.
+    Get the local density of states at energy *en* from the diagonal 
+    of the Green's function, solved by blocks of *CHUNK* sites 
+    with a single LU factorisation.
+    '''
+    sites = ham.shape[0]
+    lu = resolvent(ham, en, eta)
+    ldos = np.empty(sites)
+    for sl in chunks(sites):
+        ind = np.arange(sl.start, sl.stop)
+        rhs = np.zeros((sites, len(ind)), 'c16')
+        rhs[ind, np.arange(len(ind))] = 1.
+        ldos[sl] = -lu.solve(rhs)[ind, np.arange(len(ind))].imag / PI
+    return ldos
+
+
+def fill_pattern(pattern, phase):
+    '''
+    Private function.
+    Get the sparse Hamiltonian of the CSR pattern (see *system.get_pattern*)
+    with the phases *phase* added to the hoppings.
+    '''
+    val = pattern['t'] * np.exp(1j * pattern['sign'] * phase[pattern['bond']])
+    size = len(pattern['indices'])
+    data = np.bincount(pattern['slot'], val.real, size) + \
+              1j * np.bincount(pattern['slot'], val.imag, size)
+    return sparse.csr_matrix((data, pattern['indices'], pattern['indptr']), 
+                                         shape=(pattern['sites'], pattern['sites']))
+
+
+def flux_eig(pattern, phase, flux):
+    '''
+    Private function.
+    Get the eigenenergies at flux *flux* (see *system.get_flux_sweep*).
+    '''
+    return LA.eigvalsh(fill_pattern(pattern, flux * phase).toarray())
+
+
+def projector(ham, vec, en_f, order, en_min, en_max):
+    '''
+    Private function.
+    Apply the projector on the states with energies smaller than *en_f*
+    to the vectors *vec*, by a Chebyshev expansion of order *order*
+    with the Jackson kernel. The spectrum of *ham* is in [*en_min*, *en_max*].
+    '''
+    scale, center = 0.505 * (en_max - en_min), 0.5 * (en_max + en_min)
+    theta = np.arccos(np.clip((en_f - center) / scale, -1., 1.))
+    n = np.arange(1, order)
+    coef = np.concatenate([[1. - theta / PI], -2. * np.sin(n * theta) / (n * PI)])
+    n = np.arange(order)
+    jackson = ((order - n + 1) * np.cos(PI * n / (order + 1)) + 
+                    np.sin(PI * n / (order + 1)) / np.tan(PI / (order + 1))) / (order + 1)
+    coef *= jackson
+    vec_prev, vec_cur = vec, (ham.dot(vec) - center * vec) / scale
+    out = coef[0] * vec_prev + coef[1] * vec_cur
+    for c in coef[2:]:
+        vec_prev, vec_cur = vec_cur, 2. * (ham.dot(vec_cur) - center * vec_cur) / scale - vec_prev
+        out += c * vec_cur
+    return out
+
+
+def eig_block(ham, eigenvec):
+    '''
+    Private function.
+    Diagonalise the dense Hermitian block *ham*.
+    '''
+    if eigenvec:
+        return LA.eigh(ham)
+    return LA.eigvalsh(ham), None
+
+
+def eig_stack(stack, eigenvec):
+    '''
+    Private function.
+    Diagonalise the stack of dense Hermitian blocks *stack*.
+    '''
+    if eigenvec:
+        return np.linalg.eigh(stack)
+    return np.linalg.eigvalsh(stack), None
+
+
+def bandwidth(ham):
+    '''
+    Private function.
+    Get the bandwidth of the sparse matrix *ham*.
+    '''
+    ham = ham.tocoo()
+    if not ham.nnz:
+        return 0
+    return int(np.max(np.abs(ham.row.astype('i8') - ham.col)))
+
+
+def banded(mat, lower, upper, rows=None):
+    '''
+    Private function.
+    Get the LAPACK band storage *ab* of the sparse matrix *mat*, 
+    *ab[rows-1-lower+i-j, j] = mat[i, j]* (*rows* = lower+upper+1 by default), 
+    keeping only the *lower* subdiagonals and *upper* superdiagonals.
+    '''
+    if rows is None:
+        rows = lower + upper + 1
+    mat = mat.tocoo()
+    ab = np.zeros((rows, mat.shape[1]), mat.dtype)
+    keep = (mat.col - mat.row.astype('i8') <= upper) & (mat.row - mat.col.astype('i8') <= lower)
+    np.add.at(ab, (rows - 1 - lower + mat.row[keep] - mat.col[keep].astype('i8'), mat.col[keep]), 
+                    mat.data[keep])
+    return ab
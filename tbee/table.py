@@ -0,0 +1,249 @@
+import numpy as np
+
+
+#################################
+# CLASS TABLE
+#################################
+
+
+class table():
+    '''
+    Structure-of-arrays container used for the site coordinates
+    *lattice.coor* and the hoppings *system.hop*.
+
+    Each field is stored in its own contiguous array. Byte string fields
+    (tags) are stored as unsigned integer codes (one uint8 per char),
+    so that a tag is coded by a uint8 and a pair of tags by a uint16.
+
+    Fields are accessed as for structured arrays, *table['x']*
+    returns the (writable) array of the field *x*. Byte string fields
+    are returned as (writable) byte string views of the codes.
+    Indexing with masks, indices or slices returns a new table.
+
+    :param dtype: List of tuples (name, format) or numpy dtype.
+        Fields, as for structured arrays.
+    :param size: Positive integer or zero. Default value 0. Number of elements.
+
+    Example usage::
+
+        coor = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')], size=2)
+        coor['x'] = [0., 1.]
+        coor['tag'] = b'a'
+        coor_struct = coor.to_struct()
+
+    .. note::
+
+        Complex values assigned to a real field, with *table[name] = value*
+        or *table.assign(name, index, value)*, upcast the field to complex,
+        unless their imaginary parts are all zero.
+    '''
+
+    def __init__(self, dtype, size=0):
+        dtype = np.dtype(dtype)
+        self.names = list(dtype.names)
+        self.data = {}
+        for name in self.names:
+            fmt = dtype.fields[name][0]
+            if fmt.kind == 'S':
+                self.data[name] = np.zeros((size, fmt.itemsize), 'u1')
+            else:
+                self.data[name] = np.zeros(size, fmt)
+
+    @staticmethod
+    def from_struct(arr):
+        '''
+        Get a table from a structured array.
+
+        :param arr: Structured array.
+
+        :returns:
+            * **tab** -- Table.
+        '''
+        tab = table(arr.dtype, len(arr))
+        for name in tab.names:
+            tab[name] = arr[name]
+        return tab
+
+    @staticmethod
+    def concatenate(tabs):
+        '''
+        Concatenate tables (or structured arrays) with identical field names.
+
+        :param tabs: List of tables or structured arrays.
+
+        :returns:
+            * **tab** -- Table.
+        '''
+        tabs = [tab if isinstance(tab, table) else table.from_struct(tab) for tab in tabs]
+        tab = table.__new__(table)
+        tab.names = list(tabs[0].names)
+        tab.data = {name: np.concatenate([t.data[name] for t in tabs])
+                          for name in tab.names}
+        return tab
+
+    @property
+    def size(self):
+        return len(self.data[self.names[0]])
+
+    @property
+    def shape(self):
+        return (self.size,)
+
+    @property
+    def dtype(self):
+        '''
+        Equivalent structured array dtype.
+        '''
+        return np.dtype([(name, self.fmt(name)) for name in self.names])
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in self.data.values())
+
+    def fmt(self, name):
+        '''
+        Private method.
+        Get the format of the field *name*.
+        '''
+        arr = self.data[name]
+        if arr.ndim == 2:
+            return 'S{}'.format(arr.shape[1])
+        return arr.dtype
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.to_struct())
+
+    def __repr__(self):
+        return 'table({})'.format(repr(self.to_struct()))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            arr = self.data[key]
+            if arr.ndim == 2:
+                return arr.view('S{}'.format(arr.shape[1])).reshape(len(arr))
+            return arr
+        if isinstance(key, list) and key and all(isinstance(k, str) for k in key):
+            tab = table.__new__(table)
+            tab.names = list(key)
+            tab.data = {name: self.data[name] for name in key}
+            return tab
+        if isinstance(key, (int, np.integer)):
+            return self.to_struct()[key]
+        tab = table.__new__(table)
+        tab.names = list(self.names)
+        tab.data = {name: arr[key] for name, arr in self.data.items()}
+        return tab
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, str):
+            for name in self.names:
+                self.assign(name, key, value[name])
+            return
+        self.assign(key, Ellipsis, value)
+
+    def assign(self, name, index, value):
+        '''
+        Assign *value* to the elements *index* of the field *name*.
+        Real fields are upcast to complex if *value* has a nonzero
+        imaginary part.
+
+        :param name: String. Field name.
+        :param index: Mask, indices, slice, or Ellipsis.
+        :param value: Scalar or array. Values. Byte string fields
+            accept byte strings or uint8 codes.
+        '''
+        arr = self.data[name]
+        if arr.ndim == 2:
+            value = np.asarray(value)
+            if value.dtype.kind != 'u':
+                value = np.asarray(value, 'S{}'.format(arr.shape[1]))
+                value = value.view('u1').reshape(value.shape + (arr.shape[1],))
+            arr[index] = value
+            return
+        if np.iscomplexobj(value) and not np.iscomplexobj(arr):
+            if np.any(np.imag(value)):
+                arr = arr.astype(np.result_type(arr.dtype, np.complex64))
+                self.data[name] = arr
+            else:
+                value = np.real(value)
+        arr[index] = value
+
+    def code(self, name):
+        '''
+        Get the integer codes of a byte string field.
+
+        :param name: String. Field name.
+
+        :returns:
+            * **code** -- uint8 codes (one char) or uint16 codes (two chars).
+        '''
+        arr = self.data[name]
+        if arr.shape[1] == 1:
+            return arr.reshape(len(arr))
+        return arr.view('<u{}'.format(arr.shape[1])).reshape(len(arr))
+
+    def code_of(self, name, value):
+        '''
+        Get the integer code of a byte string for the field *name*.
+
+        :param name: String. Field name.
+        :param value: Binary string.
+
+        :returns:
+            * **code** -- Integer code.
+        '''
+        return np.frombuffer(value, '<u{}'.format(self.data[name].shape[1]))[0]
+
+    def equal(self, name, value):
+        '''
+        Compare, using the integer codes, a byte string field to *value*.
+
+        :param name: String. Field name.
+        :param value: Binary string.
+
+        :returns:
+            * **mask** -- Boolean array.
+        '''
+        return self.code(name) == self.code_of(name, value)
+
+    def argsort(self, order):
+        '''
+        Get the indices sorting the table (stable sort).
+
+        :param order: List or tuple of field names. The first field
+            is the primary key.
+
+        :returns:
+            * **ind** -- Indices.
+        '''
+        return np.lexsort([self.data[name] for name in order[::-1]])
+
+    def copy(self):
+        tab = table.__new__(table)
+        tab.names = list(self.names)
+        tab.data = {name: arr.copy() for name, arr in self.data.items()}
+        return tab
+
+    def astype(self, name, dtype):
+        '''
+        Cast the field *name*.
+
+        :param name: String. Field name.
+        :param dtype: Numpy dtype.
+        '''
+        self.data[name] = self.data[name].astype(dtype)
+
+    def to_struct(self):
+        '''
+        Get the equivalent (packed) structured array.
+
+        :returns:
+            * **arr** -- Structured array.
+        '''
+        arr = np.empty(self.size, self.dtype)
+        for name in self.names:
+            arr[name] = self[name]
+        return arr
@@ -0,0 +1,193 @@
+import numpy as np
+import scipy.linalg as LA
+import numpy.random as rand
+import tbee.error_handling as error_handling
+from tbee.lattice import lattice
+from tbee.hamiltonian import hamiltonian
+
+
+#################################
+# CLASS TRANSFER
+#################################
+
+
+class transfer():
+    r'''
+    Localisation length of disordered quasi-1D strips by the transfer matrix method.
+
+    The strip is made of *width* unit cells along :math:`\mathbf{a}_2` and is
+    infinite along :math:`\mathbf{a}_1`. The slices (groups of unit cells
+    along :math:`\mathbf{a}_1` coupled only to the neighbouring slices) are
+    generated on the fly with random onsite energies and hoppings, so that
+    neither the lattice nor the hoppings of the strip are stored.
+    The product of the transfer matrices is re-orthogonalised by QR
+    decompositions, and the cost is :math:`O(L\,w^3)` for *L* slices of *w* sites.
+
+    If the coupling between the slices is not invertible (e.g. honeycomb strips),
+    it must couple distinct sets of sites of the same size: the sites *R* 
+    coupled to the next slice and the sites *L* coupled to the previous one. 
+    The other sites of the slices are eliminated by Schur complements, and 
+    each transfer matrix is the product of the steps from *L* to *R* 
+    (inside the slice) and from *R* to *L* (to the next slice).
+
+    :param lat: **lattice** class instance. Only *unit_cell* and *prim_vec* are used.
+    :param list_hop: List of Dictionaries (see *system.set_hopping*).
+    :param dict_onsite: Dictionary. Default value None.
+        Onsite energies (see *system.set_onsite*).
+
+    Example usage::
+
+        tr = transfer(lat, [{'n': 1, 't': 1.}])
+        xi = tr.get_localisation(en=0., width=16, length=10**6, alpha_onsite=2.)
+    '''
+    def __init__(self, lat, list_hop, dict_onsite=None):
+        error_handling.lat(lat)
+        self.lat = lat
+        self.list_hop = list_hop
+        self.dict_onsite = dict_onsite
+        self.lyapunov = np.array([], 'f8')  # Lyapunov exponents (per unit length)
+        self.xi = 0.  # Localisation length
+
+    def get_slices(self, width):
+        '''
+        Private method.
+        Get the slice Hamiltonian *ham_slice* and the coupling *ham_hop*
+        to the next slice of the clean strip.
+        '''
+        for cells in range(1, 4):
+            lat = lattice(unit_cell=self.lat.unit_cell, prim_vec=self.lat.prim_vec)
+            if len(self.lat.prim_vec) == 2:
+                lat.get_lattice(n1=3*cells, n2=width)
+            else:
+                lat.get_lattice(n1=3*cells)
+            ham = hamiltonian(lat, self.list_hop, self.dict_onsite).toarray()
+            uc, n1, n2 = lat.get_grid()
+            n1 = n1 - n1.min()
+            ind = np.lexsort((uc, n2, n1))
+            sites = len(ind) // 3
+            slices = [ind[k*sites: (k+1)*sites] for k in range(3)]
+            if not np.any(ham[np.ix_(slices[0], slices[2])]):
+                break
+        else:
+            raise ValueError('\n\nThe hoppings must couple unit cells closer than 3 cells along a1.\n')
+        self.cells = cells
+        self.ham_slice = ham[np.ix_(slices[0], slices[0])]
+        self.ham_hop = ham[np.ix_(slices[0], slices[1])]
+        self.reduction = None
+        if np.linalg.matrix_rank(self.ham_hop) < sites:
+            right = np.flatnonzero(np.any(self.ham_hop, axis=1))
+            left = np.flatnonzero(np.any(self.ham_hop, axis=0))
+            inner = np.setdiff1d(np.arange(sites), np.union1d(left, right))
+            if np.intersect1d(left, right).size or len(left) != len(right) or \
+                    np.linalg.matrix_rank(self.ham_hop[np.ix_(right, left)]) < len(left):
+                raise ValueError('\n\nThe coupling between the slices must be invertible, or couple '
+                                           'distinct sets of sites of the same size.\n')
+            self.reduction = left, right, inner
+
+    def get_localisation(self, en, width, length, alpha_onsite=0., alpha_hopping=0.,
+                                   qr_step=10, seed=None):
+        r'''
+        Get the Lyapunov exponents :math:`\gamma_1 > ... > \gamma_w > 0` of the
+        transfer matrix product and the localisation length
+        :math:`\xi = 1/\gamma_w`.
+
+        :param en: Real number. Energy.
+        :param width: Positive integer. Number of unit cells along :math:`\mathbf{a}_2`.
+        :param length: Positive integer. Number of slices.
+        :param alpha_onsite: Real number. Default value 0.
+            Onsite disorder strength (see *system.set_onsite_dis*).
+        :param alpha_hopping: Real number. Default value 0.
+            Hopping disorder strength (see *system.set_hopping_dis*).
+        :param qr_step: Positive integer. Default value 10.
+            Number of slices between two QR re-orthogonalisations.
+        :param seed: Integer. Default value None. Seed of the random generator.
+
+        :returns:
+            * **xi** -- Localisation length (in units of the lattice distances,
+              *np.inf* for extended states).
+        '''
+        error_handling.real_number(en, 'en')
+        error_handling.positive_int(width, 'width')
+        error_handling.positive_int(length, 'length')
+        error_handling.real_number(alpha_onsite, 'alpha_onsite')
+        error_handling.real_number(alpha_hopping, 'alpha_hopping')
+        error_handling.positive_int(qr_step, 'qr_step')
+        self.get_slices(width)
+        sites = len(self.ham_slice)
+        gen = rand.RandomState(seed)
+        upper = np.triu(self.ham_slice, 1)
+        diag = np.diag(np.diag(self.ham_slice))
+        hop = self.ham_hop
+        if self.reduction is None:
+            hop_inv, hop_adj = LA.inv(hop), hop.conj().T
+            dim = sites
+        else:
+            left, right, inner = self.reduction
+            dim = len(left)
+        # state (psi_n, psi_{n-1}) of the growing directions
+        psi, psi_prev = np.eye(dim, dtype=self.ham_slice.dtype), np.zeros((dim, dim))
+        log_norm = np.zeros(dim)
+        for start in range(0, length, qr_step):
+            steps = min(qr_step, length - start)
+            onsite = alpha_onsite * gen.uniform(-1., 1., (steps, sites, 1))
+            if alpha_hopping:
+                dis_upper = alpha_hopping * gen.uniform(-1., 1., (steps,) + upper.shape)
+                dis_hop = alpha_hopping * gen.uniform(-1., 1., (steps,) + hop.shape)
+            # H_{n,n+1} psi_{n+1} = (E - H_n) psi_n - H_{n,n-1} psi_{n-1}
+            for n in range(steps):
+                if self.reduction is not None:
+                    ham = self.ham_slice
+                    if alpha_hopping:
+                        ham = upper * (1. + dis_upper[n])
+                        ham = ham + ham.conj().T + diag
+                        hop_prev, hop = hop, self.ham_hop * (1. + dis_hop[n])
+                    else:
+                        hop_prev = hop
+                    psi, psi_prev = reduced_step(en - onsite[n].ravel(), ham, hop_prev, hop, 
+                                                                left, right, inner, psi, psi_prev)
+                    continue
+                if alpha_hopping:
+                    ham = upper * (1. + dis_upper[n])
+                    ham = ham + ham.conj().T + diag
+                    hop_adj = hop.conj().T
+                    hop = self.ham_hop * (1. + dis_hop[n])
+                    rhs = (en - onsite[n]) * psi - np.dot(ham, psi) - np.dot(hop_adj, psi_prev)
+                    psi, psi_prev = LA.solve(hop, rhs), psi
+                else:
+                    rhs = (en - onsite[n]) * psi - np.dot(self.ham_slice, psi) - np.dot(hop_adj, psi_prev)
+                    psi, psi_prev = np.dot(hop_inv, rhs), psi
+            q, r = LA.qr(np.vstack([psi, psi_prev]), mode='economic')
+            log_norm += np.log(np.abs(np.diag(r)))
+            psi, psi_prev = q[:dim], q[dim:]
+        step = self.cells * LA.norm(self.lat.prim_vec[0])
+        self.lyapunov = np.sort(log_norm)[::-1] / (length * step)
+        self.xi = 1. / self.lyapunov[-1] if self.lyapunov[-1] > 0 else np.inf
+        return self.xi
+
+
+def reduced_step(en, ham, hop_prev, hop, left, right, inner, psi, psi_prev):
+    '''
+    Private function.
+    Get the state :math:`(\psi_{n+1,L}, \psi_{n,R})` from the state 
+    :math:`(\psi_{n,L}, \psi_{n-1,R})`, *left* (*right*) being the sites of 
+    the slices coupled to the previous (next) slice and *inner* the other sites, 
+    eliminated by Schur complement.
+
+    :param en: np.ndarray. Energies minus the onsite disorder, for each site.
+    :param ham: np.ndarray. Slice Hamiltonian.
+    :param hop_prev: np.ndarray. Coupling from the previous slice.
+    :param hop: np.ndarray. Coupling to the next slice.
+    '''
+    a = np.diag(en) - ham
+    ind = np.concatenate([left, right])
+    a_red = a[np.ix_(ind, ind)]
+    if inner.size:
+        a_red = a_red - np.dot(a[np.ix_(ind, inner)], 
+                                         LA.solve(a[np.ix_(inner, inner)], a[np.ix_(inner, ind)]))
+    r = len(left)
+    # A_LL psi_L + A_LR psi_R = H_{n,n-1} psi_{n-1,R}
+    psi_r = LA.solve(a_red[:r, r:], np.dot(hop_prev[np.ix_(right, left)].conj().T, psi_prev)
+                                                 - np.dot(a_red[:r, :r], psi))
+    # H_{n,n+1} psi_{n+1,L} = A_RL psi_L + A_RR psi_R
+    psi_l = LA.solve(hop[np.ix_(right, left)], np.dot(a_red[r:, :r], psi) + np.dot(a_red[r:, r:], psi_r))
+    return psi_l, psi_r
@@ -0,0 +1,216 @@
+import numpy as np
+import scipy.linalg as LA
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import tbee.error_handling as error_handling
+from tbee.system import ATOL, serial
+
+
+#################################
+# CLASS TRANSPORT
+#################################
+
+
+class transport():
+    r'''
+    Two-terminal transmission along x (Landauer formula)
+    by recursive Green's function sweeps.
+
+    The lattice is sliced along x into principal layers of width *width*,
+    so that the hoppings only couple neighbouring layers. The left (right) lead
+    is the semi-infinite periodic continuation of the first (last) layer,
+    and its self-energy is obtained by decimation (Lopez Sancho).
+    The cost is :math:`O(L\,w^3)` per energy for *L* layers of *w* sites.
+
+    The layers are counted from the left end for the left lead, and from 
+    the right end for the right lead, so that a partial layer (lattices 
+    whose length is not a multiple of *width*) is left in the scattering 
+    region. The two first (last) layers must be translation-equivalent.
+
+    :param sys: **system** class instance (see *system.get_ham*).
+    :param width: Positive number. Default value None.
+        Width of the principal layers, a multiple of the period along x 
+        of the lattice (given by its primitive vectors). If None, the 
+        smallest multiple larger than the hopping lengths along x.
+
+    Example usage::
+
+        sys.get_ham()
+        tr = transport(sys)
+        tr.get_transmission(np.linspace(-3, 3, 200), processes=4)
+        fig = tr.plt_transmission()
+    '''
+    def __init__(self, sys, width=None):
+        error_handling.sys(sys)
+        error_handling.empty_ham(sys.ham)
+        if width is not None:
+            error_handling.positive_real(width, 'width')
+        self.sys = sys
+        self.get_layers(width)
+        self.en = np.array([], 'f8')  # Energies
+        self.trans = np.array([], 'f8')  # Transmissions
+
+    def get_layers(self, width):
+        '''
+        Private method.
+        Get the principal layers and the blocks of the Hamiltonian.
+        '''
+        ham = self.sys.ham.tocsr()
+        coo = ham.tocoo()
+        x, y = self.sys.lat.coor['x'], self.sys.lat.coor['y']
+        dx_max = np.max(np.abs(x[coo.row] - x[coo.col]))
+        if dx_max < ATOL:
+            raise ValueError('\n\nThe hoppings must couple sites along x.\n')
+        period = self.get_period()
+        if width is None:
+            width = period * np.ceil(dx_max / period - ATOL)
+        if abs(width / period - np.round(width / period)) > ATOL or width < period - ATOL:
+            raise ValueError('\n\nParameter width must be a multiple of the lattice period '
+                                       'along x ({:.4f}).\n'.format(period))
+        if width < dx_max - ATOL:
+            raise ValueError('\n\nParameter width must be larger than the hopping lengths along x.\n')
+        self.width = width
+        # layers counted from the left end, and from the right end for the right lead
+        left = np.floor((x - x.min() + ATOL) / width).astype(int)
+        right = np.floor((x.max() - x + ATOL) / width).astype(int)
+        if np.all(left + right == left.max()):
+            layer, edge = left, x.min() + width * left
+        else:
+            if np.any((left <= 2) & (right <= 2)):
+                raise ValueError('\n\nThe lattice must contain at least three principal layers '
+                                           'at each end.\n')
+            layer = np.where(right <= 2, left.max() + 3 - right, left)
+            edge = np.where(right <= 2, x.max() - width * (right + 1), x.min() + width * left)
+        layer = np.unique(layer, return_inverse=True)[1].ravel()
+        if len(np.unique(layer)) < 2:
+            raise ValueError('\n\nThe lattice must contain at least two principal layers.\n')
+        if np.any(np.abs(layer[coo.row] - layer[coo.col]) > 1):
+            raise ValueError('\n\nThe hoppings must only couple neighbouring principal layers '
+                                       '(see parameter width).\n')
+        # sites of each layer sorted by y then x
+        ind = np.lexsort((np.round(x - edge, 4), np.round(y, 4), layer))
+        bounds = np.flatnonzero(np.diff(layer[ind])) + 1
+        self.layers = np.split(ind, bounds)
+        self.ham_diag = [ham[l][:, l].toarray() for l in self.layers]
+        self.ham_off = [ham[l][:, m].toarray() for l, m in zip(self.layers[:-1], self.layers[1:])]
+        for blocks in [self.ham_diag[:2] + self.ham_off[:2], self.ham_diag[-2:] + self.ham_off[-2:]]:
+            if any(a.shape != b.shape or not np.allclose(a, b, atol=ATOL) 
+                     for a, b in [blocks[:2], blocks[2:]] if len(b)):
+                raise ValueError('\n\nThe two first and two last principal layers must be '
+                                           'translation-equivalent to build the leads (see parameter width).\n')
+        self.lead_left = (self.ham_diag[0], self.ham_off[0])
+        self.lead_right = (self.ham_diag[-1], self.ham_off[-1])
+
+    def get_period(self):
+        '''
+        Private method.
+        Get the period along x of the lattice, the shortest translation 
+        along x spanned by its primitive vectors.
+        '''
+        prim_vec = np.array(self.sys.lat.prim_vec, 'f8')
+        n = np.arange(-6, 7)
+        n = np.array(np.meshgrid(*[n] * len(prim_vec))).reshape(len(prim_vec), -1)
+        vec = np.dot(n.T, prim_vec)
+        vec = vec[(np.abs(vec[:, 1]) < ATOL) & (vec[:, 0] > ATOL)]
+        if not len(vec):
+            raise ValueError('\n\nThe lattice must be periodic along x.\n')
+        return vec[:, 0].min()
+
+    def get_transmission(self, en, eta=1e-8, processes=1):
+        '''
+        Get the transmission between the left and right leads.
+
+        :param en: List or np.ndarray of real numbers. Energies.
+        :param eta: Positive number. Default value 1e-8. Broadening.
+        :param processes: Positive integer. Default value 1.
+            Number of worker processes (number of CPUs if None).
+
+        :returns:
+            * **trans** -- Transmissions.
+        '''
+        error_handling.ndarray_empty(np.asarray(en, 'f8'), 'en')
+        error_handling.positive_real(eta, 'eta')
+        if processes is not None:
+            error_handling.positive_int(processes, 'processes')
+        self.en = np.asarray(en, 'f8').ravel()
+        args = [self.ham_diag, self.ham_off, self.lead_left, self.lead_right]
+        with ProcessPoolExecutor(max_workers=processes) if processes != 1 else serial() as pool:
+            trans = pool.map(transmission, *[[arg] * len(self.en) for arg in args],
+                                     self.en, [eta] * len(self.en))
+            self.trans = np.array(list(trans))
+        return self.trans
+
+    def plt_transmission(self, fs=20, lw=2, figsize=None):
+        '''
+        Plot the transmission.
+
+        :param fs: Positive number. Default value 20. Fontsize.
+        :param lw: Positive number. Default value 2. Linewidth.
+        :param figsize: Tuple. Default value None. Figsize.
+
+        :returns:
+            * **fig** -- Figure.
+        '''
+        error_handling.empty_ndarray(self.trans, 'get_transmission')
+        error_handling.positive_real(fs, 'fs')
+        error_handling.positive_real(lw, 'lw')
+        error_handling.tuple_2elem(figsize, 'figsize')
+        fig, ax = plt.subplots(figsize=figsize)
+        plt.plot(self.en, self.trans, 'b', lw=lw)
+        plt.xlabel('$E$', fontsize=fs)
+        plt.ylabel('$T(E)$', fontsize=fs)
+        for label in ax.xaxis.get_majorticklabels():
+            label.set_fontsize(fs)
+        for label in ax.yaxis.get_majorticklabels():
+            label.set_fontsize(fs)
+        return fig
+
+
+def surface_green(en, ham, hop, eta):
+    '''
+    Private function.
+    Get the surface Green's function of the semi-infinite lead made
+    of cells *ham* coupled to the next cell (away from the surface)
+    by *hop*, by decimation (Lopez Sancho, Lopez Sancho and Rubio).
+    '''
+    z = (en + 1j * eta) * np.eye(len(ham))
+    eps_s, eps = ham.astype('c16'), ham.astype('c16')
+    alpha, beta = hop.astype('c16'), hop.conj().T.astype('c16')
+    for _ in range(100):
+        g = LA.inv(z - eps)
+        ag, bg = np.dot(alpha, g), np.dot(beta, g)
+        eps_s = eps_s + np.dot(ag, beta)
+        eps = eps + np.dot(ag, beta) + np.dot(bg, alpha)
+        alpha, beta = np.dot(ag, alpha), np.dot(bg, beta)
+        if np.max(np.abs(alpha)) < 1e-12 and np.max(np.abs(beta)) < 1e-12:
+            break
+    return LA.inv(z - eps_s)
+
+
+def transmission(ham_diag, ham_off, lead_left, lead_right, en, eta):
+    '''
+    Private function.
+    Get the transmission at energy *en* by a recursive Green's function
+    sweep from the left lead to the right lead:
+    :math:`T = Tr[\\Gamma_R G_{N1} \\Gamma_L G_{N1}^\\dagger]`.
+    '''
+    z = en + 1j * eta
+    # left lead: the surface cell is coupled to the deeper cell by hop^dagger
+    ham, hop = lead_left
+    sigma_left = np.dot(hop.conj().T, np.dot(surface_green(en, ham, hop.conj().T, eta), hop))
+    ham, hop = lead_right
+    sigma_right = np.dot(hop, np.dot(surface_green(en, ham, hop, eta), hop.conj().T))
+    gamma_left = 1j * (sigma_left - sigma_left.conj().T)
+    gamma_right = 1j * (sigma_right - sigma_right.conj().T)
+    # forward sweep: g (diagonal block) and g_1 (block (n, 1)) of the left-connected Green's function
+    last = len(ham_diag) - 1
+    sigma = sigma_left
+    g_1 = None
+    for n, ham in enumerate(ham_diag):
+        if n == last:
+            sigma = sigma + sigma_right
+        g = LA.inv(z * np.eye(len(ham)) - ham - sigma)
+        g_1 = g if g_1 is None else np.dot(g, np.dot(ham_off[n-1].conj().T, g_1))
+        if n < last:
+            sigma = np.dot(ham_off[n].conj().T, np.dot(g, ham_off[n]))
+    return np.trace(np.dot(gamma_right, np.dot(g_1, np.dot(gamma_left, g_1.conj().T)))).real
@@ -0,0 +1,67 @@
+from tbee.graphene import *
+import tbee.graphene as graphene
+
+import unittest
+import numpy as np
+import numpy.linalg as LA
+
+
+def init(n):
+    lat = grapheneLat()
+    lat.hexagon_zigzag(n)
+    sys = grapheneSys(lat)
+    return sys
+
+def butterfly_loop(sys, t):
+    '''
+    Energies depending on strain, one Hamiltonian per strain value.
+    '''
+    butterfly = np.zeros((len(sys.betas), sys.lat.sites))
+    for k, beta in enumerate(sys.betas):
+        sys.set_hop_linear_strain(t=t, beta=beta)
+        sys.get_ham()
+        butterfly[k] = LA.eigvalsh(sys.ham.toarray())
+    return butterfly
+
+class TestGraphene(unittest.TestCase):
+    '''
+    Unittest of class **grapheneSys**.
+    '''
+    def test_get_butterfly(self):
+        # small flake: stacked diagonalisations
+        sys = init(3)
+        self.assertTrue(sys.lat.sites <= STACK_SITES)
+        sys.get_butterfly(t=-1., N=5)
+        self.assertTrue(sys.butterfly.shape == (5, sys.lat.sites))
+        self.assertTrue(np.allclose(sys.butterfly, butterfly_loop(sys, -1.)))
+        # stacks of two Hamiltonians
+        stack_bytes, graphene.STACK_BYTES = graphene.STACK_BYTES, 2 * 8 * sys.lat.sites ** 2
+        try:
+            sys.get_butterfly(t=-1., N=5)
+        finally:
+            graphene.STACK_BYTES = stack_bytes
+        self.assertTrue(np.allclose(sys.butterfly, butterfly_loop(sys, -1.)))
+
+    def test_get_butterfly_pool(self):
+        # large flake: diagonalisations in a process pool
+        sys = init(8)
+        self.assertTrue(sys.lat.sites > STACK_SITES)
+        sys.get_butterfly(t=-1., N=3, processes=2)
+        self.assertTrue(sys.butterfly.shape == (3, sys.lat.sites))
+        self.assertTrue(np.allclose(sys.butterfly, butterfly_loop(sys, -1.)))
+
+    def test_get_strain(self):
+        sys = init(3)
+        strain = sys.get_strain()
+        self.assertTrue(sys.get_strain() is strain)
+        # same number of sites and same coordinate sums, different lattice
+        x = sys.lat.coor['x'].copy()
+        sys.lat.coor['x'][0] += 1.
+        sys.lat.coor['x'][-1] -= 1.
+        self.assertFalse(sys.get_strain() is strain)
+        sys.lat.coor['x'] = x
+        self.assertTrue(np.array_equal(sys.get_strain()['proj'], strain['proj']))
+
+
+if __name__ == '__main__':
+    unittest.main()
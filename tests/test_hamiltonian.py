@@ -0,0 +1,78 @@
+from tbee.lattice import *
+from tbee.system import *
+from tbee.hamiltonian import *
+import unittest
+import numpy as np
+from math import sqrt
+
+
+PI = np.pi
+
+
+def init():
+    unit_cell = [{'tag': b'a', 'r0': (0., 0.)}, 
+                      {'tag': b'b', 'r0': (0.5, 0.5/sqrt(3))}]
+    prim_vec = [(1, 0.), 
+                (cos(PI/3), sin(PI/3))]
+    lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+    lat.get_lattice(n1=6, n2=5)
+    lat.remove_sites([3, 17])
+    return lat
+
+class TestHamiltonian(unittest.TestCase):
+    '''
+    Unittest of class **hamiltonian**.
+    '''
+    def test_init(self):
+        lat = init()
+        self.assertRaises(TypeError, hamiltonian, 0, [{'n': 1, 't': 1.}])
+        self.assertRaises(ValueError, hamiltonian, lat, [{'n': 1, 't': 1.}], precision='half')
+        self.assertRaises(ValueError, hamiltonian, lat, [{'n': 100, 't': 1.}])
+
+    def test_matvec(self):
+        lat = init()
+        list_hop = [{'n': 1, 't': 1.}, {'n': 1, 'ang': 90, 't': 2.}, 
+                         {'n': 2, 'tag': b'aa', 't': 0.2j}]
+        dict_onsite = {b'a': 0.5, b'b': -0.5}
+        sys = system(lat)
+        sys.set_hopping(list_hop)
+        sys.set_onsite(dict_onsite)
+        sys.set_onsite_def({4: 3.})
+        sys.set_hopping_def({(0, 1): 5.})
+        sys.get_ham()
+        ham = hamiltonian(lat, list_hop, dict_onsite, 
+                                    hopping_def={(0, 1): 5.}, onsite_def={4: 3.})
+        self.assertTrue(ham.dtype == np.complex128)
+        self.assertTrue(np.allclose(ham.toarray(), sys.ham.toarray()))
+        vec = np.random.rand(lat.sites)
+        self.assertTrue(np.allclose(ham.dot(vec), sys.ham.dot(vec)))
+        self.assertTrue(np.allclose(ham.H.dot(vec), sys.ham.conj().T.dot(vec)))
+        # gain and loss: the adjoint is not the Hamiltonian
+        ham = hamiltonian(lat, list_hop, {b'a': 0.1j, b'b': -0.1j}, 
+                                    hopping_def={(0, 1): 5.}, onsite_def={4: 3.-0.2j})
+        vec = np.random.rand(lat.sites) + 1j * np.random.rand(lat.sites)
+        self.assertTrue(np.allclose(ham.H.dot(vec), ham.toarray().conj().T.dot(vec)))
+        self.assertTrue(np.allclose(ham.H.matmat(np.eye(lat.sites)), ham.toarray().conj().T))
+        self.assertFalse(np.allclose(ham.H.dot(vec), ham.dot(vec)))
+
+    def test_rotated(self):
+        # bonds along x are kept despite the rounding errors of the rotation
+        unit_cell = [{'tag': b'a', 'r0': (0., 0.)}]
+        for rot in [0., PI/3, 2*PI/3]:
+            prim_vec = [(cos(rot), sin(rot)), (cos(rot+PI/3), sin(rot+PI/3))]
+            lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+            lat.get_lattice(n1=6, n2=6)
+            sys = system(lat)
+            sys.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 0.3}])
+            sys.get_ham()
+            ham = hamiltonian(lat, [{'n': 1, 't': 1.}, {'n': 2, 't': 0.3}])
+            self.assertTrue(np.allclose(ham.toarray(), sys.ham.toarray()))
+
+    def test_real(self):
+        lat = init()
+        ham = hamiltonian(lat, [{'n': 1, 't': 1.}], precision='single')
+        self.assertTrue(ham.dtype == np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 from tbee.lattice import *
 from tbee.system import *
 from tbee.propagation import *
+from tbee.hamiltonian import *
 import unittest
 import numpy as np
+import scipy.linalg as LA
 from math import sqrt
 
 
@@ -21,4 +23,53 @@ def init():
     sys = system(lat=lat)
     sys.set_hopping([{'n': 1, 't': 1.}])
     sys.get_ham()
-    return sys
\ No newline at end of file
+    return sys
+
+class TestPropagation(unittest.TestCase):
+    '''
+    Unittest of class **propagation**.
+    '''
+    def test_init(self):
+        sys = init()
+        self.assertRaises(TypeError, propagation, lat=0)
+        self.assertRaises(ValueError, propagation, sys.lat, precision='half')
+
+    def test_precision(self):
+        sys = init()
+        psi_init = np.zeros(sys.lat.sites, 'c16')
+        psi_init[0] = 1.
+        prop = propagation(sys.lat)
+        prop.get_propagation(sys.ham, psi_init, steps=20, dz=0.1)
+        prop_single = propagation(sys.lat, precision='single')
+        prop_single.get_propagation(sys.ham, psi_init, steps=20, dz=0.1)
+        self.assertTrue(prop_single.prop.dtype == np.complex64)
+        self.assertTrue(np.allclose(prop_single.prop, prop.prop, atol=1e-5))
+
+    def test_banded(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}]
+        prim_vec = [(1., 0.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=50)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.set_onsite({b'a': 0.})
+        sys.set_onsite_def({0: -1j})
+        sys.get_ham()
+        psi_init = np.zeros(lat.sites, 'c16')
+        psi_init[25] = 1.
+        prop = propagation(lat)
+        prop.get_propagation(sys.ham, psi_init, steps=20, dz=0.1)
+        A = 1j * np.eye(lat.sites) - 0.05 * sys.ham.toarray()
+        B = 1j * np.eye(lat.sites) + 0.05 * sys.ham.toarray()
+        psi = np.linalg.solve(A, B.dot(psi_init))
+        self.assertTrue(np.allclose(prop.prop[:, 1], psi))
+
+    def test_krylov(self):
+        sys = init()
+        ham = hamiltonian(sys.lat, [{'n': 1, 't': 1.}])
+        psi_init = np.zeros(sys.lat.sites, 'c16')
+        psi_init[0] = 1.
+        prop = propagation(sys.lat)
+        prop.get_propagation(ham, psi_init, steps=20, dz=0.1)
+        psi = LA.expm(-1.9j * sys.ham.toarray()).dot(psi_init)
+        self.assertTrue(np.allclose(prop.prop[:, -1], psi))
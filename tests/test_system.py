@@ -3,6 +3,7 @@ from tbee.system import *
 
 import unittest
 import numpy as np
+import scipy.sparse as sparse
 
 def init():
     unit_cell = [{'tag': b'a', 'r0': (0, 0)}]
@@ -47,6 +48,45 @@ class TestSystem(unittest.TestCase):
         self.assertRaises(ValueError, sys.set_hopping, [{'n': 1, 't': 1., 'tag': b'a'}])
         self.assertRaises(ValueError, sys.set_hopping, [{'n': 1, 't': 1., 'tag': b'aa', 'ang': 0, 'a':0}])
 
+    def test_set_hopping_rotated(self):
+        # bonds almost along x must not be lost to the rounding errors of the angles
+        sizes, ens = [], []
+        for rot in [0., PI / 3, 2 * PI / 3]:
+            prim_vec = [(cos(rot), sin(rot)), (cos(rot + PI / 3), sin(rot + PI / 3))]
+            lat = lattice(unit_cell=[{'tag': b'a', 'r0': (0, 0)}], prim_vec=prim_vec)
+            lat.get_lattice(n1=6, n2=6)
+            sys = system(lat)
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            sys.get_ham()
+            sizes.append(len(sys.hop))
+            ens.append(np.linalg.eigvalsh(sys.ham.toarray()))
+            # the angles are the directions from i to j
+            sys.reorder_sites()
+            sys.set_hopping([{'n': 1, 't': 1.}])
+            dif_x = lat.coor['x'][sys.hop['j']] - lat.coor['x'][sys.hop['i']]
+            dif_y = lat.coor['y'][sys.hop['j']] - lat.coor['y'][sys.hop['i']]
+            self.assertTrue(len(sys.hop) == sizes[0])
+            self.assertTrue(np.all((sys.hop['ang'] >= 0) & (sys.hop['ang'] < 180)))
+            self.assertTrue(np.allclose(np.cos(PI / 180 * sys.hop['ang']), dif_x, atol=1e-5))
+            self.assertTrue(np.allclose(np.sin(PI / 180 * sys.hop['ang']), dif_y, atol=1e-5))
+        self.assertTrue(sizes == [85, 85, 85])
+        self.assertTrue(np.allclose(ens[1], ens[0]) and np.allclose(ens[2], ens[0]))
+
+    def test_set_hopping_reordered(self):
+        # complex hoppings set after a reordering give the permuted Hamiltonian
+        lat = lattice(unit_cell=[{'tag': b'a', 'r0': (0, 0)}], prim_vec=[(1., 0.), (0, 1.)])
+        lat.get_lattice(n1=40, n2=3)
+        sys = system(lat)
+        list_hop = [{'n': 1, 't': 1.}, {'n': 2, 't': 0.2j}]
+        sys.set_hopping(list_hop)
+        sys.get_ham()
+        ham = sys.ham.toarray()
+        sys.reorder_sites()
+        sys.clear_hopping()
+        sys.set_hopping(list_hop)
+        sys.get_ham()
+        self.assertTrue(np.allclose(sys.ham.toarray(), ham[sys.perm][:, sys.perm]))
+
     def test_set_hopping_example(self):
         unit_cell = [{'tag': b'a', 'r0': (0, 0)}, 
                           {'tag': b'b', 'r0': (1, 0)}]
@@ -269,11 +309,202 @@ class TestSystem(unittest.TestCase):
         # alpha must be a positive number.
         self.assertRaises(TypeError, sys.set_hopping_dis, 'a')
 
+    def test_set_hopping_func(self):
+        sys = init()
+        func = lambda x_i, y_i, x_j, y_j, tag_i, tag_j, ang: 1. + x_i * (ang == 90.)
+        self.assertRaises(RuntimeError, sys.set_hopping_func, func)
+        sys.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 2.}])
+        self.assertRaises(TypeError, sys.set_hopping_func, 1.)
+        self.assertRaises(ValueError, sys.set_hopping_func, lambda *args: 'a')
+        sys.set_hopping_func(func, n=1, chunk=7)
+        ind = sys.hop['n'] == 1
+        x_i = sys.lat.coor['x'][sys.hop['i'][ind]]
+        self.assertTrue(np.allclose(sys.hop['t'][ind], 1. + x_i * (sys.hop['ang'][ind] == 90.)))
+        self.assertTrue(np.allclose(sys.hop['t'][~ind], 2.))
+        # rotated lattice: the endpoints and the angles describe the same bonds
+        rot = PI / 3
+        prim_vec = [(cos(rot), sin(rot)), (cos(rot + PI / 3), sin(rot + PI / 3))]
+        lat = lattice(unit_cell=[{'tag': b'a', 'r0': (0, 0)}], prim_vec=prim_vec)
+        lat.get_lattice(n1=6, n2=6)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.set_hopping_func(lambda x_i, y_i, x_j, y_j, tag_i, tag_j, ang: 
+                                      x_j - x_i + 1j * (y_j - y_i))
+        self.assertTrue(np.allclose(sys.hop['t'], np.exp(1j * PI / 180 * sys.hop['ang']), atol=1e-5))
+        # complex odd function of x_j - x_i: H[i, j] = 0.5j (x_j - x_i)
+        sys.set_hopping_func(lambda x_i, y_i, x_j, y_j, tag_i, tag_j, ang: 0.5j * (x_j - x_i))
+        sys.get_ham()
+        i, j = sys.ham.nonzero()
+        x = sys.lat.coor['x']
+        self.assertTrue(np.allclose(sys.ham[i, j], 0.5j * (x[j] - x[i])))
+
+    def test_set_onsite_func(self):
+        sys = init()
+        self.assertRaises(TypeError, sys.set_onsite_func, 1.)
+        self.assertRaises(ValueError, sys.set_onsite_func, lambda x, y, tag: x[:2])
+        sys.set_onsite_func(lambda x, y, tag: x - 1j * y, chunk=4)
+        self.assertTrue(np.allclose(sys.onsite, sys.lat.coor['x'] - 1j * sys.lat.coor['y']))
+        sys.set_onsite_func(lambda x, y, tag: 2. * (tag == b'a'))
+        self.assertTrue(np.allclose(sys.onsite, 2.) and not np.iscomplexobj(sys.onsite))
+
+    def test_get_ldos(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        self.assertRaises(RuntimeError, sys.get_ldos, 0.)
+        sys.get_ham()
+        self.assertRaises(TypeError, sys.get_ldos, 1j)
+        self.assertRaises(ValueError, sys.get_ldos, 0., eta=0.)
+        green = LA.inv((0.5 + 0.1j) * np.eye(25) - sys.ham.toarray())
+        ldos = sys.get_ldos(0.5, eta=0.1)
+        self.assertTrue(np.allclose(ldos, -green.diagonal().imag / np.pi))
+        ldos = sys.get_ldos([0.5, 1.], eta=0.1)
+        self.assertTrue(ldos.shape == (25, 2))
+        self.assertTrue(np.allclose(sys.get_green(0.5, [0, 3], eta=0.1), green[:, [0, 3]]))
+
+    def test_get_bands(self):
+        sys = init()
+        self.assertRaises(RuntimeError, sys.get_bands, [0., 0.])
+        sys.set_bloch([{'n': 1, 't': 1.}])
+        self.assertRaises(TypeError, sys.get_bands, [0., 0., 0.])
+        k, x = sys.get_kpath([(0., 0.), (np.pi, 0.), (np.pi, np.pi)], 21)
+        self.assertTrue(k.shape == (21, 2) and np.isclose(x[-1], 2 * np.pi))
+        bands = sys.get_bands(k)
+        self.assertTrue(np.allclose(bands[:, 0], 2 * np.cos(k[:, 0]) + 2 * np.cos(k[:, 1])))
+        # ribbon of 5 unit cells
+        sys.set_bloch([{'n': 1, 't': 1.}], {b'a': 0.5}, n2=5)
+        bands, vec = sys.get_bands(k[:4], eigenvec=True)
+        en = 0.5 + 2 * np.cos(np.pi * np.arange(5, 0, -1) / 6)
+        self.assertTrue(np.allclose(bands, en + 2 * np.cos(k[:4, :1])))
+        ham = sys.get_ham_bloch(k[:4])
+        self.assertTrue(np.allclose(np.matmul(ham, vec), vec * bands[:, np.newaxis, :]))
+
+    def test_get_chern(self):
+        sys = init()
+        self.assertRaises(RuntimeError, sys.get_chern)
+        # Qi-Wu-Zhang model on 2 sublattices with the same position
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (0, 0)}]
+        lat = lattice(unit_cell=unit_cell, prim_vec=[(1., 0.), (0., 1.)])
+        sys = system(lat)
+        list_hop = [{'n': 1, 'ang': 0, 'tag': b'aa', 't': 0.5}, {'n': 1, 'ang': 0, 'tag': b'bb', 't': -0.5},
+                          {'n': 1, 'ang': 90, 'tag': b'aa', 't': 0.5}, {'n': 1, 'ang': 90, 'tag': b'bb', 't': -0.5},
+                          {'n': 1, 'ang': 0, 'tag': b'ab', 't': -0.5j}, {'n': 1, 'ang': 0, 'tag': b'ba', 't': -0.5j},
+                          {'n': 1, 'ang': 90, 'tag': b'ab', 't': -0.5}, {'n': 1, 'ang': 90, 'tag': b'ba', 't': 0.5}]
+        sys.set_bloch(list_hop, {b'a': 1., b'b': -1.})
+        self.assertRaises(ValueError, sys.get_chern, n_occ=3)
+        chern = sys.get_chern(nk=20)
+        self.assertTrue(np.isclose(abs(chern), 1.))
+        sys.set_bloch(list_hop, {b'a': 3., b'b': -3.})
+        self.assertTrue(np.isclose(sys.get_chern(nk=20), 0.))
+        # local Chern marker in the bulk of a flake
+        lat.get_lattice(n1=14, n2=14)
+        sys = system(lat)
+        sys.set_hopping(list_hop)
+        sys.set_onsite({b'a': 1., b'b': -1.})
+        sys.get_ham()
+        center = np.argmin((sys.lat.coor['x'] - 7.) ** 2 + (sys.lat.coor['y'] - 7.) ** 2)
+        marker = sys.get_chern_marker(0., index=int(center))
+        self.assertTrue(marker.shape == (sys.lat.sites,))
+        self.assertTrue(np.isclose(marker[center], chern, atol=1e-3))
+        # SSH chain
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (0.4, 0)}]
+        sys = system(lattice(unit_cell=unit_cell, prim_vec=[(1., 0.)]))
+        sys.set_bloch([{'n': 1, 't': 1.}, {'n': 2, 't': 2.}])
+        self.assertRaises(ValueError, sys.get_chern)
+        self.assertTrue(np.isclose(abs(sys.get_zak()[0]), np.pi))
+        sys.set_bloch([{'n': 1, 't': 2.}, {'n': 2, 't': 1.}])
+        self.assertTrue(np.isclose(sys.get_zak()[0], 0.))
+
+    def test_set_magnetic_field(self):
+        sys = init()
+        self.assertRaises(RuntimeError, sys.set_magnetic_field, 0.1)
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        self.assertRaises(TypeError, sys.set_magnetic_field, 1j)
+        self.assertRaises(ValueError, sys.set_magnetic_field, 0.1, gauge='coulomb')
+        fluxes = np.linspace(0., 1., 6)
+        butterfly = sys.get_flux_sweep(fluxes)
+        self.assertTrue(butterfly.shape == (6, 25))
+        self.assertTrue(np.allclose(butterfly[0], butterfly[-1]))
+        # gauge invariance
+        self.assertTrue(np.allclose(butterfly, sys.get_flux_sweep(fluxes, gauge='symmetric')))
+        sys.set_magnetic_field(0.4, gauge='symmetric')
+        sys.get_ham()
+        self.assertTrue(sys.is_hermitian())
+        self.assertTrue(np.allclose(np.linalg.eigvalsh(sys.ham.toarray()), butterfly[2]))
+
+    def test_get_continuation(self):
+        # two decoupled chains, the second one being shifted
+        lat = lattice(unit_cell=[{'tag': b'a', 'r0': (0, 0)}], prim_vec=[(1., 0.), (0., 1.)])
+        lat.get_lattice(n1=60, n2=2)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 'ang': 0, 't': 1.}, {'n': 1, 'ang': 90, 't': 0.}])
+        sys.get_ham()
+        func = lambda alpha: sys.ham + alpha * sparse.diags(sys.lat.coor['y'])
+        self.assertRaises(TypeError, sys.get_continuation, 1., [0.])
+        self.assertRaises(ValueError, sys.get_continuation, func, [0.], k=200)
+        alphas = np.linspace(-0.05, 0.05, 11)
+        en, iters = sys.get_continuation(func, alphas, k=2)
+        self.assertTrue(en.shape == (11, 2) and iters[0] == 0)
+        # the levels of the shifted chain are followed through the crossings
+        en_chain = -2 * np.cos(np.pi * np.arange(1, 3) / 61)
+        self.assertTrue(np.allclose(en, en_chain + alphas.reshape(-1, 1)))
+        # Hamiltonians built without set_hopping
+        self.assertTrue(np.allclose(system(lat).get_continuation(func, alphas, k=2)[0], en))
+
+    def test_set_periodic(self):
+        sys = init()
+        self.assertRaises(TypeError, sys.set_periodic, periodic=1)
+        self.assertRaises(TypeError, sys.set_periodic, twist=0.)
+        self.assertRaises(RuntimeError, sys.get_twist_average, len)
+        sys.set_periodic(twist=(0.3, 0.))
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        self.assertTrue(len(sys.hop) == 50)
+        sys.get_ham()
+        self.assertTrue(sys.is_hermitian())
+        k1, k2 = np.meshgrid((2 * np.pi * np.arange(5) + 0.3) / 5, 2 * np.pi * np.arange(5) / 5)
+        en = np.sort(2 * np.cos(k1.ravel()) + 2 * np.cos(k2.ravel()))
+        self.assertTrue(np.allclose(np.linalg.eigvalsh(sys.ham.toarray()), en))
+        # average over the twists theta_1, theta_2 = 0, pi
+        func = lambda ham: np.linalg.eigvalsh(ham.toarray())
+        average = sys.get_twist_average(func, n_twist=2)
+        results = []
+        for twist in [(0., 0.), (0., np.pi), (np.pi, 0.), (np.pi, np.pi)]:
+            sys.set_twist(twist)
+            sys.get_ham()
+            results.append(func(sys.ham))
+        self.assertTrue(np.allclose(average, np.mean(results, axis=0)))
+
     def test_get_coor_hop(self):
         sys = init()
         self.assertRaises(RuntimeError, sys.get_coor_hop)
         sys.set_hopping([{'n': 2, 't': 1.}])
         self.assertRaises(ValueError, sys.get_coor_hop)
+        sys.set_hopping([{'n': 1, 't': 1.}, {'n': 1, 'ang': 90, 't': 2.}])
+        sys.get_coor_hop()
+        self.assertTrue(np.allclose(sys.coor_hop['x'], sys.lat.coor['x']))
+        self.assertTrue(np.allclose(sys.coor_hop['y'], 2 * sys.lat.coor['y']))
+        # the layout follows the lattice geometry after a reordering
+        sys.reorder_sites()
+        sys.get_coor_hop()
+        x, y = sys.coor_hop['x'] - sys.coor_hop['x'][0], sys.coor_hop['y'] - sys.coor_hop['y'][0]
+        self.assertTrue(np.allclose(x, sys.lat.coor['x'] - sys.lat.coor['x'][0]))
+        self.assertTrue(np.allclose(y, 2 * (sys.lat.coor['y'] - sys.lat.coor['y'][0])))
+
+    def test_get_intensity(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.get_ham()
+        self.assertRaises(RuntimeError, sys.get_intensity, 0)
+        sys.get_eig(eigenvec=True)
+        self.assertTrue(sys.intensity.size == 0)
+        self.assertRaises(TypeError, sys.get_intensity, 1.)
+        self.assertRaises(ValueError, sys.get_intensity, 25)
+        intensity = sys.get_intensity([0, 3])
+        self.assertTrue(np.allclose(intensity, np.abs(sys.rn[:, [0, 3]]) ** 2))
+        self.assertTrue(np.allclose(sys.pola[:, 0], 1.))
+        sys.get_ipr()
+        self.assertTrue(np.allclose(sys.ipr, np.sum(np.abs(sys.rn) ** 4, axis=0)))
+        sys.get_eig(eigenvec=True, intensity=True)
+        self.assertTrue(np.allclose(sys.intensity, np.abs(sys.rn) ** 2))
 
     def test_get_intensity_en(self):
         # tag_pola must be a binary char belonging to lat.tags.
@@ -286,6 +517,225 @@ class TestSystem(unittest.TestCase):
         self.assertRaises(TypeError, sys.get_intensity_en, lims=[1., 'a'])
         self.assertRaises(ValueError, sys.get_intensity_en, lims=[2., 1.])
 
+    def test_remove_sites(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 2.}])
+        sys.set_onsite({b'a': 1.})
+        sys.get_ham()
+        self.assertRaises(TypeError, sys.remove_sites, 0)
+        self.assertRaises(ValueError, sys.remove_sites, [25])
+        sys.remove_sites([0, 12, 13])
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}]
+        prim_vec = [(1., 0.), (0, 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=5, n2=5)
+        lat.remove_sites([0, 12, 13])
+        sys_ref = system(lat)
+        sys_ref.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 2.}])
+        sys_ref.set_onsite({b'a': 1.})
+        sys_ref.get_ham()
+        self.assertTrue(sys.lat.sites == 22)
+        self.assertTrue(np.allclose(sys.ham.toarray(), sys_ref.ham.toarray()))
+
+    def test_add_sites(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (1, 0)}]
+        prim_vec = [(2., 0.), (0, 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=3, n2=3)
+        list_hop = [{'n': 1, 'tag': b'ab', 't': 1.}, {'n': 1, 'tag': b'ba', 't': 2.},
+                         {'n': 1, 'ang': 90, 't': 3.}, {'n': 2, 't': 4.}]
+        sys_ref = system(lat)
+        sys_ref.set_hopping(list_hop)
+        sys_ref.set_onsite({b'a': 1., b'b': -1.})
+        sys_ref.get_ham()
+        coor = lat.coor[[4, 9, 17]].copy()
+        lat.remove_sites([4, 9, 17])
+        sys = system(lat)
+        sys.set_hopping(list_hop)
+        sys.set_onsite({b'a': 1., b'b': -1.})
+        sys.get_ham()
+        self.assertRaises(TypeError, sys.add_sites, coor[['x', 'y']], list_hop)
+        sys.add_sites(coor, list_hop, dict_onsite={b'a': 1., b'b': -1.})
+        self.assertTrue(sys.lat.sites == 18)
+        self.assertTrue(np.allclose(sys.ham.toarray(), sys_ref.ham.toarray()))
+
+    def test_real_ham(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.+0j}])
+        sys.set_onsite({b'a': 0.5})
+        sys.get_ham()
+        self.assertTrue(sys.ham.dtype == np.float64)
+        sys.get_eig(eigenvec=True)
+        self.assertTrue(sys.en.dtype == np.float64)
+        self.assertTrue(sys.rn.dtype == np.float64)
+        sys.set_onsite_def({0: 1j})
+        sys.get_ham()
+        self.assertTrue(sys.ham.dtype == np.complex128)
+
+    def test_precision(self):
+        self.assertRaises(ValueError, system, init().lat, precision='half')
+        sys = init()
+        sys_single = system(sys.lat, precision='single')
+        for s in (sys, sys_single):
+            s.set_hopping([{'n': 1, 't': 1.}])
+            s.get_ham()
+            s.get_eig(eigenvec=True)
+        self.assertTrue(sys_single.ham.dtype == np.float32)
+        self.assertTrue(sys_single.rn.dtype == np.float32)
+        self.assertTrue(np.allclose(sys_single.en, sys.en, atol=1e-5))
+        sys_single.set_precision('double')
+        self.assertTrue(sys_single.ham.dtype == np.float64)
+
+    def test_get_eig_subset(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.get_ham()
+        sys.get_eig(eigenvec=True, intensity=True)
+        en, intensity = sys.en, sys.intensity
+        self.assertRaises(ValueError, sys.get_eig, lims=[-1., 1.], index=[0, 1])
+        self.assertRaises(ValueError, sys.get_eig, index=[0, 25])
+        sys.get_eig(eigenvec=True, index=[2, 5])
+        self.assertTrue(sys.rn.shape == (25, 4))
+        self.assertTrue(sys.pola.shape == (4, 1))
+        self.assertTrue(np.allclose(sys.en, en[2: 6]))
+        ind = (en > -0.5) & (en <= 0.5)
+        sys.get_eig(eigenvec=True, lims=[-0.5, 0.5], intensity=True)
+        self.assertTrue(np.allclose(sys.en, en[ind]))
+        self.assertTrue(np.allclose(np.sum(sys.intensity, axis=1), 
+                                                np.sum(intensity[:, ind], axis=1)))
+
+    def test_get_eig_slicing(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}]
+        prim_vec = [(1., 0.), (0, 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=15, n2=15)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.set_onsite({b'a': 0.})
+        sys.set_onsite_dis(0.5)
+        sys.get_ham()
+        sys.get_eig()
+        en = sys.en
+        self.assertTrue(sys.count_states(0.1) == np.sum(en < 0.1))
+        sys.get_eig_slicing(slices=3, eigenvec=True, processes=1)
+        self.assertTrue(np.allclose(sys.en, en))
+        self.assertTrue(np.allclose(sys.ham.dot(sys.rn), sys.rn * sys.en))
+
+    def test_get_eig_symmetry(self):
+        sys = init()
+        sys.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 0.2}])
+        sys.get_ham()
+        perm, order = sys.find_symmetry()
+        self.assertTrue(order == 4)
+        sys.get_eig(eigenvec=True)
+        en = LA.eigvalsh(sys.ham.toarray())
+        self.assertTrue(np.allclose(sys.en, en))
+        self.assertTrue(np.allclose(sys.ham.dot(sys.rn), sys.rn * sys.en))
+        self.assertTrue(np.allclose(np.sum(sys.pola, axis=1), 1.))
+        self.assertTrue(np.all(np.bincount(sys.sector) == [7, 12, 6]))
+        self.assertTrue(sys.rn.dtype == np.float64)
+
+    def test_get_eig_components(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (1, 0)}]
+        prim_vec = [(3., 0.), (0., 3.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=4, n2=3)
+        lat.remove_sites(index=[0])
+        sys = system(lat=lat)
+        sys.set_hopping([{'n': 1, 't': 1.}])
+        sys.set_onsite({b'a': 0.5, b'b': 0.})
+        sys.get_ham()
+        self.assertTrue(sys.find_components().max() == 11)
+        sys.get_eig(eigenvec=True)
+        en = LA.eigvalsh(sys.ham.toarray())
+        self.assertTrue(np.allclose(sys.en, en))
+        self.assertTrue(np.allclose(sys.ham.dot(sys.rn), sys.rn * sys.en))
+        self.assertTrue(np.allclose(sys.rn.T.dot(sys.rn), np.eye(23)))
+
+    def test_reorder_sites(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}]
+        prim_vec = [(1., 0.), (0, 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=40, n2=4)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 't': 1.}, {'n': 2, 't': 0.2}])
+        sys.set_onsite({b'a': 0.})
+        sys.set_onsite_dis(0.5)
+        sys.get_ham()
+        sys.get_eig()
+        en = sys.en
+        x = lat.coor['x'].copy()
+        self.assertTrue(sys.get_bandwidth() == 41)
+        sys.reorder_sites()
+        self.assertTrue(sys.get_bandwidth() < 10)
+        self.assertTrue(np.allclose(lat.coor['x'], x[sys.perm]))
+        sys.get_ham()
+        sys.get_eig(eigenvec=True)
+        self.assertTrue(np.allclose(sys.en, en))
+        self.assertTrue(np.allclose(sys.ham.dot(sys.rn), sys.rn * sys.en))
+        sys.set_hopping([{'n': 1, 'ang': 90, 't': 2.}])
+        sys.get_ham()
+        self.assertTrue(np.allclose(sys.ham.toarray(), sys.ham.toarray().T))
+        self.assertTrue(np.sum(sys.ham.toarray() == 2.) == 2 * 40 * 3)
+
+    def test_get_eig_chiral(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (1, 0)}]
+        prim_vec = [(2., 0.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=6)
+        lat.remove_sites(index=[11])
+        sys = system(lat=lat)
+        sys.set_hopping([{'n': 1, 'tag': b'ab', 't': 1.}, {'n': 1, 'tag': b'ba', 't': 2.}])
+        sys.get_ham()
+        self.assertTrue(sys.is_chiral())
+        sys.get_eig(eigenvec=True)
+        en, rn = LA.eigh(sys.ham.toarray())
+        self.assertTrue(np.allclose(sys.en, en))
+        self.assertTrue(np.allclose(sys.ham.dot(sys.rn), sys.rn * sys.en))
+        self.assertTrue(np.allclose(sys.rn.T.dot(sys.rn), np.eye(11)))
+        sys.set_onsite({b'a': 1., b'b': 0.})
+        sys.get_ham()
+        self.assertFalse(sys.is_chiral())
+
+    def test_get_eig_arnoldi(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (1, 0)}]
+        prim_vec = [(2., 0.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=40)
+        sys = system(lat=lat)
+        sys.set_hopping([{'n': 1, 'tag': b'ab', 't': 1.}, {'n': 1, 'tag': b'ba', 't': 0.6}])
+        sys.set_onsite({b'a': 0.2j, b'b': -0.2j})
+        sys.set_onsite_def({0: 0.5+0.1j, 7: -0.3})
+        sys.get_ham()
+        self.assertRaises(ValueError, sys.get_eig_arnoldi, k=79)
+        self.assertRaises(TypeError, sys.get_eig_arnoldi, target='a')
+        sys.get_eig(eigenvec=True, left=True)
+        sys.get_petermann()
+        en, petermann = sys.en, sys.petermann
+        sys.get_eig_arnoldi(k=6, target=0.5, left=True)
+        sys.get_petermann()
+        ind = np.argsort(np.abs(en - 0.5))[:6]
+        ind = ind[np.argsort(en[ind].real)]
+        self.assertTrue(np.allclose(sys.en, en[ind]))
+        self.assertTrue(np.allclose(sys.petermann, petermann[ind]))
+        self.assertTrue(np.allclose(sys.ln.conj().T.dot(sys.rn), np.eye(6)))
+        sys.get_eig_arnoldi(k=4)
+        self.assertTrue(np.allclose(np.sort(sys.en.imag), np.sort(en.imag)[-4:]))
+        self.assertTrue(sys.pola.shape == (4, 2))
+        # PT-symmetric honeycomb flake: clustered imaginary parts, 
+        # the states nearest the largest gain are found by shift-invert
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (0.5 * 3 ** 0.5, 0.5)}]
+        lat = lattice(unit_cell=unit_cell, prim_vec=[(3 ** 0.5, 0.), (0.5 * 3 ** 0.5, 1.5)])
+        lat.get_lattice(n1=6, n2=5)
+        sys = system(lat=lat)
+        sys.set_hopping([{'n': 1, 't': -1.}])
+        sys.set_onsite({b'a': 0.1j, b'b': -0.1j})
+        sys.get_ham()
+        sys.get_eig_arnoldi(k=4, left=True)
+        dist = np.sort(np.abs(np.linalg.eigvals(sys.ham.toarray()) - 0.1j))
+        self.assertTrue(np.allclose(np.sort(np.abs(sys.en - 0.1j)), dist[:4]))
+        self.assertTrue(np.allclose(sys.ln.conj().T.dot(sys.rn), np.eye(4)))
+
     def test_dimer_chain(self):
         unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (1, 0)}]
         prim_vec = [(2., 0.)]
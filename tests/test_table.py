@@ -0,0 +1,57 @@
+from tbee.table import table
+from tbee.lattice import lattice
+from tbee.system import system
+import unittest
+import numpy as np
+
+
+class TestTable(unittest.TestCase):
+    '''
+    Unittest of class **table**.
+    '''
+    def test_fields(self):
+        coor = table([('x', 'f8'), ('y', 'f8'), ('tag', 'S1')], 3)
+        coor['x'] = [0., 1., 2.]
+        coor['x'][0] = -1.
+        coor['tag'] = b'a'
+        coor['tag'][1] = b'b'
+        self.assertTrue(np.allclose(coor['x'], [-1., 1., 2.]))
+        self.assertTrue(np.array_equal(coor['tag'], [b'a', b'b', b'a']))
+        self.assertTrue(np.array_equal(coor.code('tag'), [97, 98, 97]))
+        self.assertTrue(np.array_equal(coor.equal('tag', b'b'), [False, True, False]))
+        self.assertTrue(coor['x'].flags['C_CONTIGUOUS'])
+        self.assertTrue(coor.dtype == [('x', '<f8'), ('y', '<f8'), ('tag', 'S1')])
+
+    def test_struct(self):
+        arr = np.array([(1., 0., b'a'), (0., 1., b'b')],
+                               dtype=[('x', 'f8'), ('y', 'f8'), ('tag', 'S1')])
+        coor = table.from_struct(arr)
+        self.assertTrue(np.array_equal(coor.to_struct(), arr))
+        coor = table.concatenate([coor, arr])
+        self.assertTrue(len(coor) == 4)
+        self.assertTrue(np.array_equal(coor[coor['x'] > 0.5].to_struct(), arr[[0, 0]]))
+        self.assertTrue(np.array_equal(coor.argsort(('y', 'x')), [0, 2, 1, 3]))
+
+    def test_upcast(self):
+        hop = table([('i', 'u4'), ('t', 'f8')], 3)
+        hop['t'] = 1.
+        self.assertTrue(hop['t'].dtype == np.float64)
+        hop.assign('t', hop['i'] == 0, 1j)
+        self.assertTrue(hop['t'].dtype == np.complex128)
+        self.assertTrue(np.allclose(hop['t'], 1j))
+
+    def test_hop_memory(self):
+        unit_cell = [{'tag': b'a', 'r0': (0, 0)}, {'tag': b'b', 'r0': (0.5, 0.5)}]
+        prim_vec = [(1., 0.), (0, 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        lat.get_lattice(n1=6, n2=6)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 'tag': b'ab', 't': 1.}, {'n': 1, 'tag': b'ba', 't': 2.}])
+        self.assertTrue(np.all(sys.hop['tag'][sys.hop['t'] == 1.] == b'ab'))
+        dtype = np.dtype([('n', 'u2'), ('i', 'u4'), ('j', 'u4'),
+                                   ('ang', 'f8'), ('tag', 'S2'), ('t', 'c16')])
+        self.assertTrue(sys.hop.nbytes < 0.7 * dtype.itemsize * len(sys.hop))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from tbee.lattice import *
+from tbee.transfer import *
+from tbee.graphene import grapheneLat
+import unittest
+import numpy as np
+import scipy.linalg as LA
+
+
+class TestTransfer(unittest.TestCase):
+    '''
+    Unittest of class **transfer**.
+    '''
+    def test_init(self):
+        self.assertRaises(TypeError, transfer, 0, [{'n': 1, 't': 1.}])
+
+    def test_localisation(self):
+        unit_cell = [{'tag': b'a', 'r0': (0., 0.)}]
+        prim_vec = [(1., 0.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        tr = transfer(lat, [{'n': 1, 't': 1.}])
+        self.assertRaises(TypeError, tr.get_localisation, 0., 1, 1.)
+        self.assertTrue(tr.get_localisation(0.5, 1, 1000) > 1000.)
+        # weak disorder: xi = 6 (4 - E^2) / alpha^2
+        xi = tr.get_localisation(0.5, 1, 50000, alpha_onsite=0.5, seed=0)
+        self.assertTrue(abs(xi - 90.) < 10.)
+
+    def test_strip(self):
+        unit_cell = [{'tag': b'a', 'r0': (0., 0.)}]
+        prim_vec = [(1., 0.), (0., 1.)]
+        lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+        tr = transfer(lat, [{'n': 1, 't': 1.}, {'n': 2, 't': 0.2}])
+        tr.get_localisation(0., 4, 200, alpha_onsite=2., alpha_hopping=0.1, seed=0)
+        self.assertTrue(len(tr.lyapunov) == 4)
+        self.assertTrue(np.all(np.diff(tr.lyapunov) <= 0))
+        self.assertTrue(tr.xi > 0)
+
+    def test_honeycomb(self):
+        # rank-deficient coupling between the slices
+        tr = transfer(grapheneLat(), [{'n': 1, 't': 1.}])
+        tr.get_localisation(2.7, 4, 2000)
+        self.assertTrue(tr.ham_slice.shape == (8, 8) and len(tr.lyapunov) == 4)
+        # clean strip: Lyapunov exponents given by the Bloch factors of the slices
+        sites = len(tr.ham_slice)
+        a = np.block([[2.7 * np.eye(sites) - tr.ham_slice, -tr.ham_hop.conj().T], 
+                              [np.eye(sites), np.zeros((sites, sites))]])
+        b = np.block([[tr.ham_hop, np.zeros((sites, sites))], [np.zeros((sites, sites)), np.eye(sites)]])
+        lam = LA.eigvals(a, b)
+        lam = np.sort(np.abs(lam[np.isfinite(lam)]))[::-1][:4]
+        step = np.linalg.norm(tr.lat.prim_vec[0])
+        self.assertTrue(np.allclose(tr.lyapunov * step, np.log(lam), atol=1e-2))
+        tr.get_localisation(0.5, 4, 2000, alpha_onsite=2., alpha_hopping=0.1, seed=0)
+        self.assertTrue(np.isfinite(tr.xi) and tr.xi > 0)
+        self.assertTrue(np.all(np.diff(tr.lyapunov) <= 0))
+        # couplings of the same sites to both neighbouring slices
+        tr = transfer(grapheneLat(), [{'n': 1, 't': 1.}, {'n': 2, 'tag': b'aa', 't': 0.1}])
+        self.assertRaises(ValueError, tr.get_localisation, 0., 2, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
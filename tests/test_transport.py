@@ -0,0 +1,62 @@
+from tbee.lattice import *
+from tbee.system import *
+from tbee.transport import *
+from tbee.graphene import grapheneLat, DX
+import unittest
+import numpy as np
+
+
+def init():
+    unit_cell = [{'tag': b'a', 'r0': (0., 0.)}]
+    prim_vec = [(1., 0.), (0., 1.)]
+    lat = lattice(unit_cell=unit_cell, prim_vec=prim_vec)
+    lat.get_lattice(n1=10, n2=4)
+    sys = system(lat)
+    sys.set_hopping([{'n': 1, 't': -1.}])
+    sys.get_ham()
+    return sys
+
+class TestTransport(unittest.TestCase):
+    '''
+    Unittest of class **transport**.
+    '''
+    def test_init(self):
+        sys = init()
+        self.assertRaises(TypeError, transport, 0)
+        self.assertRaises(ValueError, transport, sys, width=0.5)
+        tr = transport(sys)
+        self.assertTrue(len(tr.layers) == 10)
+
+    def test_transmission(self):
+        sys = init()
+        tr = transport(sys)
+        en = np.array([-2.5, -0.5, 0.5, 3.5])
+        tr.get_transmission(en)
+        # number of open channels of the clean ribbon
+        eps = -2 * np.cos(np.pi * np.arange(1, 5) / 5)
+        channels = [np.sum(np.abs(e - eps) < 2) for e in en]
+        self.assertTrue(np.allclose(tr.trans, channels, atol=1e-4))
+        self.assertTrue(np.allclose(tr.get_transmission(en, processes=2), tr.trans))
+
+    def test_graphene(self):
+        # clean zigzag ribbon of 6.5 periods: partial layer in the middle
+        lat = grapheneLat()
+        lat.square(6)
+        sys = system(lat)
+        sys.set_hopping([{'n': 1, 't': -1.}])
+        sys.get_ham()
+        self.assertRaises(ValueError, transport, sys, width=3.)
+        tr = transport(sys)
+        self.assertTrue(np.isclose(tr.width, 2 * DX))
+        self.assertTrue([len(l) for l in tr.layers] == [14, 14, 14, 7, 14, 14, 14])
+        tr.get_transmission([-2.5, -1.5, -0.3, 0.05, 0.8])
+        self.assertTrue(np.allclose(tr.trans, [3., 5., 1., 1., 3.], atol=1e-4))
+        # the leads must be periodic
+        sys.set_onsite({b'a': 0., b'b': 0.})
+        sys.set_onsite_def({int(tr.layers[0][0]): 0.5})
+        sys.get_ham()
+        self.assertRaises(ValueError, transport, sys)
+
+
+if __name__ == '__main__':
+    unittest.main()